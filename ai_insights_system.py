@@ -226,7 +226,7 @@ class RecruitmentInsightsEngine:
 
     def _analyze_department_health(self):
         """分析部门健康度"""
-        dept_health = self.df.groupby('部门')['部门健康度_得分'].mean()
+        dept_health = self.df.groupby('部门', observed=True)['部门健康度_得分'].mean()
         unhealthy_depts = dept_health[dept_health < 60]
 
         if not unhealthy_depts.empty:
@@ -299,10 +299,10 @@ class RecruitmentInsightsEngine:
 
     def _analyze_team_productivity(self):
         """分析团队生产力"""
-        recruiter_productivity = self.df.groupby('招聘顾问')['招聘顾问人效_人'].mean()
+        recruiter_productivity = self.df.groupby('招聘顾问', observed=True)['招聘顾问人效_人'].mean()
 
         underperformers = recruiter_productivity[recruiter_productivity < 5]
-        overloaded = self.df.groupby('招聘顾问')['人均负责职位数'].mean()
+        overloaded = self.df.groupby('招聘顾问', observed=True)['人均负责职位数'].mean()
         overloaded = overloaded[overloaded > 15]
 
         if not underperformers.empty:
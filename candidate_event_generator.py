@@ -0,0 +1,301 @@
+"""
+招聘数据驾驶舱 - 候选人级事件日志生成模块
+逐个候选人生成阶段流转事件 (投递 → 初筛通过 → 面试 → Offer → 入职 / 淘汰),
+汇总表中的漏斗与流程类指标 (DERIVED_COLUMNS) 由事件日志推导, 而不是直接随机抽取
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_generator_complete import LEVELS, _chunk_rng, _generate_rows, _grid, _grid_slice
+
+# 事件阶段 (按流程顺序); 淘汰 包括初筛未通过、候选人流失和拒绝Offer
+EVENT_STAGES = ['投递', '初筛通过', '面试', 'Offer', '入职', '淘汰']
+APPLY, SCREEN, INTERVIEW, OFFER, HIRE, REJECT = range(len(EVENT_STAGES))
+
+# 分块生成时每块的网格行 (月份 × 招聘顾问 × 部门) 数; 每个网格行约 800 个事件
+EVENT_CHUNK_CELLS = 1024
+
+# 候选人ID = 网格行号 × CANDIDATE_ID_STRIDE + 行内序号 (与分块方式无关)
+CANDIDATE_ID_STRIDE = 1 << 16
+
+# 待处理候选人的超时阈值 (小时)
+PENDING_HOURS = (24, 48, 72)
+
+# 由事件日志推导的汇总列 (其余列仍由 generate_complete_recruitment_data 的逻辑随机生成)
+DERIVED_COLUMNS = [
+    '收到简历总数', '简历筛选总数', '初筛通过简历数', '面试人数', '发出Offer数', '接受Offer数', '总招聘人数',
+    *[f'入职人数_{level}' for level in LEVELS],
+    '简历初筛通过率_%', '面试通过率_%', '录用接受率_%', '全流程转化率_%',
+    '平均录用速度_天', '阶段周转时间_天', '面试反馈速度_小时', '流程停滞天数',
+    '待处理候选人数', *[f'待处理_超{hours}小时数' for hours in PENDING_HOURS],
+]
+# 其中的比率和平均值 (其余为计数)
+_RATIO_COLUMNS = [
+    '简历初筛通过率_%', '面试通过率_%', '录用接受率_%', '全流程转化率_%',
+    '平均录用速度_天', '阶段周转时间_天', '面试反馈速度_小时', '流程停滞天数',
+]
+
+_NEVER = np.iinfo(np.int64).max   # 未到达的阶段
+_SECOND = 10 ** 9                 # 事件时间以纳秒整数计算
+_HOUR = 3600 * _SECOND
+_DAY = 24 * _HOUR
+
+
+def generate_candidate_event_data(months=12, recruiters=5, departments=5, seed=42, as_of=None,
+                                  chunk_cells=EVENT_CHUNK_CELLS):
+    """
+    生成 (汇总表, 事件日志)
+    汇总表与 generate_complete_recruitment_data 的列相同, 其中 DERIVED_COLUMNS 由事件日志推导
+    """
+    facts, events = zip(*iter_candidate_event_chunks(months, recruiters, departments, chunk_cells=chunk_cells,
+                                                     seed=seed, as_of=as_of))
+    return pd.concat(facts, ignore_index=True), pd.concat(events, ignore_index=True)
+
+
+def iter_candidate_event_chunks(months=12, recruiters=5, departments=5,
+                                chunk_cells=EVENT_CHUNK_CELLS, seed=42, as_of=None):
+    """
+    按网格顺序逐块生成 (汇总表块, 事件日志块), 每块最多 chunk_cells 个网格行
+    as_of: 数据截止时间, 之后的事件尚未发生 (候选人仍在流程中); 默认为最后一个月的月末
+    """
+    grid = _grid(months, recruiters, departments)
+    as_of = _as_of(grid, as_of)
+    cells = months * recruiters * departments
+    for index in range(max(1, -(-cells // chunk_cells))):
+        start, stop = index * chunk_cells, min((index + 1) * chunk_cells, cells)
+        events = _generate_events(grid, start, stop, _event_rng(seed, index), as_of)
+        facts = _generate_rows(*_grid_slice(grid, start, stop), _chunk_rng(seed, index))
+        yield _apply_derived(facts, derive_aggregates(events, as_of)), events
+
+
+def _as_of(grid, as_of):
+    """
+    数据截止时间 (纳秒时间戳); 未指定时为网格最后一个月的次月月初
+    """
+    if as_of is None:
+        date_range = grid[0]
+        as_of = date_range[-1] + pd.offsets.MonthBegin(1) if len(date_range) else pd.Timestamp(0)
+    return pd.Timestamp(as_of).value
+
+
+def _event_rng(seed, index):
+    """
+    第 index 块事件的随机数流, 与同一块汇总列的随机数流 (_chunk_rng) 相互独立
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index, 1)))
+
+
+def _generate_events(grid, start, stop, rng, as_of):
+    """
+    网格第 [start, stop) 行的候选人事件日志, 只保留 as_of 之前发生的事件
+    行顺序: 候选人 → 阶段 (即每个候选人的事件按时间排列)
+    """
+    date_range, recruiter_names, dept_names = grid
+    cell_index = np.arange(start, stop)
+    cells = len(cell_index)
+
+    # 每个网格行的流程参数
+    applicants = rng.integers(100, 500, cells)
+    screen_rate = rng.uniform(0.15, 0.45, cells)
+    show_rate = rng.uniform(0.6, 0.8, cells)
+    offer_rate = rng.uniform(0.05, 0.2, cells)
+    accept_rate = rng.uniform(0.55, 0.92, cells)
+
+    # 每个候选人一行
+    cell = np.repeat(np.arange(cells), applicants)
+    n = len(cell)
+    serial = np.arange(n) - np.repeat(np.cumsum(applicants) - applicants, applicants)
+    per_month = len(recruiter_names) * len(dept_names)
+    month_code = cell_index[cell] // per_month
+    month_start = date_range.values.astype(np.int64)[month_code]
+    month_days = date_range.days_in_month.to_numpy()[month_code]
+
+    def days(values):
+        return (values * _DAY).astype(np.int64)
+
+    # 各阶段时间: 投递在当月内均匀分布, 之后逐阶段累加停留时间
+    applied_at = month_start + days(rng.random(n) * month_days)
+    screened_at = applied_at + days(rng.exponential(2, n))
+    interviewed_at = screened_at + days(rng.gamma(2, 2.5, n))
+    feedback_at = interviewed_at + days(rng.exponential(2, n))
+    hired_at = feedback_at + days(rng.gamma(3, 7, n))
+    declined_at = feedback_at + days(rng.exponential(5, n))
+
+    # 各阶段是否通过
+    screened = rng.random(n) < screen_rate[cell]
+    interviewed = screened & (rng.random(n) < show_rate[cell])
+    offered = interviewed & (rng.random(n) < offer_rate[cell])
+    hired = offered & (rng.random(n) < accept_rate[cell])
+
+    times = np.full((n, len(EVENT_STAGES)), _NEVER, dtype=np.int64)
+    times[:, APPLY] = applied_at
+    times[:, SCREEN] = np.where(screened, screened_at, _NEVER)
+    times[:, INTERVIEW] = np.where(interviewed, interviewed_at, _NEVER)
+    times[:, OFFER] = np.where(offered, feedback_at, _NEVER)
+    times[:, HIRE] = np.where(hired, hired_at, _NEVER)
+    # 淘汰发生在未通过的那个环节
+    times[:, REJECT] = np.select(
+        [~screened, ~interviewed, ~offered, ~hired],
+        [screened_at, interviewed_at, feedback_at, declined_at],
+        default=_NEVER
+    )
+
+    rows, stages = np.nonzero(times < as_of)
+    level = rng.choice(len(LEVELS), n, p=[0.3, 0.3, 0.2, 0.1, 0.08, 0.02])
+    candidate_cell = cell[rows]
+    return pd.DataFrame({
+        '候选人ID': (cell_index[candidate_cell] * CANDIDATE_ID_STRIDE + serial[rows]).astype(np.int64),
+        '月份': date_range.values[month_code[rows]],
+        '招聘顾问': pd.Categorical.from_codes(
+            (cell_index[candidate_cell] // len(dept_names)) % len(recruiter_names), recruiter_names
+        ),
+        '部门': pd.Categorical.from_codes(cell_index[candidate_cell] % len(dept_names), dept_names),
+        '职级': pd.Categorical.from_codes(level[rows], LEVELS),
+        '阶段': pd.Categorical.from_codes(stages, EVENT_STAGES),
+        '事件时间': times[rows, stages].view('datetime64[ns]'),
+    })
+
+
+def derive_aggregates(events, as_of=None):
+    """
+    由事件日志推导每个 (月份, 招聘顾问, 部门) 的 DERIVED_COLUMNS
+    按候选人的投递月份归属; 待处理和停滞按该月月末 (不晚于 as_of) 时候选人所处的状态计算
+    """
+    keys = ['月份', '招聘顾问', '部门']
+    row, candidate_ids = pd.factorize(events['候选人ID'])
+    stage = pd.Categorical(events['阶段'], categories=EVENT_STAGES).codes
+    times = np.full((len(candidate_ids), len(EVENT_STAGES)), _NEVER, dtype=np.int64)
+    times[row, stage] = events['事件时间'].to_numpy().astype('datetime64[ns]').view(np.int64)
+
+    # 候选人属性取自投递事件
+    first = np.empty(len(candidate_ids), dtype=np.int64)
+    first[row[stage == APPLY]] = np.flatnonzero(stage == APPLY)
+    candidates = events[keys + ['职级']].iloc[first].reset_index(drop=True)
+
+    reached = times != _NEVER
+    applied_at = times[:, APPLY]
+    hired = reached[:, HIRE]
+
+    # 投递月的月末 (不晚于 as_of) 时的状态
+    month = pd.DatetimeIndex(candidates['月份'])
+    cutoff = (month + pd.offsets.MonthBegin(1)).to_numpy().view(np.int64)
+    if as_of is not None:
+        cutoff = np.minimum(cutoff, pd.Timestamp(as_of).value)
+    before_cutoff = times < cutoff[:, None]
+    last_at_cutoff = np.where(before_cutoff, times, applied_at[:, None]).max(axis=1)
+    open_at_cutoff = before_cutoff[:, APPLY] & ~before_cutoff[:, HIRE] & ~before_cutoff[:, REJECT]
+    waiting = open_at_cutoff & ~before_cutoff[:, INTERVIEW]   # 等待初筛或安排面试
+    waited = cutoff - last_at_cutoff
+
+    # 面试后的下一个事件 (Offer 或 淘汰)
+    after_interview = np.minimum(times[:, OFFER], times[:, REJECT])
+    has_feedback = reached[:, INTERVIEW] & (after_interview != _NEVER)
+    last_event = np.where(reached, times, applied_at[:, None]).max(axis=1)
+
+    per_candidate = {
+        '收到简历总数': np.ones(len(candidate_ids), dtype=np.int64),
+        '初筛通过简历数': reached[:, SCREEN],
+        '面试人数': reached[:, INTERVIEW],
+        '发出Offer数': reached[:, OFFER],
+        '总招聘人数': hired,
+        **{f'入职人数_{level}': hired & (candidates['职级'] == level).to_numpy() for level in LEVELS},
+        '_录用天数': np.where(hired, times[:, HIRE] - applied_at, 0) / _DAY,
+        '_流转天数': (last_event - applied_at) / _DAY,
+        '_流转次数': reached.sum(axis=1) - 1,
+        '_反馈小时': np.where(has_feedback, after_interview - times[:, INTERVIEW], 0) / _HOUR,
+        '_反馈次数': has_feedback,
+        '_停滞天数': np.where(open_at_cutoff, waited, 0) / _DAY,
+        '_停滞人数': open_at_cutoff,
+        '待处理候选人数': waiting,
+        **{f'待处理_超{hours}小时数': waiting & (waited > hours * _HOUR) for hours in PENDING_HOURS},
+    }
+    sums = pd.concat([candidates[keys], pd.DataFrame(per_candidate)], axis=1).groupby(
+        keys, observed=True, sort=False
+    ).sum()
+
+    def ratio(numerator, denominator, scale=1):
+        return sums[numerator] / sums[denominator].where(sums[denominator] > 0) * scale
+
+    sums['简历筛选总数'] = sums['收到简历总数']
+    sums['接受Offer数'] = sums['总招聘人数']
+    sums['简历初筛通过率_%'] = ratio('初筛通过简历数', '收到简历总数', 100)
+    sums['面试通过率_%'] = ratio('发出Offer数', '面试人数', 100)
+    sums['录用接受率_%'] = ratio('接受Offer数', '发出Offer数', 100)
+    sums['全流程转化率_%'] = ratio('总招聘人数', '收到简历总数', 100)
+    sums['平均录用速度_天'] = ratio('_录用天数', '总招聘人数')
+    sums['阶段周转时间_天'] = ratio('_流转天数', '_流转次数')
+    sums['面试反馈速度_小时'] = ratio('_反馈小时', '_反馈次数')
+    sums['流程停滞天数'] = ratio('_停滞天数', '_停滞人数')
+    return sums[DERIVED_COLUMNS]
+
+
+def _apply_derived(facts, derived):
+    """
+    用推导值覆盖汇总表的 DERIVED_COLUMNS, 保持原列类型;
+    没有候选人的网格行计数为 0, 无法推导的比率和平均值 (如当月没有入职, 没有录用速度) 保留随机生成的值
+    """
+    derived = derived.reindex(pd.MultiIndex.from_arrays([facts['月份'], facts['招聘顾问'], facts['部门']]))
+    counts = [column for column in DERIVED_COLUMNS if column not in _RATIO_COLUMNS]
+    derived[counts] = derived[counts].fillna(0)
+    for column in DERIVED_COLUMNS:
+        values = derived[column].to_numpy(dtype=np.float64)
+        if column in ('录用接受率_%', '全流程转化率_%'):
+            # 与 generate_complete_recruitment_data 相同, 分母为 0 时为 NaN
+            facts[column] = values
+            continue
+        values = np.where(np.isnan(values), facts[column].to_numpy(dtype=np.float64), values)
+        if np.issubdtype(facts[column].dtype, np.integer):
+            values = np.round(values)
+        facts[column] = values.astype(facts[column].dtype)
+    return facts
+
+
+def stream_candidate_event_data(months=12, recruiters=5, departments=5, events_path='candidate_events.parquet',
+                                chunk_cells=EVENT_CHUNK_CELLS, seed=42, as_of=None, mode='replace'):
+    """
+    逐块生成事件日志: 推导出的汇总表写入事实表 (DBManager.import_batches), 事件写入 events_path 的 Parquet 文件
+    返回 (导入后库中的行数, 写入的事件数)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from db_manager import DBManager
+
+    writer = None
+    written = 0
+
+    def facts_batches():
+        nonlocal writer, written
+        for facts, events in iter_candidate_event_chunks(months, recruiters, departments,
+                                                         chunk_cells=chunk_cells, seed=seed, as_of=as_of):
+            table = pa.Table.from_pandas(events, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(events_path, table.schema, compression='zstd')
+            writer.write_table(table)
+            written += len(events)
+            yield facts
+
+    db = DBManager()
+    try:
+        ok, msg = db.import_batches(facts_batches(), mode=mode)
+    finally:
+        if writer is not None:
+            writer.close()
+    if not ok:
+        raise RuntimeError(f"Seeding failed: {msg}")
+    print(msg)
+    return db.count_rows(), written
+
+
+if __name__ == '__main__':
+    # python candidate_event_generator.py [months recruiters departments] [events.parquet]
+    import sys
+    import time
+
+    args = sys.argv[1:]
+    dims = [int(a) for a in args[:3]] if len(args) >= 3 else [12, 5, 5]
+    path = args[3] if len(args) == 4 else (args[0] if len(args) == 1 else 'candidate_events.parquet')
+    start = time.perf_counter()
+    rows, events = stream_candidate_event_data(*dims, events_path=path)
+    elapsed = time.perf_counter() - start
+    print(f"{events:,} 个事件 -> {path}, 汇总表 {rows:,} 行, 用时 {elapsed:.1f}s ({events / elapsed:,.0f} 事件/秒)")
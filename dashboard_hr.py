@@ -22,6 +22,9 @@ from brand_color_system import get_brand_colors, get_primary_color, get_brand_fo
 # 导入翻转卡片系统
 from flip_card_system import inject_flip_card_css, render_metric_flip_card
 
+# 导入指标计算引擎
+from metric_engine import compute_kpis
+
 
 # ==========================================
 # HR 核心执行指标定义
@@ -32,6 +35,7 @@ HR_EXECUTION_METRICS = {
         'name': '今日待办候选人数',
         'name_en': 'Action Required Candidates',
         'category': '每日作战',
+        'agg': 'last',
         'unit': '人',
         'formula': 'Count(状态=待处理 AND 停留时间>24h)',
         'definition': '列出所有卡在待筛选、待安排环节超过招聘周期时限的候选人',
@@ -50,6 +54,7 @@ HR_EXECUTION_METRICS = {
         'name': '流程停滞天数',
         'name_en': 'Stuck Days',
         'category': '流程卫生',
+        'agg': 'max',
         'unit': '天',
         'formula': '候选人在当前状态的停留天数',
         'definition': '监控每一个候选人的"静止时间"',
@@ -68,6 +73,7 @@ HR_EXECUTION_METRICS = {
         'name': '即将到来的面试',
         'name_en': 'Upcoming Interviews',
         'category': '日程管理',
+        'agg': 'sum',
         'unit': '场',
         'formula': '未来24/48小时内的面试安排列表',
         'definition': '确保面试官和候选人都已确认出席',
@@ -86,6 +92,7 @@ HR_EXECUTION_METRICS = {
         'name': '个人漏斗转化率',
         'name_en': 'Personal Conversion Rate',
         'category': '自我修正',
+        'agg': 'mean',
         'unit': '%',
         'formula': '我推荐的简历通过数 / 我推荐的简历总数 × 100%',
         'definition': '衡量个人推人的"精准度"',
@@ -104,6 +111,7 @@ HR_EXECUTION_METRICS = {
         'name': '个人月度招聘指标达成进度',
         'name_en': 'SLA Progress',
         'category': '结果交付',
+        'agg': 'mean',
         'unit': '%',
         'formula': '本月已入职数 / 本月承诺目标数 × 100%',
         'definition': '最直观的业绩进度条',
@@ -119,6 +127,11 @@ HR_EXECUTION_METRICS = {
     }
 }
 
+# 卡片上展示的辅助数值 (与核心指标在同一次聚合中计算)
+HR_KPI_EXTRAS = {
+    '面试确认率_%': 'mean',
+}
+
 
 # ==========================================
 # 任务优先级定义
@@ -306,13 +319,15 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
     st.subheader("📊 我的核心指标")
 
     kpi_cols = st.columns(5)
+    # 全部卡片 (及下方指标矩阵) 的值在一次聚合中算出
+    kpis = compute_kpis(df_filtered, HR_EXECUTION_METRICS, HR_KPI_EXTRAS)
 
     # KPI 1: 待处理候选人数
     with kpi_cols[0]:
         metric_key = '待处理候选人数'
         metric_info = HR_EXECUTION_METRICS[metric_key]
 
-        current_value = df_filtered[metric_key].iloc[-1] if len(df_filtered) > 0 else 0
+        current_value = kpis[metric_key] if len(df_filtered) > 0 else 0
         target_value = 15.0  # 正常阈值
 
         render_metric_flip_card(
@@ -333,7 +348,7 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
         metric_key = '流程停滞天数'
         metric_info = HR_EXECUTION_METRICS[metric_key]
 
-        current_value = df_filtered[metric_key].max() if len(df_filtered) > 0 else 0
+        current_value = kpis[metric_key] if len(df_filtered) > 0 else 0
         target_value = 3.0  # 正常阈值
 
         render_metric_flip_card(
@@ -354,8 +369,8 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
         metric_key = '今日面试数'
         metric_info = HR_EXECUTION_METRICS[metric_key]
 
-        current_value = df_filtered['今日面试数'].sum() if len(df_filtered) > 0 else 0
-        confirm_rate = df_filtered['面试确认率_%'].mean() if len(df_filtered) > 0 else 100
+        current_value = kpis[metric_key] if len(df_filtered) > 0 else 0
+        confirm_rate = kpis['面试确认率_%'] if len(df_filtered) > 0 else 100
         target_value = confirm_rate  # 使用确认率作为参考
 
         render_metric_flip_card(
@@ -376,7 +391,7 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
         metric_key = '个人转化率_%'
         metric_info = HR_EXECUTION_METRICS[metric_key]
 
-        current_value = df_filtered[metric_key].mean() if len(df_filtered) > 0 else 0
+        current_value = kpis[metric_key] if len(df_filtered) > 0 else 0
         target_value = 30.0  # 优秀标准
 
         render_metric_flip_card(
@@ -397,7 +412,7 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
         metric_key = '月度SLA达成进度_%'
         metric_info = HR_EXECUTION_METRICS[metric_key]
 
-        current_value = df_filtered[metric_key].mean() if len(df_filtered) > 0 else 0
+        current_value = kpis[metric_key] if len(df_filtered) > 0 else 0
         target_value = 100.0  # 目标100%
 
         render_metric_flip_card(
@@ -427,14 +442,8 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
 
     for metric_key, metric_info in HR_EXECUTION_METRICS.items():
         if metric_key in df_filtered.columns:
-            if metric_key == '待处理候选人数':
-                current_val = df_filtered[metric_key].iloc[-1] if len(df_filtered) > 0 else 0
-            elif metric_key == '流程停滞天数':
-                current_val = df_filtered[metric_key].max() if len(df_filtered) > 0 else 0
-            elif metric_key == '今日面试数':
-                current_val = df_filtered[metric_key].sum() if len(df_filtered) > 0 else 0
-            else:
-                current_val = df_filtered[metric_key].mean() if len(df_filtered) > 0 else 0
+            # 聚合方式见注册表中的 'agg' (最新值 / 最大值 / 合计 / 平均)
+            current_val = kpis[metric_key] if len(df_filtered) > 0 else 0
 
             metrics_table.append({
                 '指标名称': metric_info['name'],
@@ -1089,7 +1098,7 @@ def render_hr_dashboard(df, selected_recruiter='张伟'):
         
         with col1:
             # 按部门和原因统计
-            sunburst_data = rejected_df.groupby(['部门', '拒签原因']).size().reset_index(name='人数')
+            sunburst_data = rejected_df.groupby(['部门', '拒签原因'], observed=True).size().reset_index(name='人数')
             
             # 创建Sunburst图（联动环形图）
             fig_sunburst = px.sunburst(
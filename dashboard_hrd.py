@@ -17,6 +17,12 @@ from brand_color_system import get_brand_colors, get_primary_color, get_brand_fo
 # 导入翻转卡片系统
 from flip_card_system import inject_flip_card_css, render_metric_flip_card
 
+# 导入指标计算引擎
+from metric_engine import compute_kpis
+
+# 导入派生字段层
+from derived_columns import derive_columns, apply_derived_columns
+
 
 # ==========================================
 # HRD 核心指标定义 (带预警阈值)
@@ -27,6 +33,7 @@ HRD_EXCEPTION_METRICS = {
         'name': '月度招聘完成率',
         'name_en': 'Completion Rate',
         'category': '交付进度',
+        'agg': 'mean',
         'unit': '%',
         'formula': '本月已入职 / 本月计划数 × 100%',
         'definition': '衡量招聘计划的达成进度，低于85%视为红色预警',
@@ -45,6 +52,7 @@ HRD_EXCEPTION_METRICS = {
         'name': '关键岗位平均到岗周期',
         'name_en': 'Critical Roles Time to Fill',
         'category': '核心效率',
+        'agg': 'mean',
         'unit': '天',
         'formula': 'P7及以上岗位从需求审批到入职的平均天数',
         'definition': '核心战斗力补充速度，超过60天严重影响业务',
@@ -63,6 +71,7 @@ HRD_EXCEPTION_METRICS = {
         'name': '候选人体验 NPS',
         'name_en': 'Candidate NPS',
         'category': '雇主品牌',
+        'agg': 'mean',
         'unit': '分',
         'formula': 'NPS推荐者% - 贬损者%',
         'definition': '衡量面试流程体验，防止因为招聘得罪潜在人才',
@@ -81,6 +90,7 @@ HRD_EXCEPTION_METRICS = {
         'name': '试用期流失率',
         'name_en': 'Probation Turnover',
         'category': '人岗匹配',
+        'agg': 'mean',
         'unit': '%',
         'formula': '试用期离职人数 / 同期入职人数 × 100%',
         'definition': '衡量招聘质量，新人留不住说明"选"或"育"出了问题',
@@ -99,6 +109,7 @@ HRD_EXCEPTION_METRICS = {
         'name': 'Recruiter人均月招聘负载',
         'name_en': 'Workload per Recruiter',
         'category': '团队负荷',
+        'agg': 'mean',
         'unit': '人',
         'formula': '在手HC总数 / 招聘团队人数',
         'definition': '衡量团队是否过载，过载会导致所有指标全线崩盘',
@@ -119,10 +130,72 @@ HRD_EXCEPTION_METRICS = {
 # HRD 看板渲染函数
 # ==========================================
 
-def render_hrd_dashboard(df):
+# 招聘顾问全流程热力图使用的漏斗列 (按顾问求和)
+HRD_FUNNEL_COLUMNS = ['收到简历总数', '初筛通过简历数', '面试人数', '发出Offer数', '接受Offer数']
+
+
+# ==========================================
+# 数据补全与映射 (防止KeyError)
+# ==========================================
+# 核心异常指标在数据中缺失时的派生规则 (见 derived_columns): 优先由已有字段映射, 否则模拟
+HRD_SIMULATION_SEED = 42
+
+
+def _simulate_candidate_nps(df, rng):
+    """
+    模拟候选人体验NPS: N(50, 15) 加上每个部门固定的偏移 (-15 ~ 14), 截断到 0 ~ 100
+    """
+    codes, depts = pd.factorize(df['部门'])
+    dept_offsets = rng.integers(-15, 15, len(depts))
+    offsets = np.where(codes >= 0, dept_offsets[codes], 0) if len(depts) else 0
+    return np.clip(rng.normal(50, 15, len(df)) + offsets, 0, 100)
+
+
+HRD_DERIVED_COLUMNS = {
+    # 1. 招聘完成率 (截断到100%)
+    '招聘完成率_%': [
+        (['招聘及时率_%'], lambda df, rng: (df['招聘及时率_%'] * rng.uniform(0.9, 1.1, len(df))).clip(upper=100)),
+        ([], lambda df, rng: rng.uniform(80, 100, len(df))),
+    ],
+    # 2. 关键岗位到岗周期 (关键岗位通常比平均慢 1.5倍)
+    '关键岗位到岗周期_天': [
+        (['平均招聘周期_天'], lambda df, rng: df['平均招聘周期_天'] * 1.5),
+        ([], lambda df, rng: rng.integers(40, 90, len(df))),
+    ],
+    # 3. 候选人体验NPS
+    '候选人体验NPS': [
+        (['候选人NPS'], lambda df, rng: df['候选人NPS']),
+        (['部门'], _simulate_candidate_nps),
+    ],
+    # 4. 试用期流失率 (100 - 转正率, 或早期离职率)
+    '试用期流失率_%': [
+        (['试用期转正率_%'], lambda df, rng: 100 - df['试用期转正率_%']),
+        (['新员工早期离职率_%'], lambda df, rng: df['新员工早期离职率_%']),
+        ([], lambda df, rng: rng.uniform(5, 25, len(df))),
+    ],
+    # 5. 人均月招聘负载
+    '人均月招聘负载_人': [
+        (['HR人均月招聘负载_人'], lambda df, rng: df['HR人均月招聘负载_人']),
+        ([], lambda df, rng: rng.uniform(3, 10, len(df))),
+    ],
+}
+
+
+def derive_hrd_columns(df):
+    """
+    按 HRD_DERIVED_COLUMNS 生成 df 缺少的核心异常指标列 (可按数据版本缓存)
+    """
+    return derive_columns(df, HRD_DERIVED_COLUMNS, seed=HRD_SIMULATION_SEED)
+
+
+def render_hrd_dashboard(df, rollups=None, derived=None):
     """
     渲染 HRD 异常报警器
+    rollups: 可选的预聚合结果 (DBManager.get_rollup), 键为 'dept' / 'recruiter';
+             提供时按部门/按顾问的图表直接读取汇总表, 否则在 df 上 groupby
+    derived: 预先生成 (并缓存) 的派生字段, 见 derive_hrd_columns
     """
+    rollups = rollups or {}
 
     colors = get_brand_colors()
     primary_color = get_primary_color()
@@ -146,58 +219,10 @@ def render_hrd_dashboard(df):
 
     st.markdown("---")
 
-    df_filtered = df.copy()
-
-    # ==========================================
-    # 数据补全与映射 (防止KeyError)
-    # ==========================================
-    
-    # 1. 招聘完成率 (如果没有则模拟)
-    if '招聘完成率_%' not in df_filtered.columns:
-        if '招聘及时率_%' in df_filtered.columns:
-            df_filtered['招聘完成率_%'] = df_filtered['招聘及时率_%'] * np.random.uniform(0.9, 1.1, len(df_filtered))
-        else:
-            df_filtered['招聘完成率_%'] = np.random.uniform(80, 100, len(df_filtered))
-        # 截断到100%
-        df_filtered['招聘完成率_%'] = df_filtered['招聘完成率_%'].clip(upper=100)
-
-    # 2. 关键岗位到岗周期 (如果没有则基于平均周期模拟)
-    if '关键岗位到岗周期_天' not in df_filtered.columns:
-        if '平均招聘周期_天' in df_filtered.columns:
-            # 关键岗位通常比平均慢 1.5倍
-            df_filtered['关键岗位到岗周期_天'] = df_filtered['平均招聘周期_天'] * 1.5
-        else:
-            df_filtered['关键岗位到岗周期_天'] = np.random.randint(40, 90, len(df_filtered))
-
-    # 3. 候选人体验NPS (映射或模拟)
-    if '候选人体验NPS' not in df_filtered.columns:
-        if '候选人NPS' in df_filtered.columns:
-            df_filtered['候选人体验NPS'] = df_filtered['候选人NPS']
-        else:
-            # 模拟生成
-            np.random.seed(42)
-            depts = df_filtered['部门'].unique()
-            dept_offsets = {dept: np.random.randint(-15, 15) for dept in depts}
-            df_filtered['候选人体验NPS'] = np.random.normal(50, 15, len(df_filtered))
-            df_filtered['候选人体验NPS'] = df_filtered.apply(
-                lambda x: np.clip(x['候选人体验NPS'] + dept_offsets.get(x['部门'], 0), 0, 100), axis=1
-            )
-            
-    # 4. 试用期流失率 (如果没有则用 100 - 转正率 或模拟)
-    if '试用期流失率_%' not in df_filtered.columns:
-        if '试用期转正率_%' in df_filtered.columns:
-            df_filtered['试用期流失率_%'] = 100 - df_filtered['试用期转正率_%']
-        elif '新员工早期离职率_%' in df_filtered.columns:
-             df_filtered['试用期流失率_%'] = df_filtered['新员工早期离职率_%']
-        else:
-            df_filtered['试用期流失率_%'] = np.random.uniform(5, 25, len(df_filtered))
-            
-    # 5. 人均月招聘负载 (如果没有则模拟)
-    if '人均月招聘负载_人' not in df_filtered.columns:
-        if 'HR人均月招聘负载_人' in df_filtered.columns:
-            df_filtered['人均月招聘负载_人'] = df_filtered['HR人均月招聘负载_人']
-        else:
-            df_filtered['人均月招聘负载_人'] = np.random.uniform(3, 10, len(df_filtered))
+    # 补全缺失的核心异常指标 (规则见 HRD_DERIVED_COLUMNS)
+    if derived is None:
+        derived = derive_hrd_columns(df)
+    df_filtered = apply_derived_columns(df, derived)
 
     # ==========================================
     # 核心预警KPI卡片
@@ -207,6 +232,8 @@ def render_hrd_dashboard(df):
     st.info("💡 **点击卡片翻转** - 查看指标定义、预警阈值和老板关注点")
 
     kpi_cols = st.columns(5)
+    # 全部卡片的值在一次聚合中算出
+    kpis = compute_kpis(df_filtered, HRD_EXCEPTION_METRICS)
     
     # 辅助函数：根据阈值判断颜色
     def get_status_color(val, metric_key):
@@ -228,32 +255,32 @@ def render_hrd_dashboard(df):
     # KPI 1: 完成率
     with kpi_cols[0]:
         key = '招聘完成率_%'
-        val = df_filtered[key].mean()
+        val = kpis[key]
         render_metric_flip_card(key, HRD_EXCEPTION_METRICS[key], val, 95.0, 'HRD')
 
     # KPI 2: 到岗周期
     with kpi_cols[1]:
         key = '关键岗位到岗周期_天'
-        val = df_filtered[key].mean()
+        val = kpis[key]
         render_metric_flip_card(key, HRD_EXCEPTION_METRICS[key], val, 45.0, 'HRD')
 
     # KPI 3: NPS
     with kpi_cols[2]:
         key = '候选人体验NPS'
         info = HRD_EXCEPTION_METRICS[key]
-        val = df_filtered[key].mean()
+        val = kpis[key]
         render_metric_flip_card(key, info, val, 50.0, 'HRD')
 
     # KPI 4: 流失率
     with kpi_cols[3]:
         key = '试用期流失率_%'
-        val = df_filtered[key].mean()
+        val = kpis[key]
         render_metric_flip_card(key, HRD_EXCEPTION_METRICS[key], val, 10.0, 'HRD')
 
     # KPI 5: 负载
     with kpi_cols[4]:
         key = '人均月招聘负载_人'
-        val = df_filtered[key].mean()
+        val = kpis[key]
         render_metric_flip_card(key, HRD_EXCEPTION_METRICS[key], val, 5.0, 'HRD')
 
     st.markdown("---")
@@ -264,7 +291,7 @@ def render_hrd_dashboard(df):
     
     st.subheader("2️⃣ 部门异常概览矩阵")
     
-    dept_metrics = df_filtered.groupby('部门').agg({
+    dept_metrics = df_filtered.groupby('部门', observed=True).agg({
         '招聘完成率_%': 'mean',
         '关键岗位到岗周期_天': 'mean',
         '候选人体验NPS': 'mean',
@@ -320,7 +347,11 @@ def render_hrd_dashboard(df):
     with col_l:
         # Chart 3: NPS Heatmap
         st.markdown("#### 3️⃣ 候选人体验热力图 (按部门)")
-        nps_dept = df_filtered.groupby('部门')['候选人体验NPS'].mean().reset_index()
+        dept_rollup = rollups.get('dept')
+        if '候选人体验NPS' not in df.columns and dept_rollup is not None and '候选人NPS' in dept_rollup.columns:
+            nps_dept = dept_rollup[['部门', '候选人NPS']].rename(columns={'候选人NPS': '候选人体验NPS'})
+        else:
+            nps_dept = df_filtered.groupby('部门', observed=True)['候选人体验NPS'].mean().reset_index()
         
         # [Data Capture] 候选人体验热力图
         st.session_state['current_charts_data']['HRD - 候选人体验热力图'] = nps_dept
@@ -342,13 +373,17 @@ def render_hrd_dashboard(df):
 
         # 1. 准备数据
         # 聚合基础数据
-        heatmap_base = df_filtered.groupby('招聘顾问').agg({
-            '收到简历总数': 'sum',      # 初筛复核
-            '初筛通过简历数': 'sum',    # 业务初筛
-            '面试人数': 'sum',          # 业务面试 (作为基准)
-            '发出Offer数': 'sum',       # 沟通Offer (作为基准)
-            '接受Offer数': 'sum'        # 入职
-        }).reset_index()
+        recruiter_rollup = rollups.get('recruiter')
+        if recruiter_rollup is not None and set(HRD_FUNNEL_COLUMNS) <= set(recruiter_rollup.columns):
+            heatmap_base = recruiter_rollup[['招聘顾问'] + HRD_FUNNEL_COLUMNS]
+        else:
+            heatmap_base = df_filtered.groupby('招聘顾问', observed=True).agg({
+                '收到简历总数': 'sum',      # 初筛复核
+                '初筛通过简历数': 'sum',    # 业务初筛
+                '面试人数': 'sum',          # 业务面试 (作为基准)
+                '发出Offer数': 'sum',       # 沟通Offer (作为基准)
+                '接受Offer数': 'sum'        # 入职
+            }).reset_index()
 
         # 2. 衍生中间环节数据 (模拟漏斗逻辑)
         # 逻辑：根据标准转化率推算中间环节，构建完整漏斗
@@ -17,6 +17,9 @@ from brand_color_system import get_brand_colors, get_primary_color, get_brand_fo
 # 导入翻转卡片系统
 from flip_card_system import inject_flip_card_css, render_metric_flip_card
 
+# 导入指标计算引擎
+from metric_engine import compute_kpis
+
 
 # ==========================================
 # HRVP 核心指标定义 (ROI 导向)
@@ -27,6 +30,7 @@ HRVP_CORE_METRICS = {
         'name': '招聘投资回报率 (ROI)',
         'name_en': 'Recruitment ROI',
         'category': '战略价值',
+        'agg': 'mean',
         'unit': 'x',
         'formula': '(新员工创造营收增量 - 招聘总成本) / 招聘总成本',
         'definition': '每投入1元招聘成本，为公司带来了多少倍的业务增值',
@@ -45,6 +49,12 @@ HRVP_CORE_METRICS = {
         'name': '关键战略岗位填补及时率',
         'name_en': 'Critical Role On-Time Fill Rate',
         'category': '战略交付',
+        'agg': {
+            # 到岗周期 < 45 天的关键岗位占比
+            'sql': '100.0 * COUNT(*) FILTER (WHERE "是否关键岗位" AND "到岗周期_天" < 45) '
+                   '/ NULLIF(COUNT(*) FILTER (WHERE "是否关键岗位"), 0)',
+            'columns': ['是否关键岗位', '到岗周期_天']
+        },
         'unit': '%',
         'formula': '按时到岗的关键岗位数 / 计划招聘关键岗位总数',
         'definition': 'P8及以上/核心技术/新业务负责人的到岗及时性',
@@ -81,6 +91,7 @@ HRVP_CORE_METRICS = {
         'name': '高绩效员工占比 (S/A级)',
         'name_en': 'High Performer Rate',
         'category': '人才质量',
+        'agg': 'mean',
         'unit': '%',
         'formula': '绩效评估为S/A级的新员工 / 总转正人数',
         'definition': '入职一年内绩效表现优异的比例',
@@ -114,14 +125,76 @@ HRVP_CORE_METRICS = {
     }
 }
 
+# 卡片背面展示的辅助数值 (与核心指标在同一次聚合中计算)
+HRVP_KPI_EXTRAS = {
+    '关键岗位_按时到岗数': {
+        'sql': 'COUNT(*) FILTER (WHERE "是否关键岗位" AND "到岗周期_天" < 45)',
+        'columns': ['是否关键岗位', '到岗周期_天']
+    },
+    '关键岗位_总数': {'sql': 'COUNT(*) FILTER (WHERE "是否关键岗位")', 'columns': ['是否关键岗位']},
+}
+
+
+# ==========================================
+# HRVP 数据增强与模拟
+# ==========================================
+# 数据中没有 ROI / 岗位职级 / 到岗周期时按以下规则模拟; 使用独立的随机数生成器,
+# 不修改全局 np.random 状态 (多个会话并发渲染时互不影响)
+HRVP_SIMULATION_SEED = 88
+HRVP_DEPT_BASE_ROI = {'销售部': 6.5, '技术部': 5.0, '产品部': 4.5, '运营部': 3.5}
+HRVP_DEFAULT_BASE_ROI = 3.0
+HRVP_JOB_LEVEL_PROBS = {'P9+': 0.05, 'P8': 0.15, 'P7': 0.3, 'P6-': 0.45, 'VP': 0.05}
+HRVP_CRITICAL_LEVELS = ['VP', 'P9+', 'P8']
+
+
+def simulate_hrvp_columns(df, seed=HRVP_SIMULATION_SEED):
+    """
+    向量化生成 df 缺少的模拟字段与关键岗位标记, 返回只包含这些列的 DataFrame (与 df 同索引)
+    结果只取决于 df 与 seed, 可按数据版本缓存
+    """
+    rng = np.random.default_rng(seed)
+    simulated = pd.DataFrame(index=df.index)
+
+    # 1. ROI: 部门基准 + 正态波动, 下限 1.0 (数据带有 'ROI' 列时不模拟)
+    if 'ROI' not in df.columns:
+        base_roi = df['部门'].map(HRVP_DEPT_BASE_ROI).astype(float).fillna(HRVP_DEFAULT_BASE_ROI)
+        simulated['招聘投资回报率_ROI'] = np.maximum(1.0, base_roi.to_numpy() + rng.normal(0, 0.8, len(df)))
+
+    # 2. 岗位职级
+    if '岗位职级' not in df.columns:
+        levels = list(HRVP_JOB_LEVEL_PROBS)
+        simulated['岗位职级'] = rng.choice(levels, len(df), p=list(HRVP_JOB_LEVEL_PROBS.values()))
+
+    # 3. 到岗周期 (确保完全没有空值)
+    if '到岗周期_天' not in df.columns:
+        simulated['到岗周期_天'] = rng.integers(20, 100, size=len(df))
+
+    levels = simulated['岗位职级'] if '岗位职级' in simulated.columns else df['岗位职级']
+    simulated['是否关键岗位'] = levels.isin(HRVP_CRITICAL_LEVELS)
+    return simulated
+
+
+def enrich_hrvp_data(df, simulated=None):
+    """
+    返回补上模拟字段与关键岗位标记的数据 (浅拷贝, 不修改 df)
+    simulated: 已缓存的 simulate_hrvp_columns(df) 结果; 为 None 时现场生成
+    """
+    if simulated is None:
+        simulated = simulate_hrvp_columns(df)
+    enriched = df.copy(deep=False)
+    for column in simulated.columns:
+        enriched[column] = simulated[column]
+    return enriched
+
 
 # ==========================================
 # HRVP 看板渲染函数
 # ==========================================
 
-def render_hrvp_dashboard(df):
+def render_hrvp_dashboard(df, simulated=None):
     """
     渲染 HRVP 战略驾驶舱 v3.2
+    simulated: 预先生成 (并缓存) 的模拟字段, 见 simulate_hrvp_columns
     """
 
     # 品牌色
@@ -152,45 +225,22 @@ def render_hrvp_dashboard(df):
     # ==========================================
     # 数据增强与模拟
     # ==========================================
-    df_filtered = df.copy()
-    np.random.seed(88)
-    
-    # 1. 模拟 ROI 数据
-    if 'ROI' not in df_filtered.columns:
-        def get_simulated_roi(row):
-            dept = row['部门']
-            base_roi = 3.0
-            if dept == '销售部': base_roi = 6.5
-            elif dept == '技术部': base_roi = 5.0
-            elif dept == '产品部': base_roi = 4.5
-            elif dept == '运营部': base_roi = 3.5
-            return max(1.0, base_roi + np.random.normal(0, 0.8))
-        df_filtered['招聘投资回报率_ROI'] = df_filtered.apply(get_simulated_roi, axis=1)
-
-    # 2. 模拟 关键岗位 及其 职级
-    if '岗位职级' not in df_filtered.columns:
-        levels = ['P9+', 'P8', 'P7', 'P6-', 'VP']
-        probs = [0.05, 0.15, 0.3, 0.45, 0.05]
-        df_filtered['岗位职级'] = np.random.choice(levels, len(df_filtered), p=probs)
-        
-    df_filtered['是否关键岗位'] = df_filtered['岗位职级'].isin(['VP', 'P9+', 'P8'])
-    
-    # 3. 模拟 到岗周期 (确保完全没有空值)
-    if '到岗周期_天' not in df_filtered.columns:
-         df_filtered['到岗周期_天'] = np.random.randint(20, 100, size=len(df_filtered))
-    
+    df_filtered = enrich_hrvp_data(df, simulated)
+
     # ==========================================
     # 核心KPI卡片
     # ==========================================
 
     st.subheader("🎯 核心战略指标")
     kpi_cols = st.columns(5)
+    # 全部卡片的值在一次聚合中算出
+    kpis = compute_kpis(df_filtered, HRVP_CORE_METRICS, HRVP_KPI_EXTRAS)
     
     # 1. 招聘 ROI
     with kpi_cols[0]:
         metric_key = '招聘投资回报率_ROI'
         info = HRVP_CORE_METRICS[metric_key]
-        val = df_filtered[metric_key].mean()
+        val = kpis[metric_key]
         render_metric_flip_card(metric_key, info, val, info['target'], 'HRVP', 
             raw_data_dict={'平均ROI': f"{val:.1f}x", '对标值': '5.0x'})
             
@@ -198,10 +248,9 @@ def render_hrvp_dashboard(df):
     with kpi_cols[1]:
         metric_key = '关键岗位填补及时率_%'
         info = HRVP_CORE_METRICS[metric_key]
-        critical_jobs = df_filtered[df_filtered['是否关键岗位']]
-        on_time_count = len(critical_jobs[critical_jobs['到岗周期_天'] < 45])
-        total_critical = len(critical_jobs)
-        val = (on_time_count / total_critical * 100) if total_critical > 0 else 0
+        on_time_count = int(kpis['关键岗位_按时到岗数'])
+        total_critical = int(kpis['关键岗位_总数'])
+        val = kpis[metric_key] if total_critical > 0 else 0
         render_metric_flip_card(metric_key, info, val, info['target'], 'HRVP',
              raw_data_dict={'按时到岗': on_time_count, '关键岗位总数': total_critical})
 
@@ -217,7 +266,7 @@ def render_hrvp_dashboard(df):
     with kpi_cols[3]:
         metric_key = '高绩效员工占比_%'
         info = HRVP_CORE_METRICS[metric_key]
-        val = df_filtered[metric_key].mean()
+        val = kpis[metric_key]
         render_metric_flip_card(metric_key, info, val, info['target'], 'HRVP',
             raw_data_dict={'S/A级员工': int(len(df_filtered)*val/100), '总人数': len(df_filtered)})
 
@@ -243,6 +292,7 @@ def render_hrvp_dashboard(df):
     
     # 模拟交付率趋势：VP很难，P9+一般，P8较好
     trend_data = []
+    trend_rng = np.random.default_rng(HRVP_SIMULATION_SEED)
     
     for m_idx, m in enumerate(months):
         for lvl in levels:
@@ -251,7 +301,7 @@ def render_hrvp_dashboard(df):
             if lvl == 'VP': base_rate = 0.55
             
             # 添加随机波动和上升趋势（假设在改进）
-            rate = min(1.0, base_rate + (m_idx * 0.01) + np.random.uniform(-0.05, 0.05))
+            rate = min(1.0, base_rate + (m_idx * 0.01) + trend_rng.uniform(-0.05, 0.05))
             
             trend_data.append({
                 '月份': m,
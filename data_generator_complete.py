@@ -6,380 +6,501 @@
 
 import pandas as pd
 import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
-def generate_complete_recruitment_data(months=12, recruiters=5, departments=5):
+# 人员维度: 前5个为固定姓名, 超出部分按编号补齐
+RECRUITER_NAMES = ['张伟', '李娜', '王芳', '刘洋', '陈静']
+DEPARTMENT_NAMES = ['技术部', '产品部', '市场部', '销售部', '运营部']
+
+# 职级
+LEVELS = ['初级', '中级', '高级', '专家', '管理层', 'P0战略级']
+
+# 渠道
+CHANNELS = ['招聘网站', '猎头', '内推', '校园招聘', '社交媒体', 'RPO']
+
+# 分块生成 (iter_recruitment_data_chunks) 时每块的行数: DuckDB 一个行组 (row group) 的大小,
+# 更小的块追加时会先写入 WAL, 导入明显变慢
+GENERATION_CHUNK_ROWS = 122_880
+
+# 生成器版本: 相同 seed 下生成结果变化时 (指标抽样逻辑、分块随机数流等) 加 1,
+# 缓存的数据集 (scale_profiles 的 fixture) 以此区分, 旧版本的缓存不再使用
+GENERATOR_VERSION = 3
+
+
+def _dimension_names(base_names, count, prefix):
     """
-    生成完整的企业级招聘数据
-    包含所有81个指标 (L1: 5个, L2: 27个, L3: 54个)
+    前 count 个名称: 先用 base_names, 不够时补 prefix+编号 (如 顾问006)
     """
-    np.random.seed(42)
+    extra = [f'{prefix}{i:03d}' for i in range(len(base_names) + 1, count + 1)]
+    return (list(base_names) + extra)[:count]
 
+
+def _grid(months, recruiters, departments):
+    """
+    网格的三个维度: (月份 DatetimeIndex, 招聘顾问 数组, 部门 数组)
+    """
     # 时间维度
     start_date = datetime(2025, 1, 1)
     date_range = pd.date_range(start=start_date, periods=months, freq='MS')
 
     # 人员维度
-    recruiter_names = ['张伟', '李娜', '王芳', '刘洋', '陈静'][:recruiters]
-    dept_names = ['技术部', '产品部', '市场部', '销售部', '运营部'][:departments]
-
-    # 职级
-    levels = ['初级', '中级', '高级', '专家', '管理层', 'P0战略级']
-
-    # 渠道
-    channels = ['招聘网站', '猎头', '内推', '校园招聘', '社交媒体', 'RPO']
-
-    all_data = []
-
-    for month_date in date_range:
-        for recruiter in recruiter_names:
-            for dept in dept_names:
-                # 基础维度
-                row = {
-                    '月份': month_date,
-                    '年份': month_date.year,
-                    '季度': f'Q{(month_date.month-1)//3 + 1}',
-                    '招聘顾问': recruiter,
-                    '部门': dept,
-                    '职级': np.random.choice(levels, p=[0.3, 0.3, 0.2, 0.1, 0.08, 0.02]),
-                    '渠道': np.random.choice(channels, p=[0.25, 0.20, 0.25, 0.15, 0.10, 0.05]),
-                }
-
-                # ==========================================
-                # 维度 A: 招聘速度与效率 (10个L2 + 10个L3)
-                # ==========================================
-
-                # L2: 平均招聘周期 (Time to Fill)
-                row['平均招聘周期_天'] = np.random.randint(20, 65)
-                # L3: 审批耗时
-                row['审批耗时_天'] = np.random.randint(2, 12)
-                # L3: 寻访耗时 (Time to Source)
-                row['寻访耗时_天'] = np.random.randint(5, 25)
-
-                # L2: 平均录用速度 (Time to Hire)
-                row['平均录用速度_天'] = np.random.randint(15, 50)
-                # L3: 流程停滞天数 (Stuck Days)
-                row['流程停滞天数'] = np.random.randint(0, 8)
-
-                # L2: 阶段周转时间 (Time in Stage)
-                row['阶段周转时间_天'] = np.random.randint(3, 15)
-                # L3: 面试反馈速度
-                row['面试反馈速度_小时'] = np.random.randint(12, 96)
-
-                # L2: 招聘及时率 (On-time Completion)
-                row['招聘及时率_%'] = np.random.uniform(65, 98)
-                # L3: 逾期职位数 (Overdue Reqs)
-                row['逾期职位数'] = np.random.randint(0, 8)
-
-                # L2: 职位老化率 (Aging Requisitions)
-                row['职位老化率_%'] = np.random.uniform(5, 30)
-                # L3: 重启职位数
-                row['重启职位数'] = np.random.randint(0, 5)
-
-                # ==========================================
-                # 维度 B: 招聘质量与结果 (7个L2 + 14个L3)
-                # ==========================================
-
-                # L2: 试用期转正率 (Probation Pass Rate)
-                row['试用期转正率_%'] = np.random.uniform(75, 98)
-                # L3: 试用期延长率
-                row['试用期延长率_%'] = np.random.uniform(2, 18)
-                # L3: 试用期失败归因_能力
-                row['试用期失败_能力不胜任_%'] = np.random.uniform(40, 70)
-                # L3: 试用期失败归因_价值观
-                row['试用期失败_价值观不合_%'] = np.random.uniform(10, 30)
-                # L3: 试用期失败归因_其他
-                row['试用期失败_其他_%'] = np.random.uniform(10, 30)
-
-                # L2: 新员工首年绩效 (First Year Performance)
-                row['新员工首年绩效_分'] = np.random.uniform(3.2, 4.8)
-                # L3: 绩效校准差异
-                row['绩效校准差异_分'] = np.random.uniform(0.1, 1.0)
-
-                # L2: 新员工早期离职率 (Early Turnover)
-                row['新员工早期离职率_%'] = np.random.uniform(3, 22)
-                # L3: 首月流失率 (Infant Mortality)
-                row['首月流失率_%'] = np.random.uniform(1, 10)
-
-                # L2: 用人经理满意度 (Hiring Manager Satisfaction)
-                row['用人经理满意度_分'] = np.random.uniform(3.0, 5.0)
-                # L3: 简历质量满意度
-                row['简历质量满意度_分'] = np.random.uniform(2.8, 5.0)
-
-                # L2: 关键岗位达成率 (Critical Role Fill)
-                row['关键岗位达成率_%'] = np.random.uniform(70, 100)
-                # L3: 核心岗空窗期
-                row['核心岗空窗期_天'] = np.random.randint(10, 90)
-
-                # L2: 入职职级分布 (New Hire by Level)
-                row['入职人数_初级'] = np.random.randint(0, 5)
-                row['入职人数_中级'] = np.random.randint(0, 4)
-                row['入职人数_高级'] = np.random.randint(0, 3)
-                row['入职人数_专家'] = np.random.randint(0, 2)
-                row['入职人数_管理层'] = np.random.randint(0, 2)
-                row['入职人数_P0战略级'] = np.random.randint(0, 1)
-
-                # ==========================================
-                # 维度 C: 漏斗与转化 (5个L2 + 12个L3)
-                # ==========================================
-
-                # L2: 录用接受率 (Offer Acceptance Rate)
-                row['录用接受率_%'] = np.random.uniform(55, 92)
-                # L3: 薪酬竞争力_被拒Offer薪资分位值
-                row['被拒Offer薪资分位值'] = np.random.uniform(40, 75)
-                # L3: Offer拒绝归因_薪资低
-                row['Offer拒绝_薪资低_%'] = np.random.uniform(30, 60)
-                # L3: Offer拒绝归因_竞对截胡
-                row['Offer拒绝_竞对截胡_%'] = np.random.uniform(15, 40)
-                # L3: Offer拒绝归因_路程远
-                row['Offer拒绝_路程远_%'] = np.random.uniform(5, 20)
-                # L3: Offer拒绝归因_其他
-                row['Offer拒绝_其他_%'] = np.random.uniform(5, 25)
-
-                # L2: 全流程转化率 (Pass-through Rates)
-                row['全流程转化率_%'] = np.random.uniform(8, 25)
-                # L3: 简历初筛通过率
-                row['简历初筛通过率_%'] = np.random.uniform(15, 45)
-                # L3: 面试通过率
-                row['面试通过率_%'] = np.random.uniform(20, 60)
-
-                # L2: 渠道有效性 (Source Effectiveness)
-                row['渠道有效性_得分'] = np.random.uniform(60, 95)
-                # L3: 渠道简历转化率
-                row['渠道简历转化率_%'] = np.random.uniform(8, 38)
-
-                # L2: 候选人库覆盖率 (Pipeline Coverage)
-                row['候选人库覆盖率'] = np.random.uniform(1.2, 4.5)
-                # L3: 人才地图完备度
-                row['人才地图完备度_%'] = np.random.uniform(45, 95)
-
-                # ==========================================
-                # 维度 D: 成本与生产力 (4个L2 + 8个L3)
-                # ==========================================
-
-                # L2: 单次招聘成本 (Cost per Hire)
-                row['单次招聘成本_元'] = np.random.randint(3000, 25000)
-                # L3: 猎头费用占比
-                row['猎头费用占比_%'] = np.random.uniform(18, 55)
-                # L3: 渠道单价
-                row['渠道单价_元'] = np.random.randint(80, 1200)
-
-                # L2: 招聘顾问人效 (Recruiter Productivity)
-                row['招聘顾问人效_人'] = np.random.randint(3, 15)
-                # L3: 人均负责职位数 (Req Load)
-                row['人均负责职位数'] = np.random.randint(5, 20)
-
-                # L2: 招聘预算执行率 (Budget Utilization)
-                row['招聘预算执行率_%'] = np.random.uniform(75, 108)
-                # L3: 平均定薪涨幅
-                row['平均定薪涨幅_%'] = np.random.uniform(8, 35)
-
-                # ==========================================
-                # 维度 E: 体验与品牌 (5个L2 + 10个L3)
-                # ==========================================
-
-                # L2: 候选人净推荐值 (Candidate NPS)
-                row['候选人NPS'] = np.random.randint(-25, 65)
-                # L3: 面试官专业度评分
-                row['面试官专业度评分'] = np.random.uniform(3.0, 5.0)
-
-                # L2: 申请完成率 (Application Completion Rate)
-                row['申请完成率_%'] = np.random.uniform(55, 92)
-                # L3: 移动端申请占比
-                row['移动端申请占比_%'] = np.random.uniform(28, 75)
-
-                # L2: 幽灵率 (Ghosting Rate)
-                row['幽灵率_%'] = np.random.uniform(5, 28)
-                # L3: 面试爽约率
-                row['面试爽约率_%'] = np.random.uniform(3, 20)
-
-                # L2: 雇主品牌触达 (Brand Reach)
-                row['雇主品牌触达_PV'] = np.random.randint(3000, 80000)
-                # L3: 职位点击申请率
-                row['职位点击申请率_%'] = np.random.uniform(12, 50)
-
-                # L2: 多元化候选人占比 (Diversity Slate)
-                row['多元化候选人占比_%'] = np.random.uniform(22, 58)
-                # L3: Offer多元化率
-                row['Offer多元化率_%'] = np.random.uniform(18, 55)
-
-                # ==========================================
-                # HRVP 战略指标 (基于BI指标体系.json)
-                # ==========================================
-
-                # 关键战略岗位按时达成率
-                row['关键战略岗位按时达成率_%'] = np.random.uniform(70, 96)
-
-                # 空缺岗位预期收入损失
-                row['空缺岗位收入损失_万元'] = np.random.randint(30, 800)
-
-                # 高绩效员工渠道来源占比 (S/A级员工比例)
-                row['高绩效员工占比_%'] = np.random.uniform(55, 88)
-                row['高绩效员工_猎头来源_%'] = np.random.uniform(25, 50)
-                row['高绩效员工_内推来源_%'] = np.random.uniform(30, 55)
-                row['高绩效员工_自招来源_%'] = np.random.uniform(15, 30)
-
-                # 关键人才市场占有率
-                row['人才市场占有率_%'] = np.random.uniform(12, 38)
-                row['竞对挖角成功数'] = np.random.randint(0, 5)
-                row['竞对流失估算数'] = np.random.randint(10, 50)
-
-                # 组织人才结构健康度
-                row['组织结构健康度_得分'] = np.random.uniform(65, 95)
-                row['高P占比_%'] = np.random.uniform(8, 25)
-                row['初级占比_%'] = np.random.uniform(30, 60)
-
-                # ==========================================
-                # HRD 异常管理指标 (基于BI指标体系.json)
-                # ==========================================
-
-                # 部门招聘健康度
-                row['到岗周期逾期率_%'] = np.random.uniform(8, 38)
-                row['面试通过率异常_标志'] = np.random.choice([0, 0, 0, 1], p=[0.7, 0.1, 0.1, 0.1])
-                row['投诉量'] = np.random.randint(0, 8)
-                row['部门健康度_得分'] = np.random.uniform(60, 98)
-
-                # Offer毁约率
-                row['Offer毁约率_%'] = np.random.uniform(2, 18)
-                row['Offer毁约数'] = np.random.randint(0, 5)
-
-                # 供应商绩效
-                row['猎头转正率_%'] = np.random.uniform(70, 95)
-                row['猎头绩效_得分'] = np.random.uniform(60, 95)
-
-                # 漏斗转化率异常
-                row['漏斗异常_标志'] = np.random.choice([0, 0, 0, 1], p=[0.75, 0.1, 0.1, 0.05])
-                row['漏斗异常_环节'] = np.random.choice(['简历筛选', '初面', '二面', '终面', 'Offer'], p=[0.3, 0.25, 0.2, 0.15, 0.1])
-
-                # ==========================================
-                # HR 执行层指标 (基于BI指标体系.json)
-                # ==========================================
-
-                # 今日待办
-                row['待处理候选人数'] = np.random.randint(3, 35)
-                row['待处理_超24小时数'] = np.random.randint(0, 15)
-                row['待处理_超48小时数'] = np.random.randint(0, 8)
-                row['待处理_超72小时数'] = np.random.randint(0, 5)
-
-                # 即将到来的面试
-                row['今日面试数'] = np.random.randint(0, 10)
-                row['明日面试数'] = np.random.randint(0, 12)
-                row['未来48小时面试数'] = np.random.randint(0, 20)
-                row['面试确认率_%'] = np.random.uniform(75, 98)
-
-                # 个人漏斗转化率
-                row['个人推荐简历数'] = np.random.randint(20, 80)
-                row['个人简历通过数'] = np.random.randint(5, 30)
-                row['个人转化率_%'] = np.random.uniform(15, 45)
-
-                # 个人月度SLA
-                row['月度目标入职数'] = np.random.randint(5, 15)
-                row['月度已入职数'] = np.random.randint(0, 18)
-                row['月度SLA达成进度_%'] = np.random.uniform(50, 120)
-
-                # ==========================================
-                # 辅助字段
-                # ==========================================
-                row['总招聘人数'] = (row['入职人数_初级'] + row['入职人数_中级'] +
-                                   row['入职人数_高级'] + row['入职人数_专家'] +
-                                   row['入职人数_管理层'] + row['入职人数_P0战略级'])
-                row['发出Offer数'] = np.random.randint(row['总招聘人数'], row['总招聘人数'] + 8)
-                row['接受Offer数'] = row['总招聘人数']
-
-                # 简历量
-                row['收到简历总数'] = np.random.randint(100, 500)
-                row['简历筛选总数'] = row['收到简历总数']  # 简历筛选总数 = 收到简历总数
-                row['初筛通过简历数'] = int(row['收到简历总数'] * row['简历初筛通过率_%'] / 100)
-                row['面试人数'] = int(row['初筛通过简历数'] * 0.7)
-
-                # ==========================================
-                # 硅碳比相关数据 (AI + HR协同效能)
-                # ==========================================
-                # 碳基HR人力资源数
-                row['HR团队人数'] = np.random.randint(3, 12)
-                row['HR人均日处理简历量'] = np.random.randint(180, 620)
-                row['HR人均日有效工时_小时'] = np.random.uniform(4.0, 7.5)
-                row['HR人均月招聘负载_人'] = np.random.uniform(2.5, 8.5)
-
-                # 硅基AI资源数
-                row['AI承接简历筛选率_%'] = np.random.uniform(55, 92)
-                row['AI承接岗位匹配率_%'] = np.random.uniform(60, 88)
-                row['AI承接面试邀约率_%'] = np.random.uniform(50, 78)
-                row['AI承接流程跟进率_%'] = np.random.uniform(65, 95)
-                row['AI平均承接率_%'] = (row['AI承接简历筛选率_%'] + row['AI承接岗位匹配率_%'] +
-                                       row['AI承接面试邀约率_%'] + row['AI承接流程跟进率_%']) / 4
-
-                # 硅碳协同效能
-                row['单简历处理成本_元'] = np.random.uniform(1.8, 8.5)
-                row['HR负载释放率_%'] = np.random.uniform(25, 82)
-                row['碳硅协同效率提升_%'] = np.random.uniform(85, 185)
-                row['高价值工作占比_%'] = np.random.uniform(45, 85)  # HR在高价值工作上的时间占比
-
-                # 硅碳比指标 (AI资源/HR资源)
-                ai_equivalent = row['AI平均承接率_%'] / 100 * row['HR团队人数']  # AI等效人力
-                row['硅碳比'] = round(ai_equivalent / row['HR团队人数'], 2) if row['HR团队人数'] > 0 else 0
-                row['硅碳协同健康度_得分'] = np.random.uniform(65, 95)
-
-                # ==========================================
-                # 校招候选人质量数据 (针对HRD和HR视角)
-                # ==========================================
-                # 院校层级分布
-                row['校招_C9联盟_%'] = np.random.uniform(5, 18)
-                row['校招_985非C9_%'] = np.random.uniform(12, 28)
-                row['校招_211核心_%'] = np.random.uniform(20, 40)
-                row['校招_海外QS50_%'] = np.random.uniform(3, 12)
-                row['校招_海外QS100_%'] = np.random.uniform(5, 15)
-                row['校招_普通一本_%'] = np.random.uniform(15, 35)
-
-                # 笔试面试质量
-                row['校招_平均笔试分'] = np.random.uniform(65, 88)
-                row['校招_平均面试分'] = np.random.uniform(68, 90)
-                row['校招_笔试通过率_%'] = np.random.uniform(55, 85)
-                row['校招_面试通过率_%'] = np.random.uniform(60, 88)
-
-                # Offer等级分布
-                row['校招_S级SSP占比_%'] = np.random.uniform(8, 22)
-                row['校招_A级SP占比_%'] = np.random.uniform(25, 45)
-                row['校招_B级Normal占比_%'] = np.random.uniform(35, 60)
-
-                # 签约与流失
-                row['校招_Offer发放数'] = np.random.randint(8, 35)
-                row['校招_已签约数'] = np.random.randint(5, 30)
-                row['校招_签约率_%'] = (row['校招_已签约数'] / row['校招_Offer发放数'] * 100) if row['校招_Offer发放数'] > 0 else 0
-                row['校招_S级签约率_%'] = np.random.uniform(35, 65)  # S级人才签约率通常较低
-                row['校招_拒签原因_薪资_%'] = np.random.uniform(25, 50)
-                row['校招_拒签原因_竞对_%'] = np.random.uniform(20, 45)
-                row['校招_拒签原因_地点_%'] = np.random.uniform(10, 25)
-                row['校招_拒签原因_其他_%'] = np.random.uniform(5, 20)
-
-                # 渠道来源
-                row['校招_内推占比_%'] = np.random.uniform(15, 40)
-                row['校招_宣讲会占比_%'] = np.random.uniform(25, 50)
-                row['校招_线上平台占比_%'] = np.random.uniform(20, 45)
-                row['校招_猎头占比_%'] = np.random.uniform(5, 15)
-
-                # 候选人综合质量评分 (基于多维度计算)
-                quality_score = (
-                    row['校招_平均笔试分'] * 0.3 +
-                    row['校招_平均面试分'] * 0.3 +
-                    row['校招_S级SSP占比_%'] * 2 +
-                    row['校招_签约率_%'] * 0.4
-                )
-                row['校招_综合质量得分'] = min(100, quality_score)
-
-                # 质量矩阵象限 (笔试 vs 面试)
-                if row['校招_平均笔试分'] >= 80 and row['校招_平均面试分'] >= 80:
-                    row['校招_质量象限'] = '右上-双高人才'
-                elif row['校招_平均笔试分'] >= 80 and row['校招_平均面试分'] < 80:
-                    row['校招_质量象限'] = '右下-技术强沟通弱'
-                elif row['校招_平均笔试分'] < 80 and row['校招_平均面试分'] >= 80:
-                    row['校招_质量象限'] = '左上-沟通强技术弱'
-                else:
-                    row['校招_质量象限'] = '左下-双低'
-
-                all_data.append(row)
-
-    df = pd.DataFrame(all_data)
+    recruiter_names = _dimension_names(RECRUITER_NAMES, recruiters, '顾问')
+    dept_names = _dimension_names(DEPARTMENT_NAMES, departments, '部门')
+    return date_range, np.array(recruiter_names), np.array(dept_names)
+
+
+def _grid_slice(grid, start, stop):
+    """
+    网格第 [start, stop) 行的 (月份, 招聘顾问, 部门) 列
+    行顺序与逐行生成相同: 月份 → 招聘顾问 → 部门
+    """
+    date_range, recruiter_names, dept_names = grid
+    index = np.arange(start, stop)
+    per_month = len(recruiter_names) * len(dept_names)
+    return (
+        date_range.values[index // per_month],
+        recruiter_names[(index // len(dept_names)) % len(recruiter_names)],
+        dept_names[index % len(dept_names)],
+    )
+
+
+def generate_complete_recruitment_data(months=12, recruiters=5, departments=5, seed=42,
+                                       workers=1, chunk_rows=GENERATION_CHUNK_ROWS):
+    """
+    生成完整的企业级招聘数据
+    包含所有81个指标 (L1: 5个, L2: 27个, L3: 54个)
+
+    每一列对网格的一块 (chunk_rows 行) 一次性抽取整列 NumPy 数组, 不修改全局随机状态;
+    workers > 1 时由进程池并行生成各块, 结果与 workers=1 逐位相同
+    """
+    return pd.concat(
+        iter_recruitment_data_chunks(months, recruiters, departments, chunk_rows=chunk_rows,
+                                     seed=seed, workers=workers),
+        ignore_index=True
+    )
+
+
+def iter_recruitment_data_chunks(months=12, recruiters=5, departments=5,
+                                 chunk_rows=GENERATION_CHUNK_ROWS, seed=42, workers=1):
+    """
+    按网格顺序逐块生成, 每块最多 chunk_rows 行
+    每块使用自己的随机数流 (_chunk_rng), 结果只取决于 seed 和 chunk_rows, 与 workers 无关;
+    workers > 1 时最多 2 × workers 块同时在途, 内存仍与总行数无关
+    """
+    return _iter_grid_chunks(_grid(months, recruiters, departments), chunk_rows, seed, workers)
+
+
+def _iter_grid_chunks(grid, chunk_rows, seed, workers):
+    """
+    iter_recruitment_data_chunks 的实现, 网格由调用方给出 (如 append_generated_months 的新月份)
+    """
+    date_range, recruiter_names, dept_names = grid
+    chunks = max(1, -(-len(date_range) * len(recruiter_names) * len(dept_names) // chunk_rows))
+    args = (grid, chunk_rows, seed)
+    if workers <= 1:
+        for index in range(chunks):
+            yield _generate_chunk(*args, index)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for index in range(chunks):
+            pending.append(pool.submit(_generate_chunk, *args, index))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _chunk_rng(seed, index):
+    """
+    第 index 块独立的随机数流 (等同于 SeedSequence(seed).spawn() 的第 index 个子序列)
+    seed 也可以是整数列表 (如 [seed, 起始月序号]), 得到另一组互不相关的随机数流
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def _generate_chunk(grid, chunk_rows, seed, index):
+    """
+    网格的第 index 块 (进程池任务, 需为模块级函数)
+    """
+    rows = len(grid[0]) * len(grid[1]) * len(grid[2])
+    start = index * chunk_rows
+    return _generate_rows(*_grid_slice(grid, start, min(start + chunk_rows, rows)), _chunk_rng(seed, index))
+
+
+def _generate_rows(month_col, recruiter_col, dept_col, rng):
+    """
+    为给定的 (月份, 招聘顾问, 部门) 行抽取全部指标列
+    """
+    n = len(month_col)
+
+    def uniform(low, high):
+        return rng.uniform(low, high, n)
+
+    def randint(low, high):
+        # 与 np.random.randint 相同: 不含 high
+        return rng.integers(low, high, n)
+
+    def choice(values, p):
+        return rng.choice(np.array(values), size=n, p=p)
+
+    month_index = pd.DatetimeIndex(month_col)
+
+    # 基础维度
+    row = {
+        '月份': month_col,
+        '年份': month_index.year.to_numpy(dtype=np.int64),
+        '季度': np.char.add('Q', ((month_index.month.to_numpy() - 1) // 3 + 1).astype(str)),
+        '招聘顾问': recruiter_col,
+        '部门': dept_col,
+        '职级': choice(LEVELS, p=[0.3, 0.3, 0.2, 0.1, 0.08, 0.02]),
+        '渠道': choice(CHANNELS, p=[0.25, 0.20, 0.25, 0.15, 0.10, 0.05]),
+    }
+
+    # ==========================================
+    # 维度 A: 招聘速度与效率 (10个L2 + 10个L3)
+    # ==========================================
+
+    # L2: 平均招聘周期 (Time to Fill)
+    row['平均招聘周期_天'] = randint(20, 65)
+    # L3: 审批耗时
+    row['审批耗时_天'] = randint(2, 12)
+    # L3: 寻访耗时 (Time to Source)
+    row['寻访耗时_天'] = randint(5, 25)
+
+    # L2: 平均录用速度 (Time to Hire)
+    row['平均录用速度_天'] = randint(15, 50)
+    # L3: 流程停滞天数 (Stuck Days)
+    row['流程停滞天数'] = randint(0, 8)
+
+    # L2: 阶段周转时间 (Time in Stage)
+    row['阶段周转时间_天'] = randint(3, 15)
+    # L3: 面试反馈速度
+    row['面试反馈速度_小时'] = randint(12, 96)
+
+    # L2: 招聘及时率 (On-time Completion)
+    row['招聘及时率_%'] = uniform(65, 98)
+    # L3: 逾期职位数 (Overdue Reqs)
+    row['逾期职位数'] = randint(0, 8)
+
+    # L2: 职位老化率 (Aging Requisitions)
+    row['职位老化率_%'] = uniform(5, 30)
+    # L3: 重启职位数
+    row['重启职位数'] = randint(0, 5)
+
+    # ==========================================
+    # 维度 B: 招聘质量与结果 (7个L2 + 14个L3)
+    # ==========================================
+
+    # L2: 试用期转正率 (Probation Pass Rate)
+    row['试用期转正率_%'] = uniform(75, 98)
+    # L3: 试用期延长率
+    row['试用期延长率_%'] = uniform(2, 18)
+    # L3: 试用期失败归因_能力
+    row['试用期失败_能力不胜任_%'] = uniform(40, 70)
+    # L3: 试用期失败归因_价值观
+    row['试用期失败_价值观不合_%'] = uniform(10, 30)
+    # L3: 试用期失败归因_其他
+    row['试用期失败_其他_%'] = uniform(10, 30)
+
+    # L2: 新员工首年绩效 (First Year Performance)
+    row['新员工首年绩效_分'] = uniform(3.2, 4.8)
+    # L3: 绩效校准差异
+    row['绩效校准差异_分'] = uniform(0.1, 1.0)
+
+    # L2: 新员工早期离职率 (Early Turnover)
+    row['新员工早期离职率_%'] = uniform(3, 22)
+    # L3: 首月流失率 (Infant Mortality)
+    row['首月流失率_%'] = uniform(1, 10)
+
+    # L2: 用人经理满意度 (Hiring Manager Satisfaction)
+    row['用人经理满意度_分'] = uniform(3.0, 5.0)
+    # L3: 简历质量满意度
+    row['简历质量满意度_分'] = uniform(2.8, 5.0)
+
+    # L2: 关键岗位达成率 (Critical Role Fill)
+    row['关键岗位达成率_%'] = uniform(70, 100)
+    # L3: 核心岗空窗期
+    row['核心岗空窗期_天'] = randint(10, 90)
+
+    # L2: 入职职级分布 (New Hire by Level)
+    row['入职人数_初级'] = randint(0, 5)
+    row['入职人数_中级'] = randint(0, 4)
+    row['入职人数_高级'] = randint(0, 3)
+    row['入职人数_专家'] = randint(0, 2)
+    row['入职人数_管理层'] = randint(0, 2)
+    row['入职人数_P0战略级'] = randint(0, 1)
+
+    # ==========================================
+    # 维度 C: 漏斗与转化 (5个L2 + 12个L3)
+    # ==========================================
+
+    # L2: 录用接受率 (Offer Acceptance Rate)
+    row['录用接受率_%'] = uniform(55, 92)
+    # L3: 薪酬竞争力_被拒Offer薪资分位值
+    row['被拒Offer薪资分位值'] = uniform(40, 75)
+    # L3: Offer拒绝归因_薪资低
+    row['Offer拒绝_薪资低_%'] = uniform(30, 60)
+    # L3: Offer拒绝归因_竞对截胡
+    row['Offer拒绝_竞对截胡_%'] = uniform(15, 40)
+    # L3: Offer拒绝归因_路程远
+    row['Offer拒绝_路程远_%'] = uniform(5, 20)
+    # L3: Offer拒绝归因_其他
+    row['Offer拒绝_其他_%'] = uniform(5, 25)
+
+    # L2: 全流程转化率 (Pass-through Rates)
+    row['全流程转化率_%'] = uniform(8, 25)
+    # L3: 简历初筛通过率
+    row['简历初筛通过率_%'] = uniform(15, 45)
+    # L3: 面试通过率
+    row['面试通过率_%'] = uniform(20, 60)
+
+    # L2: 渠道有效性 (Source Effectiveness)
+    row['渠道有效性_得分'] = uniform(60, 95)
+    # L3: 渠道简历转化率
+    row['渠道简历转化率_%'] = uniform(8, 38)
+
+    # L2: 候选人库覆盖率 (Pipeline Coverage)
+    row['候选人库覆盖率'] = uniform(1.2, 4.5)
+    # L3: 人才地图完备度
+    row['人才地图完备度_%'] = uniform(45, 95)
+
+    # ==========================================
+    # 维度 D: 成本与生产力 (4个L2 + 8个L3)
+    # ==========================================
+
+    # L2: 单次招聘成本 (Cost per Hire)
+    row['单次招聘成本_元'] = randint(3000, 25000)
+    # L3: 猎头费用占比
+    row['猎头费用占比_%'] = uniform(18, 55)
+    # L3: 渠道单价
+    row['渠道单价_元'] = randint(80, 1200)
+
+    # L2: 招聘顾问人效 (Recruiter Productivity)
+    row['招聘顾问人效_人'] = randint(3, 15)
+    # L3: 人均负责职位数 (Req Load)
+    row['人均负责职位数'] = randint(5, 20)
+
+    # L2: 招聘预算执行率 (Budget Utilization)
+    row['招聘预算执行率_%'] = uniform(75, 108)
+    # L3: 平均定薪涨幅
+    row['平均定薪涨幅_%'] = uniform(8, 35)
+
+    # ==========================================
+    # 维度 E: 体验与品牌 (5个L2 + 10个L3)
+    # ==========================================
+
+    # L2: 候选人净推荐值 (Candidate NPS)
+    row['候选人NPS'] = randint(-25, 65)
+    # L3: 面试官专业度评分
+    row['面试官专业度评分'] = uniform(3.0, 5.0)
+
+    # L2: 申请完成率 (Application Completion Rate)
+    row['申请完成率_%'] = uniform(55, 92)
+    # L3: 移动端申请占比
+    row['移动端申请占比_%'] = uniform(28, 75)
+
+    # L2: 幽灵率 (Ghosting Rate)
+    row['幽灵率_%'] = uniform(5, 28)
+    # L3: 面试爽约率
+    row['面试爽约率_%'] = uniform(3, 20)
+
+    # L2: 雇主品牌触达 (Brand Reach)
+    row['雇主品牌触达_PV'] = randint(3000, 80000)
+    # L3: 职位点击申请率
+    row['职位点击申请率_%'] = uniform(12, 50)
+
+    # L2: 多元化候选人占比 (Diversity Slate)
+    row['多元化候选人占比_%'] = uniform(22, 58)
+    # L3: Offer多元化率
+    row['Offer多元化率_%'] = uniform(18, 55)
+
+    # ==========================================
+    # HRVP 战略指标 (基于BI指标体系.json)
+    # ==========================================
+
+    # 关键战略岗位按时达成率
+    row['关键战略岗位按时达成率_%'] = uniform(70, 96)
+
+    # 空缺岗位预期收入损失
+    row['空缺岗位收入损失_万元'] = randint(30, 800)
+
+    # 高绩效员工渠道来源占比 (S/A级员工比例)
+    row['高绩效员工占比_%'] = uniform(55, 88)
+    row['高绩效员工_猎头来源_%'] = uniform(25, 50)
+    row['高绩效员工_内推来源_%'] = uniform(30, 55)
+    row['高绩效员工_自招来源_%'] = uniform(15, 30)
+
+    # 关键人才市场占有率
+    row['人才市场占有率_%'] = uniform(12, 38)
+    row['竞对挖角成功数'] = randint(0, 5)
+    row['竞对流失估算数'] = randint(10, 50)
+
+    # 组织人才结构健康度
+    row['组织结构健康度_得分'] = uniform(65, 95)
+    row['高P占比_%'] = uniform(8, 25)
+    row['初级占比_%'] = uniform(30, 60)
+
+    # ==========================================
+    # HRD 异常管理指标 (基于BI指标体系.json)
+    # ==========================================
+
+    # 部门招聘健康度
+    row['到岗周期逾期率_%'] = uniform(8, 38)
+    row['面试通过率异常_标志'] = choice([0, 0, 0, 1], p=[0.7, 0.1, 0.1, 0.1])
+    row['投诉量'] = randint(0, 8)
+    row['部门健康度_得分'] = uniform(60, 98)
+
+    # Offer毁约率
+    row['Offer毁约率_%'] = uniform(2, 18)
+    row['Offer毁约数'] = randint(0, 5)
+
+    # 供应商绩效
+    row['猎头转正率_%'] = uniform(70, 95)
+    row['猎头绩效_得分'] = uniform(60, 95)
+
+    # 漏斗转化率异常
+    row['漏斗异常_标志'] = choice([0, 0, 0, 1], p=[0.75, 0.1, 0.1, 0.05])
+    row['漏斗异常_环节'] = choice(['简历筛选', '初面', '二面', '终面', 'Offer'], p=[0.3, 0.25, 0.2, 0.15, 0.1])
+
+    # ==========================================
+    # HR 执行层指标 (基于BI指标体系.json)
+    # ==========================================
+
+    # 今日待办
+    row['待处理候选人数'] = randint(3, 35)
+    row['待处理_超24小时数'] = randint(0, 15)
+    row['待处理_超48小时数'] = randint(0, 8)
+    row['待处理_超72小时数'] = randint(0, 5)
+
+    # 即将到来的面试
+    row['今日面试数'] = randint(0, 10)
+    row['明日面试数'] = randint(0, 12)
+    row['未来48小时面试数'] = randint(0, 20)
+    row['面试确认率_%'] = uniform(75, 98)
+
+    # 个人漏斗转化率
+    row['个人推荐简历数'] = randint(20, 80)
+    row['个人简历通过数'] = randint(5, 30)
+    row['个人转化率_%'] = uniform(15, 45)
+
+    # 个人月度SLA
+    row['月度目标入职数'] = randint(5, 15)
+    row['月度已入职数'] = randint(0, 18)
+    row['月度SLA达成进度_%'] = uniform(50, 120)
+
+    # ==========================================
+    # 辅助字段
+    # ==========================================
+    row['总招聘人数'] = (row['入职人数_初级'] + row['入职人数_中级'] +
+                       row['入职人数_高级'] + row['入职人数_专家'] +
+                       row['入职人数_管理层'] + row['入职人数_P0战略级'])
+    # 等价于逐行 randint(总招聘人数, 总招聘人数 + 8)
+    row['发出Offer数'] = row['总招聘人数'] + randint(0, 8)
+    row['接受Offer数'] = row['总招聘人数']
+
+    # 简历量
+    row['收到简历总数'] = randint(100, 500)
+    row['简历筛选总数'] = row['收到简历总数']  # 简历筛选总数 = 收到简历总数
+    row['初筛通过简历数'] = (row['收到简历总数'] * row['简历初筛通过率_%'] / 100).astype(np.int64)
+    row['面试人数'] = (row['初筛通过简历数'] * 0.7).astype(np.int64)
+
+    # ==========================================
+    # 硅碳比相关数据 (AI + HR协同效能)
+    # ==========================================
+    # 碳基HR人力资源数
+    row['HR团队人数'] = randint(3, 12)
+    row['HR人均日处理简历量'] = randint(180, 620)
+    row['HR人均日有效工时_小时'] = uniform(4.0, 7.5)
+    row['HR人均月招聘负载_人'] = uniform(2.5, 8.5)
+
+    # 硅基AI资源数
+    row['AI承接简历筛选率_%'] = uniform(55, 92)
+    row['AI承接岗位匹配率_%'] = uniform(60, 88)
+    row['AI承接面试邀约率_%'] = uniform(50, 78)
+    row['AI承接流程跟进率_%'] = uniform(65, 95)
+    row['AI平均承接率_%'] = (row['AI承接简历筛选率_%'] + row['AI承接岗位匹配率_%'] +
+                           row['AI承接面试邀约率_%'] + row['AI承接流程跟进率_%']) / 4
+
+    # 硅碳协同效能
+    row['单简历处理成本_元'] = uniform(1.8, 8.5)
+    row['HR负载释放率_%'] = uniform(25, 82)
+    row['碳硅协同效率提升_%'] = uniform(85, 185)
+    row['高价值工作占比_%'] = uniform(45, 85)  # HR在高价值工作上的时间占比
+
+    # 硅碳比指标 (AI资源/HR资源)
+    ai_equivalent = row['AI平均承接率_%'] / 100 * row['HR团队人数']  # AI等效人力
+    row['硅碳比'] = np.where(
+        row['HR团队人数'] > 0, np.round(ai_equivalent / np.maximum(row['HR团队人数'], 1), 2), 0
+    )
+    row['硅碳协同健康度_得分'] = uniform(65, 95)
+
+    # ==========================================
+    # 校招候选人质量数据 (针对HRD和HR视角)
+    # ==========================================
+    # 院校层级分布
+    row['校招_C9联盟_%'] = uniform(5, 18)
+    row['校招_985非C9_%'] = uniform(12, 28)
+    row['校招_211核心_%'] = uniform(20, 40)
+    row['校招_海外QS50_%'] = uniform(3, 12)
+    row['校招_海外QS100_%'] = uniform(5, 15)
+    row['校招_普通一本_%'] = uniform(15, 35)
+
+    # 笔试面试质量
+    row['校招_平均笔试分'] = uniform(65, 88)
+    row['校招_平均面试分'] = uniform(68, 90)
+    row['校招_笔试通过率_%'] = uniform(55, 85)
+    row['校招_面试通过率_%'] = uniform(60, 88)
+
+    # Offer等级分布
+    row['校招_S级SSP占比_%'] = uniform(8, 22)
+    row['校招_A级SP占比_%'] = uniform(25, 45)
+    row['校招_B级Normal占比_%'] = uniform(35, 60)
+
+    # 签约与流失
+    row['校招_Offer发放数'] = randint(8, 35)
+    row['校招_已签约数'] = randint(5, 30)
+    row['校招_签约率_%'] = np.where(
+        row['校招_Offer发放数'] > 0,
+        row['校招_已签约数'] / np.maximum(row['校招_Offer发放数'], 1) * 100, 0
+    )
+    row['校招_S级签约率_%'] = uniform(35, 65)  # S级人才签约率通常较低
+    row['校招_拒签原因_薪资_%'] = uniform(25, 50)
+    row['校招_拒签原因_竞对_%'] = uniform(20, 45)
+    row['校招_拒签原因_地点_%'] = uniform(10, 25)
+    row['校招_拒签原因_其他_%'] = uniform(5, 20)
+
+    # 渠道来源
+    row['校招_内推占比_%'] = uniform(15, 40)
+    row['校招_宣讲会占比_%'] = uniform(25, 50)
+    row['校招_线上平台占比_%'] = uniform(20, 45)
+    row['校招_猎头占比_%'] = uniform(5, 15)
+
+    # 候选人综合质量评分 (基于多维度计算)
+    quality_score = (
+        row['校招_平均笔试分'] * 0.3 +
+        row['校招_平均面试分'] * 0.3 +
+        row['校招_S级SSP占比_%'] * 2 +
+        row['校招_签约率_%'] * 0.4
+    )
+    row['校招_综合质量得分'] = np.minimum(100, quality_score)
+
+    # 质量矩阵象限 (笔试 vs 面试)
+    written_high = row['校招_平均笔试分'] >= 80
+    interview_high = row['校招_平均面试分'] >= 80
+    row['校招_质量象限'] = np.select(
+        [written_high & interview_high, written_high & ~interview_high, ~written_high & interview_high],
+        ['右上-双高人才', '右下-技术强沟通弱', '左上-沟通强技术弱'],
+        default='左下-双低'
+    )
+
+    df = pd.DataFrame(row)
 
     # 数据后处理和一致性修正
     df['录用接受率_%'] = (df['接受Offer数'] / df['发出Offer数']) * 100
@@ -396,6 +517,7 @@ METRICS_METADATA = {
             'name': '关键战略岗位按时达成率',
             'name_en': 'Critical Role Fill Rate',
             'category': '战略交付',
+            'agg': 'mean',
             'formula': '按时入职的P0级人员数 / P0级招聘计划总数',
             'definition': '仅统计对公司战略有重大影响的岗位(如新业务线负责人、首席架构师)',
             'boss_comment': '别告诉我招了多少个前台,我只想知道那个能带队打仗的VP到了没有',
@@ -406,6 +528,7 @@ METRICS_METADATA = {
             'name': '空缺岗位预期收入损失',
             'name_en': 'Revenue Loss Risk / Cost of Vacancy',
             'category': '财务风控',
+            'agg': 'sum',
             'formula': 'Σ(关键岗位每日预估产值 × 空窗天数)',
             'definition': '将关键岗位的空窗期转化为财务损失金额',
             'boss_comment': "把'招人慢'变成'亏钱',业务部门就会配合你了",
@@ -494,6 +617,7 @@ METRICS_METADATA = {
             'name': '今日待办候选人数',
             'name_en': 'Action Required Candidates',
             'category': '每日作战',
+            'agg': 'last',
             'formula': 'Count(状态=待处理 AND 停留时间>24h)',
             'definition': '列出所有卡在待筛选、待安排环节超过SLA时限的候选人',
             'boss_comment': '别盯着报表看,去干活!把这个人处理掉',
@@ -504,6 +628,7 @@ METRICS_METADATA = {
             'name': '流程停滞天数',
             'name_en': 'Stuck Days',
             'category': '流程卫生',
+            'agg': 'max',
             'formula': '候选人在当前状态的停留天数',
             'definition': '监控每一个候选人的"静止时间"',
             'boss_comment': '时间就是生命,拖三天人家就去别家入职了',
@@ -514,6 +639,7 @@ METRICS_METADATA = {
             'name': '即将到来的面试',
             'name_en': 'Upcoming Interviews',
             'category': '日程管理',
+            'agg': 'sum',
             'formula': '未来24/48小时内的面试安排列表',
             'definition': '确保面试官和候选人都已确认出席',
             'boss_comment': '基本功不能丢',
@@ -524,6 +650,7 @@ METRICS_METADATA = {
             'name': '个人漏斗转化率',
             'name_en': 'Personal Conversion Rate',
             'category': '自我修正',
+            'agg': 'mean',
             'formula': '我推荐的简历数 / 经理通过数',
             'definition': '衡量个人推人的"精准度"',
             'boss_comment': '不要做简历搬运工,要做人才顾问',
@@ -534,6 +661,7 @@ METRICS_METADATA = {
             'name': '个人月度SLA达成进度',
             'name_en': 'SLA Progress',
             'category': '结果交付',
+            'agg': 'mean',
             'formula': '本月已入职数 / 本月承诺目标数',
             'definition': '最直观的业绩进度条',
             'boss_comment': '结果导向',
@@ -545,26 +673,83 @@ METRICS_METADATA = {
 
 
 
+def ensure_db_seeded(months=12, recruiters=5, departments=5):
+    """
+    数据库为空时写入生成数据 (不把事实表读入内存)
+    返回数据库中的行数
+    """
+    from db_manager import DBManager
+
+    db = DBManager()
+
+    row_count = db.count_rows()
+    if row_count == 0:
+        print("Initializing Database with new random data...")
+        row_count = stream_generated_data_to_db(months, recruiters, departments)
+
+    return row_count
+
+
+def stream_generated_data_to_db(months=12, recruiters=5, departments=5,
+                                chunk_rows=GENERATION_CHUNK_ROWS, seed=42, mode='replace', workers=1):
+    """
+    逐块生成网格数据并直接写入事实存储 (DuckDB 表或分区 Parquet, 见 db_manager.STORAGE_MODE)
+    内存只占几块数据, 与网格大小无关; workers > 1 时由进程池生成后续块, 同时写入已生成的块
+    返回写入后的总行数
+    """
+    from db_manager import DBManager
+
+    db = DBManager()
+    ok, msg = db.import_batches(
+        iter_recruitment_data_chunks(months, recruiters, departments, chunk_rows=chunk_rows,
+                                     seed=seed, workers=workers),
+        mode=mode
+    )
+    if not ok:
+        raise RuntimeError(f"Seeding failed: {msg}")
+    print(msg)
+    return db.count_rows()
+
+
+def append_generated_months(months=1, chunk_rows=GENERATION_CHUNK_ROWS, seed=42, workers=1):
+    """
+    在已存储的最新月份之后追加 months 个月, 顾问和部门沿用最新月份的
+    维度取自小的汇总表, 只写入新月份, 耗时与新增行数成正比; 已有月份的数据版本和缓存保持有效
+    返回 (第一个新月份, 追加的行数)
+    """
+    from db_manager import DBManager
+
+    db = DBManager()
+    dept_months = db.get_rollup('dept', measures={}, by_month=True)
+    if dept_months.empty:
+        raise RuntimeError("Nothing to extend: the fact table is empty")
+    last_month = dept_months['月份'].max()
+    dept_names = dept_months.loc[dept_months['月份'] == last_month, '部门'].astype(str).tolist()
+    recruiter_names = db.get_rollup(
+        'recruiter', start_date=last_month, end_date=last_month, measures={}
+    )['招聘顾问'].astype(str).tolist()
+
+    first_month = last_month + pd.offsets.MonthBegin(1)
+    grid = (pd.date_range(start=first_month, periods=months, freq='MS'),
+            np.array(recruiter_names), np.array(dept_names))
+    # 随机数流取决于 seed 和起始月, 与已有月份的随机数流互不相关
+    month_seed = [seed, first_month.year * 12 + first_month.month - 1]
+    ok, msg = db.import_batches(_iter_grid_chunks(grid, chunk_rows, month_seed, workers), mode='append')
+    if not ok:
+        raise RuntimeError(f"Append failed: {msg}")
+    print(msg)
+    return first_month, months * len(recruiter_names) * len(dept_names)
+
+
 def seed_db_with_generated_data(months=12, recruiters=5, departments=5):
     """
     Check if DB has data, if not, generate and seed it.
     Returns the dataframe (either loaded or generated).
     """
     from db_manager import DBManager
-    
-    db = DBManager()
-    
-    # Try to load existing data
-    df = db.load_data_to_df()
-    
-    if df.empty:
-        print("Initializing Database with new random data...")
-        df = generate_complete_recruitment_data(months, recruiters, departments)
-        db.init_db(df)
-    else:
-        print(f"Loaded {len(df)} records from existing Database.")
-        
-    return df
+
+    ensure_db_seeded(months, recruiters, departments)
+    return DBManager().load_data_to_df()
 
 
 if __name__ == '__main__':
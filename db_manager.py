@@ -1,91 +1,2169 @@
 import duckdb
 import pandas as pd
+import pyarrow as pa
+import atexit
+import contextvars
+import hashlib
+import json
 import os
+import glob
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 
 DB_PATH = 'recruitment.db'
 TABLE_NAME = 'recruitment_data'
 
+# Storage backend for the fact data:
+#   'duckdb'  - one table inside DB_PATH (default)
+#   'parquet' - Hive-partitioned Parquet under PARQUET_DIR (year=YYYY/month=YYYY-MM),
+#               exposed to SQL as the TABLE_NAME view; time filters prune whole files
+STORAGE_MODE = 'duckdb'
+PARQUET_DIR = 'recruitment_parquet'
+# Raw read_parquet view that still carries the year/month partition columns
+PARTITIONED_VIEW = f'{TABLE_NAME}_partitioned'
+# ASCII partition keys (Chinese column names would be URL-encoded in the directory names)
+PARTITION_COLUMNS = ('year', 'month')
+
+# Natural grain of the fact table; import mode 'upsert' matches rows on these columns
+UPSERT_KEY = ('月份', '招聘顾问', '部门')
+
+# Physical sort order of the facts. Writes are clustered on it so DuckDB's per-row-group
+# min/max zone maps (and Parquet row-group statistics) can skip data for month ranges.
+CLUSTER_KEY = ('月份', '部门', '招聘顾问')
+
+# Materialized month x dimension rollups (table rollup_month_<name>), kept in sync on
+# every write. Each numeric measure is stored as "<col>__sum" and "<col>__n" so means
+# over any month range can be recombined exactly.
+ROLLUP_DIMENSIONS = {
+    'dept': '部门',
+    'recruiter': '招聘顾问',
+    'channel': '渠道',
+    'level': '职级',
+}
+ROLLUP_ROW_COUNT = '行数'
+
+# Query instrumentation: every query issued through DBManager's public API is logged
+# (text hash, wall time, rows returned, bytes materialized, dashboard section) to
+# QUERY_LOG_TABLE. Entries are buffered in memory and flushed in batches.
+QUERY_LOG_TABLE = 'query_log'
+QUERY_LOG_FLUSH_EVERY = 50
+QUERY_LOG_MAX_ROWS = 20_000
+
+# Dashboard section the current thread's queries are attributed to (DBManager.query_section)
+_query_section = contextvars.ContextVar('query_section', default=None)
+
+# SQL console guard rails (DBManager.start_console_query)
+CONSOLE_TIMEOUT = 30        # seconds before a console statement is interrupted
+CONSOLE_PAGE_SIZE = 1000    # rows per page of a console read
+
+# Server-side exports (DBManager.export_filtered): format -> (file suffix, COPY options,
+# compression codec of the CSV file). DuckDB writes the file itself, rows never pass
+# through pandas.
+EXPORT_FORMATS = {
+    'csv': ('.csv', "FORMAT CSV, HEADER", None),
+    'csv.gz': ('.csv.gz', "FORMAT CSV, HEADER, COMPRESSION gzip", 'gzip'),
+    'csv.zst': ('.csv.zst', "FORMAT CSV, HEADER, COMPRESSION zstd", 'zstd'),
+    'parquet': ('.parquet', "FORMAT PARQUET, COMPRESSION zstd", None),
+}
+# utf-8-sig BOM in front of CSV exports, so Excel detects the encoding of the Chinese text
+CSV_BOM = '\ufeff'.encode('utf-8')
+
+# Snapshots of the facts, taken automatically before every destructive write (replace
+# and upsert imports, SQL console writes that mention the fact table, reset) and
+# restorable with DBManager.restore_snapshot. DuckDB mode keeps each snapshot as a table
+# (a replace or reset just renames the old table away, nothing is copied); Parquet mode
+# hard-links the partition files, which are never modified in place. Only the newest
+# SNAPSHOT_KEEP are kept.
+SNAPSHOT_TABLE = 'snapshots'
+SNAPSHOT_KEEP = 5
+
+# Monotonic data version, one row per month ('YYYY-MM') plus 'all' for whole-table
+# rewrites. Every write bumps it, so caches keyed on get_data_version() go stale
+# exactly when (and, for a month range, only when) the underlying rows change.
+VERSION_TABLE = 'data_version'
+
+# WAL checkpoint policy: DuckDB checkpoints by itself once the WAL outgrows
+# CHECKPOINT_THRESHOLD; DBManager also checkpoints after every bulk import, when it
+# finds a WAL left behind by a previous process, and at shutdown.
+CHECKPOINT_THRESHOLD = '8MB'
+# After a replace import or a reset, rewrite the file (compact()) once more than this
+# share of its blocks is free
+COMPACT_FREE_RATIO = 0.5
+
+# Compact fact schema. Dimension columns are stored as ENUM (widened when new values
+# arrive, which are appended so the order is that of first appearance in the data) and
+# load into pandas as categoricals; integer measures get the narrowest of
+# SMALLINT/INTEGER/BIGINT that fits, float measures FLOAT. Stored types only ever widen
+# (imports and console writes both widen them). Loads into pandas read integers as BIGINT.
+DIMENSION_COLUMNS = ('部门', '招聘顾问', '渠道', '职级', '季度', '漏斗异常_环节', '校招_质量象限')
+INTEGER_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT')
+FLOAT_TYPES = ('FLOAT', 'DOUBLE')
+
+NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                 'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE', 'DECIMAL')
+
+DML_STATEMENT_TYPES = (duckdb.StatementType.INSERT, duckdb.StatementType.UPDATE,
+                       duckdb.StatementType.DELETE, duckdb.StatementType.MERGE_INTO)
+# Other statements that can replace, alter or (COPY ... FROM) add rows to a table
+TABLE_CHANGING_STATEMENT_TYPES = (duckdb.StatementType.CREATE, duckdb.StatementType.ALTER,
+                                  duckdb.StatementType.DROP, duckdb.StatementType.COPY)
+
+
+def classify_statement(sql):
+    """
+    'read' if every statement in `sql` is a plain SELECT (including SHOW/DESCRIBE/
+    SUMMARIZE and EXPLAIN [ANALYZE] of a SELECT), 'dml' if it modifies rows
+    (UPDATE/DELETE/INSERT, also behind a WITH or EXPLAIN ANALYZE), otherwise 'ddl'.
+    Statements are split and typed by DuckDB's parser; SQL that does not parse is 'ddl'.
+    """
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.ParserException:
+        return 'ddl'
+    kinds = set()
+    for statement in statements:
+        if statement.type == duckdb.StatementType.SELECT:
+            kinds.add('read')
+        elif statement.type == duckdb.StatementType.EXPLAIN:
+            kinds.add(classify_statement(_explained_query(statement.query)))
+        elif statement.type in DML_STATEMENT_TYPES:
+            kinds.add('dml')
+        else:
+            kinds.add('ddl')
+    if 'ddl' in kinds:
+        return 'ddl'
+    if 'dml' in kinds:
+        return 'dml'
+    return 'read'
+
+
+def is_select_query(sql):
+    """
+    True if `sql` is exactly one plain SELECT statement.
+    """
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.ParserException:
+        return False
+    return len(statements) == 1 and statements[0].type == duckdb.StatementType.SELECT
+
+
+def _explained_query(query):
+    """
+    The statement behind EXPLAIN [ANALYZE] [(options)] in `query`.
+    """
+    tokens = duckdb.tokenize(query)  # (offset, type) pairs, comments skipped
+    i, depth = 1, 0  # tokens[0] is EXPLAIN
+    while i < len(tokens):
+        text = query[tokens[i][0]:].split(None, 1)[0].upper()
+        if text.startswith('('):
+            depth += 1
+        elif text.startswith(')'):
+            depth -= 1
+        elif depth == 0 and text != 'ANALYZE':
+            return query[tokens[i][0]:]
+        i += 1
+    return ''
+
+
+def _enum_sql(values):
+    return 'ENUM(' + ', '.join("'" + str(v).replace("'", "''") + "'" for v in values) + ')'
+
+
+def _first_seen_sql(column, source):
+    """
+    Query returning the distinct non-NULL values of `column` in `source` as one list,
+    in order of first appearance (the ENUM order, so categoricals keep the data's order).
+    """
+    return f'''
+        SELECT LIST(v ORDER BY first_seen) FROM (
+            SELECT "{column}"::VARCHAR AS v, MIN(rn) AS first_seen
+            FROM (SELECT "{column}", row_number() OVER () AS rn FROM {source})
+            WHERE "{column}" IS NOT NULL GROUP BY 1
+        )
+    '''
+
+
+def _integer_type(lo, hi):
+    """
+    Narrowest integer type holding [lo, hi].
+    """
+    if lo is None or (-2 ** 15 <= lo and hi < 2 ** 15):
+        return 'SMALLINT'
+    if -2 ** 31 <= lo and hi < 2 ** 31:
+        return 'INTEGER'
+    return 'BIGINT'
+
+
+def _widest_numeric(a, b):
+    """
+    Smallest numeric type that can hold values of both types a and b.
+    """
+    if a == b:
+        return a
+    order = ('SMALLINT', 'INTEGER', 'BIGINT', 'FLOAT', 'DOUBLE')
+    if {a, b} & set(FLOAT_TYPES) and {a, b} & {'INTEGER', 'BIGINT'}:
+        return 'DOUBLE'
+    return max(a, b, key=order.index)
+
+
+def _database_size(path):
+    """
+    Size of a DuckDB database on disk, including its WAL.
+    """
+    return sum(os.path.getsize(p) for p in (path, f"{path}.wal") if os.path.exists(p))
+
+
+def _time_open(path):
+    start = time.perf_counter()
+    duckdb.connect(path).close()
+    return time.perf_counter() - start
+
+
+def query_hash(query):
+    """
+    Stable id of a query's text (whitespace-insensitive, parameters excluded).
+    """
+    return hashlib.sha1(' '.join(query.split()).encode('utf-8')).hexdigest()[:16]
+
+
+def profile_rows_scanned(profile):
+    """
+    Rows read by the table/Parquet scans of an explain_analyze() profile; row groups
+    skipped through their min/max statistics never count.
+    """
+    scanned = profile.get('operator_rows_scanned', 0) if profile.get('operator_type') == 'TABLE_SCAN' else 0
+    return scanned + sum(profile_rows_scanned(child) for child in profile.get('children', []))
+
+
+def _prepend_bom(path, codec):
+    """
+    Put CSV_BOM in front of the CSV file at `path`. Compressed files get the BOM as an
+    extra gzip member / zstd frame: concatenated frames decompress to one stream.
+    """
+    bom = CSV_BOM if codec is None else pa.compress(CSV_BOM, codec=codec, asbytes=True)
+    tmp_path = f"{path}.bom"
+    with open(tmp_path, 'wb') as out, open(path, 'rb') as src:
+        out.write(bom)
+        shutil.copyfileobj(src, out)
+    os.replace(tmp_path, path)
+
+
+def _snapshot_table(snapshot_id):
+    return f"{TABLE_NAME}__snapshot_{snapshot_id}"
+
+
+def _snapshot_keys_table(snapshot_id):
+    return f"{_snapshot_table(snapshot_id)}_keys"
+
+
+def _key_match_sql(left, right, columns):
+    return ' AND '.join(f'{left}."{c}" IS NOT DISTINCT FROM {right}."{c}"' for c in columns)
+
+
+def _snapshot_dir(snapshot_id):
+    return os.path.join(f"{PARQUET_DIR}_snapshots", snapshot_id)
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Other file system, or no hard-link support
+        shutil.copy2(src, dst)
+
+
+def _link_tree(src, dst):
+    """
+    Copy a directory tree by hard-linking its files.
+    """
+    shutil.copytree(src, dst, copy_function=_link_or_copy)
+
+
+def _months_sql(months):
+    return ', '.join(f"TIMESTAMP '{pd.Timestamp(m)}'" for m in months)
+
+# Connection pool: max cursors checked out at once, and how long a caller waits for one
+POOL_SIZE = 8
+POOL_TIMEOUT = 30
+
+# Default rows per Arrow record batch for streaming reads
+BATCH_SIZE = 100_000
+
+# File imports: rows per Arrow batch when streaming XLSX, and progress polling interval (seconds)
+XLSX_BATCH_ROWS = 50_000
+PROGRESS_POLL_INTERVAL = 0.2
+
+
+def _to_arrow_table(result):
+    # duckdb >= 1.4 renamed fetch_arrow_table -> to_arrow_table
+    fetch = getattr(result, 'to_arrow_table', None) or result.fetch_arrow_table
+    return fetch()
+
+
+def _to_arrow_reader(result, batch_size):
+    # duckdb >= 1.4 renamed fetch_record_batch -> to_arrow_reader
+    fetch = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+    return fetch(batch_size)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DuckDB cursors sharing one database handle.
+    Each checkout gets its own cursor, so Streamlit sessions/threads can query in parallel.
+    """
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _is_healthy(self, cursor):
+        try:
+            cursor.execute("SELECT 1").fetchone()
+            return True
+        except duckdb.Error:
+            return False
+
+    def _discard(self, cursor):
+        try:
+            cursor.close()
+        except duckdb.Error:
+            pass
+
+    def _checkout(self):
+        # Reuse an idle cursor if it still answers, otherwise open a fresh one
+        while True:
+            try:
+                cursor = self._idle.get_nowait()
+            except queue.Empty:
+                return self.database.cursor()
+            if self._is_healthy(cursor):
+                return cursor
+            self._discard(cursor)
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a cursor for the duration of the with-block.
+        Raises TimeoutError if all cursors stay busy for `timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free DuckDB connection after {self.timeout}s (pool size {self.size})")
+        cursor = None
+        healthy = True
+        try:
+            cursor = self._checkout()
+            yield cursor
+        except (duckdb.ConnectionException, duckdb.FatalException):
+            healthy = False
+            raise
+        finally:
+            if cursor is not None:
+                if healthy:
+                    self._idle.put(cursor)
+                else:
+                    self._discard(cursor)
+            self._slots.release()
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold every slot for the duration of the with-block: waits until no cursor is
+        checked out and makes new checkouts wait. Used to swap the database underneath.
+        """
+        acquired = 0
+        try:
+            for _ in range(self.size):
+                if not self._slots.acquire(timeout=self.timeout):
+                    raise TimeoutError(f"DuckDB connections still busy after {self.timeout}s")
+                acquired += 1
+            yield
+        finally:
+            for _ in range(acquired):
+                self._slots.release()
+
+    def reset(self, database):
+        """
+        Drop the idle cursors and hand out cursors of `database` from now on.
+        """
+        self.close()
+        self.database = database
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+class ConsoleQuery:
+    """
+    One SQL console statement running on a worker thread with its own pooled cursor.
+    Reads return one page (`result`, `has_more`); writes run under the manager's
+    write lock. The statement is interrupted after `timeout` seconds or on cancel().
+    Once `done`, either `result` or `error` is set.
+    """
+
+    def __init__(self, manager, query, page=0, page_size=CONSOLE_PAGE_SIZE, timeout=CONSOLE_TIMEOUT):
+        self.query = query
+        self.kind = classify_statement(query)
+        self.page = page
+        self.page_size = page_size
+        self.timeout = timeout
+        self.result = None
+        self.has_more = False
+        self.error = None
+        self.cancelled = False
+        self.timed_out = False
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._manager = manager
+        self._cursor = None
+        self._done = threading.Event()
+        self._timer = threading.Timer(timeout, self._on_timeout)
+        self._timer.daemon = True
+        threading.Thread(target=self._run, daemon=True).start()
+        self._timer.start()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def running_time(self):
+        return self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+
+    def wait(self, timeout=None):
+        """
+        Block until the statement finished or `timeout` seconds passed; returns done.
+        """
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        self.cancelled = True
+        self._interrupt()
+
+    def _on_timeout(self):
+        if not self.done:
+            self.timed_out = True
+            self._interrupt()
+
+    def _interrupt(self):
+        cursor = self._cursor
+        if cursor is not None:
+            cursor.interrupt()
+
+    def _stopped(self):
+        return self.cancelled or self.timed_out
+
+    def _run(self):
+        manager = self._manager
+        try:
+            with manager.pool.connection() as conn:
+                self._cursor = conn
+                if self._stopped():
+                    raise duckdb.InterruptException("Interrupted before start")
+                if self.kind == 'read':
+                    relation = conn.sql(self.query)
+                    if relation is None:
+                        self.result = pd.DataFrame()
+                    else:
+                        rows = relation.limit(self.page_size + 1, self.page * self.page_size).df()
+                        self.has_more = len(rows) > self.page_size
+                        self.result = rows.iloc[:self.page_size]
+                        manager._log_query(self.query, [self.page], time.perf_counter() - self.started,
+                                           len(self.result), int(self.result.memory_usage(index=False).sum()))
+                else:
+                    # Writes wait for each other (and for imports), reads never do
+                    while not manager._write_lock.acquire(timeout=PROGRESS_POLL_INTERVAL):
+                        if self._stopped():
+                            raise duckdb.InterruptException("Interrupted while waiting for the write lock")
+                    try:
+                        self.result = manager._execute_write(conn, self.query, self.kind)
+                    finally:
+                        manager._write_lock.release()
+        except duckdb.InterruptException as e:
+            if self.timed_out:
+                self.error = f"Query timed out after {self.timeout}s and was interrupted"
+            elif self.cancelled:
+                self.error = "Query cancelled"
+            else:
+                self.error = str(e)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._cursor = None
+            self._timer.cancel()
+            self.elapsed = time.perf_counter() - self.started
+            self._done.set()
+
+
 class DBManager:
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(DBManager, cls).__new__(cls)
-            cls._instance.conn = duckdb.connect(DB_PATH)
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(DBManager, cls).__new__(cls)
+                    # Shared database handle; all reads/writes go through pooled cursors
+                    instance._connect()
+                    instance.pool = ConnectionPool(instance.conn)
+                    # Serializes writers (imports, SQL writes); readers never take it
+                    instance._write_lock = threading.RLock()
+                    instance._query_log = []
+                    instance._query_log_lock = threading.Lock()
+                    if STORAGE_MODE == 'parquet':
+                        # Views point at the files on disk; rebuild them in case the tree changed
+                        with instance.pool.connection() as conn:
+                            instance._refresh_parquet_views(conn)
+                    atexit.register(instance.close)
+                    cls._instance = instance
         return cls._instance
 
+    def _connect(self):
+        had_wal = os.path.exists(f"{DB_PATH}.wal")
+        self.conn = duckdb.connect(DB_PATH)
+        # Track query progress for file imports without printing a terminal bar
+        self.conn.execute("SET enable_progress_bar = true")
+        self.conn.execute("SET enable_progress_bar_print = false")
+        self.conn.execute(f"SET checkpoint_threshold = '{CHECKPOINT_THRESHOLD}'")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (scope VARCHAR PRIMARY KEY, version BIGINT)")
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (
+                id VARCHAR PRIMARY KEY, created_at TIMESTAMP, reason VARCHAR, "rows" BIGINT
+            )
+        """)
+        # Number of UPSERT_KEY values a partial snapshot covers; NULL for a full snapshot
+        self.conn.execute(f'ALTER TABLE {SNAPSHOT_TABLE} ADD COLUMN IF NOT EXISTS "keys" BIGINT')
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {QUERY_LOG_TABLE} (
+                logged_at TIMESTAMP, query_hash VARCHAR, section VARCHAR, query_text VARCHAR,
+                params VARCHAR, wall_ms DOUBLE, rows_returned BIGINT, bytes BIGINT, error VARCHAR
+            )
+        """)
+        if had_wal:
+            # The last process never checkpointed; fold its log in so the next start
+            # does not have to replay it again
+            self.conn.execute("CHECKPOINT")
+
     def _sanitize_df(self, df):
         """
-        Convert object columns (which might contain numpy.str_) to standard strings
-        to avoid DuckDB 'Unsupported string type' error.
+        Convert a DataFrame into an Arrow table that DuckDB can scan directly.
+        Object columns (which might contain numpy.str_) become Arrow strings in one
+        columnar pass, avoiding DuckDB's 'Unsupported string type' error without a
+        per-cell Python call or a full pandas copy. Missing values stay NULL.
         """
-        # Create a copy to avoid modifying the original dataframe
-        df_clean = df.copy()
-        for col in df_clean.select_dtypes(include=['object']):
-            df_clean[col] = df_clean[col].apply(str)
-        return df_clean
+        arrays = []
+        for col in df.columns:
+            series = df[col]
+            if series.dtype == object:
+                values = series.to_numpy()
+                try:
+                    arrays.append(pa.array(values, type=pa.string(), from_pandas=True))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Mixed types (e.g. ints and strings in one column): stringify in bulk
+                    mask = series.isna().to_numpy()
+                    arrays.append(pa.array(series.astype(str).to_numpy(), type=pa.string(), mask=mask))
+            else:
+                # Numeric/datetime/categorical columns convert zero-copy where possible
+                arrays.append(pa.Array.from_pandas(series))
+        return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
 
     def init_db(self, df=None):
         """
         Initialize the database. 
         If table doesn't exist and df is provided, create and seed it.
         """
-        # Check if table exists
-        try:
-            tables = self.conn.execute("SHOW TABLES").fetchall()
-            table_exists = any(t[0] == TABLE_NAME for t in tables)
-        except Exception:
-            table_exists = False
+        table_exists = self.table_exists()
 
         if not table_exists and df is not None:
             # Sanitize data first
             df_clean = self._sanitize_df(df)
             
             # Register dataframe and create table from it
-            self.conn.register('temp_df', df_clean)
-            self.conn.execute(f"CREATE TABLE {TABLE_NAME} AS SELECT * FROM temp_df")
-            self.conn.unregister('temp_df')
-            print(f"Database initialized and seeded with {len(df)} records.")
+            with self.pool.connection() as conn:
+                conn.register('temp_df', df_clean)
+                self._write_facts(conn, 'temp_df', mode='replace')
+                conn.unregister('temp_df')
+            print(self._with_maintenance(f"Database initialized and seeded with {len(df)} records.", 'replace'))
         elif not table_exists:
             print("Database not initialized. Please provide initial data.")
 
+    def table_exists(self):
+        """
+        Whether the fact table has been created.
+        """
+        try:
+            with self.pool.connection() as conn:
+                return self._table_exists(conn)
+        except Exception:
+            return False
+
+    def _table_exists(self, conn):
+        # On a cursor the caller already holds: checking out a second one could wait
+        # on pool.exclusive() until it times out
+        return any(t[0] == TABLE_NAME for t in conn.execute("SHOW TABLES").fetchall())
+
+    def drop_table(self):
+        """
+        Drop the fact table (used by "重置并重新生成"); the dropped facts stay
+        restorable as a snapshot.
+        """
+        with self.pool.connection() as conn, self._write_lock:
+            self._take_snapshot(conn, "重置前", move=True)
+            if STORAGE_MODE == 'parquet':
+                conn.execute(f"DROP VIEW IF EXISTS {TABLE_NAME}")
+                conn.execute(f"DROP VIEW IF EXISTS {PARTITIONED_VIEW}")
+                shutil.rmtree(PARQUET_DIR, ignore_errors=True)
+            else:
+                conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+            self._after_facts_changed(conn, months=None)
+        self._after_bulk_write('replace')
+
+    # ------------------------------------------------------------------
+    # Checkpointing and compaction
+    # ------------------------------------------------------------------
+
+    def checkpoint(self):
+        """
+        Fold the WAL into the database file.
+        Returns False if DuckDB could not checkpoint right now; its own
+        CHECKPOINT_THRESHOLD check catches up later.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("CHECKPOINT")
+            return True
+        except duckdb.Error:
+            return False
+
+    def _free_block_ratio(self):
+        with self.pool.connection() as conn:
+            total, free = conn.execute(
+                "SELECT total_blocks, free_blocks FROM pragma_database_size() "
+                "WHERE database_name = current_database()"
+            ).fetchone()
+        return free / total if total else 0.0
+
+    def _after_bulk_write(self, mode):
+        """
+        Checkpoint after a bulk import; after a replace or reset also compact the file
+        if most of it is now free space.
+        Runs after the write committed, so it never raises: returns None, or a message
+        saying why the maintenance was skipped (e.g. compact() timing out on
+        pool.exclusive() while another cursor is checked out).
+        """
+        try:
+            self.checkpoint()
+            if mode == 'replace' and self._free_block_ratio() > COMPACT_FREE_RATIO:
+                self.compact()
+        except Exception as e:
+            return f"post-import maintenance skipped: {type(e).__name__}: {e}"
+        return None
+
+    def _with_maintenance(self, message, mode):
+        """
+        `message` of a committed import, plus the outcome of the maintenance after it.
+        """
+        maintenance_error = self._after_bulk_write(mode)
+        if maintenance_error is None:
+            return message
+        return f"{message} The data is saved; {maintenance_error}"
+
+    def compact(self):
+        """
+        Re-sort the facts (recluster()), then rewrite the database file without its free
+        blocks: COPY FROM DATABASE into a fresh file, swapped in while no cursor is
+        checked out.
+        Returns size_before/size_after (bytes, including the WAL) and
+        open_before/open_after (seconds to open the file).
+        """
+        tmp_path = f"{DB_PATH}.compact-{uuid.uuid4().hex[:8]}"
+        self.recluster()
+        with self.pool.exclusive(), self._query_log_lock:
+            self._flush_query_log()
+            self.conn.execute("CHECKPOINT")
+            database = self.conn.execute("SELECT current_database()").fetchone()[0]
+            self.conn.execute(f"ATTACH '{tmp_path}' AS compact_target")
+            try:
+                self.conn.execute(f'COPY FROM DATABASE "{database}" TO compact_target')
+            finally:
+                self.conn.execute("DETACH compact_target")
+
+            self.pool.reset(None)
+            self.conn.close()
+            report = {'size_before': _database_size(DB_PATH), 'open_before': _time_open(DB_PATH)}
+            os.replace(tmp_path, DB_PATH)
+            report.update(size_after=_database_size(DB_PATH), open_after=_time_open(DB_PATH))
+
+            self._connect()
+            self.pool.reset(self.conn)
+        if STORAGE_MODE == 'parquet':
+            with self.pool.connection() as conn:
+                self._refresh_parquet_views(conn)
+        return report
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def snapshot(self, reason="手动快照"):
+        """
+        Snapshot the current facts; returns the snapshot id (None if there are no facts).
+        """
+        with self.pool.connection() as conn, self._write_lock:
+            return self._take_snapshot(conn, reason)
+
+    def list_snapshots(self):
+        """
+        Snapshots, newest first: id, created_at, reason, rows, keys (the number of
+        UPSERT_KEY values a partial snapshot covers; NA for a snapshot of all facts).
+        """
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT id, created_at, reason, \"rows\", \"keys\" FROM {SNAPSHOT_TABLE} ORDER BY created_at DESC"
+            ).df()
+
+    def restore_snapshot(self, snapshot_id):
+        """
+        Make snapshot `snapshot_id` the current facts again, without re-importing: a
+        table copy (DuckDB mode) or hard links (Parquet mode). A partial snapshot (taken
+        before an upsert or SQL DML) puts back only the keys it covers. The facts it
+        replaces are snapshotted first, so a restore can be undone the same way.
+        Returns the number of restored rows.
+        """
+        with self.pool.connection() as conn, self._write_lock:
+            row = conn.execute(
+                f'SELECT "rows", "keys" FROM {SNAPSHOT_TABLE} WHERE id = ?', [snapshot_id]
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown snapshot: {snapshot_id}")
+            reason = f"恢复 {snapshot_id} 前"
+            months = None
+            # Stage the snapshot before taking the pre-restore snapshot, which may prune it
+            if STORAGE_MODE == 'parquet':
+                staged = f"{PARQUET_DIR}.tmp-{uuid.uuid4().hex[:8]}"
+                _link_tree(_snapshot_dir(snapshot_id), staged)
+                self._take_snapshot(conn, reason)
+                shutil.rmtree(PARQUET_DIR, ignore_errors=True)
+                os.replace(staged, PARQUET_DIR)
+                self._refresh_parquet_views(conn)
+            elif row[1] is not None and self._table_exists(conn):
+                months = self._restore_partial_snapshot(conn, snapshot_id, reason)
+            else:
+                staged = f"{TABLE_NAME}__staged"
+                conn.execute(f"CREATE OR REPLACE TABLE {staged} AS SELECT * FROM {_snapshot_table(snapshot_id)}")
+                self._take_snapshot(conn, reason, move=True)
+                conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+                conn.execute(f"ALTER TABLE {staged} RENAME TO {TABLE_NAME}")
+            self._after_facts_changed(conn, months)
+        self.checkpoint()
+        return row[0]
+
+    def _restore_partial_snapshot(self, conn, snapshot_id, reason):
+        """
+        Replace the current rows of the snapshot's keys with the snapshotted rows, in one
+        transaction. Returns the 月份 values of those keys (None if 月份 is not a key column).
+        """
+        key_columns = [r[0] for r in conn.execute(f"DESCRIBE {_snapshot_keys_table(snapshot_id)}").fetchall()]
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute(f"CREATE OR REPLACE TEMP TABLE _restore_rows AS SELECT * FROM {_snapshot_table(snapshot_id)}")
+            conn.execute(
+                f"CREATE OR REPLACE TEMP TABLE _restore_keys AS SELECT * FROM {_snapshot_keys_table(snapshot_id)}"
+            )
+            self._take_snapshot(conn, reason, keys='_restore_keys')
+            conn.execute(
+                f"DELETE FROM {TABLE_NAME} f USING _restore_keys k WHERE {_key_match_sql('f', 'k', key_columns)}"
+            )
+            conn.execute(f"INSERT INTO {TABLE_NAME} BY NAME SELECT * FROM _restore_rows")
+            months = None
+            if '月份' in key_columns:
+                months = [r[0] for r in conn.execute('SELECT DISTINCT "月份" FROM _restore_keys').fetchall()]
+            conn.execute("DROP TABLE _restore_rows")
+            conn.execute("DROP TABLE _restore_keys")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return months
+
+    def _take_snapshot(self, conn, reason, move=False, keys=None):
+        """
+        Snapshot the current facts (caller holds the write lock) and prune old ones.
+        move=True is for callers about to drop or replace the fact table anyway: in
+        DuckDB mode the table is renamed into the snapshot instead of copied.
+        keys: a relation on `conn` with the UPSERT_KEY values a write changes. In DuckDB
+        mode only the stored rows with those keys are copied, so the cost follows the
+        write, not the table; Parquet snapshots are hard links and always cover all facts.
+        Take it inside the write's transaction, so a failed write leaves no snapshot.
+        Returns the snapshot id, or None if there are no facts.
+        """
+        if not self._table_exists(conn):
+            return None
+        snapshot_id = f"{pd.Timestamp.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:4]}"
+        table = _snapshot_table(snapshot_id)
+        key_count = None
+        if STORAGE_MODE == 'parquet':
+            rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+            _link_tree(PARQUET_DIR, _snapshot_dir(snapshot_id))
+        elif move:
+            rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+            conn.execute(f"ALTER TABLE {TABLE_NAME} RENAME TO {table}")
+        elif keys is not None:
+            key_columns = [c for c in self._key_columns(conn)
+                           if c in {r[0] for r in conn.execute(f"DESCRIBE {keys}").fetchall()}]
+            key_sql = ', '.join(f'"{c}"' for c in key_columns)
+            conn.execute(f"CREATE TABLE {_snapshot_keys_table(snapshot_id)} AS SELECT DISTINCT {key_sql} FROM {keys}")
+            conn.execute(f"""
+                CREATE TABLE {table} AS
+                SELECT f.* FROM {TABLE_NAME} f
+                SEMI JOIN {_snapshot_keys_table(snapshot_id)} k ON {_key_match_sql('f', 'k', key_columns)}
+            """)
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            key_count = conn.execute(f"SELECT COUNT(*) FROM {_snapshot_keys_table(snapshot_id)}").fetchone()[0]
+        else:
+            conn.execute(f"CREATE TABLE {table} AS SELECT * FROM {TABLE_NAME}")
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.execute(
+            f'INSERT INTO {SNAPSHOT_TABLE} (id, created_at, reason, "rows", "keys") VALUES (?, ?, ?, ?, ?)',
+            [snapshot_id, pd.Timestamp.now().to_pydatetime(), reason, rows, key_count]
+        )
+
+        expired = [r[0] for r in conn.execute(
+            f"SELECT id FROM {SNAPSHOT_TABLE} ORDER BY created_at DESC OFFSET {SNAPSHOT_KEEP}"
+        ).fetchall()]
+        for old_id in expired:
+            self._drop_snapshot(conn, old_id)
+        return snapshot_id
+
+    def _drop_snapshot(self, conn, snapshot_id):
+        """
+        Delete a snapshot's data and its entry (also used to undo the snapshot of a failed
+        write where the data is not transactional, i.e. Parquet hard links).
+        """
+        if STORAGE_MODE == 'parquet':
+            shutil.rmtree(_snapshot_dir(snapshot_id), ignore_errors=True)
+        else:
+            conn.execute(f"DROP TABLE IF EXISTS {_snapshot_table(snapshot_id)}")
+            conn.execute(f"DROP TABLE IF EXISTS {_snapshot_keys_table(snapshot_id)}")
+        conn.execute(f"DELETE FROM {SNAPSHOT_TABLE} WHERE id = ?", [snapshot_id])
+
+    def _key_columns(self, conn):
+        """
+        The UPSERT_KEY columns the fact table has.
+        """
+        columns = {r[0] for r in conn.execute(f"DESCRIBE {TABLE_NAME}").fetchall()}
+        return [c for c in UPSERT_KEY if c in columns]
+
+    # ------------------------------------------------------------------
+    # Fact storage (DuckDB table or partitioned Parquet)
+    # ------------------------------------------------------------------
+
+    def _write_facts(self, conn, source, mode='append'):
+        """
+        Write the rows of relation `source` (registered on conn) into fact storage,
+        then refresh everything derived from the months that were touched.
+        mode: 'append', 'replace' or 'upsert'
+        Returns (inserted, updated) row counts for 'upsert', otherwise None.
+        """
+        with self._write_lock:
+            return self._write_facts_locked(conn, source, mode)
+
+    def _write_facts_locked(self, conn, source, mode):
+        counts = None
+        if mode == 'upsert' and not self._table_exists(conn):
+            mode = 'replace'
+        # Parquet snapshots hard-link the whole tree before its files change; in DuckDB
+        # mode an upsert snapshots the keys it changes inside its transaction and a
+        # replace turns the old table into the snapshot
+        snapshot_id = None
+        if STORAGE_MODE == 'parquet' and mode in ('upsert', 'replace'):
+            snapshot_id = self._take_snapshot(conn, f"导入前 ({mode})")
+        try:
+            source = self._conform_source(conn, source, mode)
+
+            if mode == 'upsert':
+                counts, months = self._upsert_facts(conn, source)
+            elif mode == 'append':
+                months = self._append_facts(conn, source)
+            elif STORAGE_MODE == 'parquet':
+                self._write_parquet(conn, source, mode)
+                months = None
+            else:
+                # Build the new table first; the old one then becomes the snapshot
+                staged = f"{TABLE_NAME}__staged"
+                conn.execute(
+                    f"CREATE OR REPLACE TABLE {staged} AS SELECT * FROM {source}{self._cluster_sql(conn, source)}"
+                )
+                self._take_snapshot(conn, "导入前 (replace)", move=True)
+                conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+                conn.execute(f"ALTER TABLE {staged} RENAME TO {TABLE_NAME}")
+                months = None
+        except Exception:
+            if snapshot_id is not None:
+                self._drop_snapshot(conn, snapshot_id)
+            raise
+
+        conn.execute(f"DROP VIEW IF EXISTS {source}")
+        self._after_facts_changed(conn, months)
+        return counts
+
+    def _cluster_sql(self, conn, relation):
+        """
+        ' ORDER BY ...' over the CLUSTER_KEY columns that `relation` has.
+        """
+        columns = {r[0] for r in conn.execute(f"DESCRIBE {relation}").fetchall()}
+        key = [f'"{c}"' for c in CLUSTER_KEY if c in columns]
+        return f" ORDER BY {', '.join(key)}" if key else ""
+
+    def recluster(self):
+        """
+        Rewrite the fact table in CLUSTER_KEY order. Writes keep new rows sorted, but
+        appends of older months and ad-hoc UPDATEs interleave over time.
+        """
+        if STORAGE_MODE != 'duckdb' or not self.table_exists():
+            return
+        with self.pool.connection() as conn, self._write_lock:
+            conn.execute(
+                f"CREATE OR REPLACE TABLE {TABLE_NAME} AS SELECT * FROM {TABLE_NAME}{self._cluster_sql(conn, TABLE_NAME)}"
+            )
+
+    def _conform_source(self, conn, source, mode):
+        """
+        Cast `source` to the compact fact schema (see DIMENSION_COLUMNS) and widen the
+        stored DuckDB table first where the new rows need it (new dimension values,
+        larger integers). Returns the name of a temp view over the typed rows.
+        """
+        source_columns = [(r[0], r[1]) for r in conn.execute(f"DESCRIBE {source}").fetchall()]
+        stored = {} if mode == 'replace' else {c[0]: c[1] for c in self._fact_columns(conn)}
+
+        dims = [c for c, t in source_columns
+                if c in DIMENSION_COLUMNS and (t == 'VARCHAR' or t.startswith('ENUM'))]
+        ints = [c for c, t in source_columns if t in INTEGER_TYPES]
+        stats_sql = [f'MIN("{c}"), MAX("{c}")' for c in ints]
+        stats = list(conn.execute(f"SELECT {', '.join(stats_sql)} FROM {source}").fetchone()) if stats_sql else []
+
+        target = {}
+        for col in ints:
+            target[col] = _integer_type(stats.pop(0), stats.pop(0))
+        for col, col_type in source_columns:
+            if col_type in FLOAT_TYPES:
+                target[col] = 'FLOAT'
+        # Parquet stores the dimensions as strings, but casting them here still makes the
+        # CLUSTER_KEY sort follow the ENUM order, which the views read back
+        for col in dims:
+            # Stored values keep their order; values new to the table go after them
+            if stored.get(col, '').startswith('ENUM'):
+                values = conn.execute(f"SELECT enum_range(NULL::{stored[col]})").fetchone()[0]
+            elif col in stored:
+                values = conn.execute(_first_seen_sql(col, TABLE_NAME)).fetchone()[0] or []
+            else:
+                values = []
+            incoming = conn.execute(_first_seen_sql(col, source)).fetchone()[0] or []
+            values = list(dict.fromkeys([*values, *incoming]))
+            if values:
+                target[col] = _enum_sql(values)
+
+        # Never narrow what is already stored
+        for col, col_type in list(target.items()):
+            stored_type = stored.get(col)
+            if stored_type is None or stored_type == col_type:
+                continue
+            if stored_type in INTEGER_TYPES + FLOAT_TYPES and col_type in INTEGER_TYPES + FLOAT_TYPES:
+                target[col] = _widest_numeric(stored_type, col_type)
+            elif not col_type.startswith('ENUM'):
+                target[col] = stored_type
+
+        if STORAGE_MODE == 'duckdb' and mode != 'replace':
+            for col, col_type in target.items():
+                if col in stored and stored[col] != col_type:
+                    conn.execute(f'ALTER TABLE {TABLE_NAME} ALTER "{col}" TYPE {col_type}')
+
+        select_sql = ', '.join(
+            f'CAST("{c}" AS {target[c]}) AS "{c}"' if c in target else f'"{c}"' for c, _ in source_columns
+        )
+        typed = f'_typed_{source}'
+        conn.execute(f"CREATE OR REPLACE TEMP VIEW {typed} AS SELECT {select_sql} FROM {source}")
+        return typed
+
+    def _append_facts(self, conn, source):
+        """
+        Append `source` and return the distinct 月份 values it added, read back
+        from the new rows only (new rowids / new Parquet files), not from `source`.
+        """
+        if STORAGE_MODE == 'parquet':
+            new_files = self._write_parquet(conn, source, 'append')
+            if not new_files:
+                return []
+            rows = conn.execute('SELECT DISTINCT "月份" FROM read_parquet(?)', [new_files]).fetchall()
+            return [r[0] for r in rows]
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), -1) FROM {TABLE_NAME}").fetchone()[0]
+            conn.execute(f"INSERT INTO {TABLE_NAME} SELECT * FROM {source}{self._cluster_sql(conn, source)}")
+            rows = conn.execute(
+                f'SELECT DISTINCT "月份" FROM {TABLE_NAME} WHERE rowid > ?', [max_rowid]
+            ).fetchall()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [r[0] for r in rows]
+
+    def _upsert_facts(self, conn, source):
+        """
+        Merge `source` into the facts on UPSERT_KEY: rows identical to what is stored
+        are skipped, changed keys are replaced and new keys inserted. Only the
+        changed rows are written (for Parquet, only the partitions they fall in).
+        Returns ((inserted, updated), touched 月份 values).
+        """
+        fact_columns = [r[0] for r in conn.execute(f"DESCRIBE {TABLE_NAME}").fetchall()]
+        col_sql = ', '.join(f'"{c}"' for c in fact_columns)
+        key_match = ' AND '.join(f'f."{k}" = c."{k}"' for k in UPSERT_KEY)
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            # Rows that are new or differ from the stored version; only the stored rows
+            # with incoming keys are compared, so the cost follows the batch, not the table
+            conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _upsert_changed AS
+                SELECT {col_sql} FROM {source}
+                EXCEPT
+                SELECT {col_sql} FROM {TABLE_NAME} f
+                SEMI JOIN {source} c ON {_key_match_sql('f', 'c', UPSERT_KEY)}
+            """)
+            updated = conn.execute(f"""
+                SELECT COUNT(*) FROM _upsert_changed c
+                WHERE EXISTS (SELECT 1 FROM {TABLE_NAME} f WHERE {key_match})
+            """).fetchone()[0]
+            changed = conn.execute("SELECT COUNT(*) FROM _upsert_changed").fetchone()[0]
+            months = [r[0] for r in conn.execute('SELECT DISTINCT "月份" FROM _upsert_changed').fetchall()]
+
+            if STORAGE_MODE == 'parquet':
+                self._upsert_parquet(conn, '_upsert_changed', col_sql, key_match)
+            else:
+                if changed:
+                    self._take_snapshot(conn, "导入前 (upsert)", keys='_upsert_changed')
+                conn.execute(f"DELETE FROM {TABLE_NAME} f USING _upsert_changed c WHERE {key_match}")
+                conn.execute(f"""
+                    INSERT INTO {TABLE_NAME} ({col_sql})
+                    SELECT {col_sql} FROM _upsert_changed{self._cluster_sql(conn, '_upsert_changed')}
+                """)
+
+            conn.execute("DROP TABLE _upsert_changed")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return (changed - updated, updated), months
+
+    def _upsert_parquet(self, conn, changed, col_sql, key_match):
+        """
+        Rewrite only the month partitions touched by `changed`: keep their untouched
+        rows, add the changed rows, then delete the partition's previous files.
+        """
+        touched = conn.execute(f"""
+            SELECT DISTINCT CAST("年份" AS BIGINT), strftime("月份", '%Y-%m') FROM {changed}
+        """).fetchall()
+        if not touched:
+            return
+        old_files = []
+        for year, month in touched:
+            old_files.extend(glob.glob(os.path.join(PARQUET_DIR, f'year={year}', f'month={month}', '*.parquet')))
+
+        months_sql = ', '.join(f"'{month}'" for _, month in touched)
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _upsert_merged AS
+            SELECT {col_sql} FROM {PARTITIONED_VIEW} f
+            WHERE f.month IN ({months_sql})
+              AND NOT EXISTS (SELECT 1 FROM {changed} c WHERE {key_match})
+            UNION ALL
+            SELECT {col_sql} FROM {changed}
+        """)
+        self._write_parquet(conn, '_upsert_merged', 'append')
+        conn.execute("DROP TABLE _upsert_merged")
+        # The views glob the tree at query time, so removing files needs no refresh
+        for path in old_files:
+            os.remove(path)
+
+    def _write_parquet(self, conn, source, mode):
+        """
+        COPY `source` into year=/month= partitions. 'append' only adds new files
+        (a new month writes a single new partition); 'replace' writes a fresh tree
+        next to the old one and swaps it in once the COPY succeeded.
+        Returns the files an 'append' added.
+        """
+        parquet_glob = os.path.join(PARQUET_DIR, '**', '*.parquet')
+        files_before = set(glob.glob(parquet_glob, recursive=True)) if mode == 'append' else set()
+        target_dir = PARQUET_DIR if mode == 'append' else f"{PARQUET_DIR}.tmp-{uuid.uuid4().hex[:8]}"
+        conn.execute(f"""
+            COPY (
+                SELECT *, CAST("年份" AS BIGINT) AS year, strftime("月份", '%Y-%m') AS month
+                FROM {source}{self._cluster_sql(conn, source)}
+            ) TO '{target_dir}'
+            (FORMAT PARQUET, PARTITION_BY (year, month),
+             FILENAME_PATTERN 'data_{{uuid}}', OVERWRITE_OR_IGNORE true)
+        """)
+        if mode == 'replace':
+            shutil.rmtree(PARQUET_DIR, ignore_errors=True)
+            os.replace(target_dir, PARQUET_DIR)
+            self._refresh_parquet_views(conn)
+            return []
+        new_files = sorted(set(glob.glob(parquet_glob, recursive=True)) - files_before)
+        self._refresh_parquet_views(conn, new_files)
+        return new_files
+
+    def _refresh_parquet_views(self, conn, new_files=None):
+        """
+        (Re)create the views over the Parquet tree, or drop them if it is empty.
+        new_files: files just appended to a tree the views already cover. Columns and
+        ENUM orders are then extended from those files only (the existing ones come from
+        the catalog), so every chunk of a streamed import costs the same.
+        """
+        parquet_glob = os.path.join(os.path.abspath(PARQUET_DIR), '**', '*.parquet')
+        if not glob.glob(parquet_glob, recursive=True):
+            conn.execute(f"DROP VIEW IF EXISTS {TABLE_NAME}")
+            conn.execute(f"DROP VIEW IF EXISTS {PARTITIONED_VIEW}")
+            return
+        scan_sql = f"""
+            read_parquet('{parquet_glob}', hive_partitioning = true,
+                         hive_types = {{'year': BIGINT, 'month': VARCHAR}}, union_by_name = true)
+        """
+        current, new_scan_sql = {}, None
+        if new_files is not None:
+            current = dict(conn.execute(
+                "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+                [PARTITIONED_VIEW]
+            ).fetchall())
+        if current:
+            files_sql = ', '.join("'" + os.path.abspath(f).replace("'", "''") + "'" for f in new_files)
+            new_scan_sql = f"read_parquet([{files_sql}], union_by_name = true)" if new_files else None
+            columns = list(current)
+            if new_scan_sql:
+                columns += [r[0] for r in conn.execute(f"DESCRIBE SELECT * FROM {new_scan_sql}").fetchall()
+                            if r[0] not in current]
+        else:
+            columns = [r[0] for r in conn.execute(f"DESCRIBE SELECT * FROM {scan_sql}").fetchall()]
+
+        # Parquet stores dimensions dictionary-encoded; expose them as ENUMs like the table
+        casts = []
+        for c in (c for c in DIMENSION_COLUMNS if c in columns):
+            if current.get(c, '').startswith('ENUM'):
+                values = conn.execute(f"SELECT enum_range(NULL::{current[c]})").fetchone()[0]
+                if new_scan_sql:
+                    added = conn.execute(_first_seen_sql(c, new_scan_sql)).fetchone()[0] or []
+                    values = list(dict.fromkeys(values + added))
+            else:
+                values = conn.execute(_first_seen_sql(c, scan_sql)).fetchone()[0]
+            if values:
+                casts.append(f'CAST("{c}" AS {_enum_sql(values)}) AS "{c}"')
+        replace_sql = f" REPLACE ({', '.join(casts)})" if casts else ''
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW {PARTITIONED_VIEW} AS
+            SELECT *{replace_sql} FROM {scan_sql}
+        """)
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW {TABLE_NAME} AS
+            SELECT * EXCLUDE (year, month) FROM {PARTITIONED_VIEW}
+        """)
+
+    def _after_facts_changed(self, conn, months=None):
+        """
+        Hook run after every write to the facts.
+        months: the 月份 values whose rows changed, or None if everything may have changed.
+        """
+        self._refresh_rollups(conn, months)
+        self._bump_data_version(conn, months)
+
+    def _bump_data_version(self, conn, months=None):
+        """
+        Give the touched months (or, for months=None, everything) a new version,
+        one higher than any version handed out before.
+        """
+        if months is not None:
+            scopes = sorted({pd.Timestamp(m).strftime('%Y-%m') for m in months if m is not None})
+            if not scopes:
+                return
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            version = conn.execute(f"SELECT COALESCE(MAX(version), 0) + 1 FROM {VERSION_TABLE}").fetchone()[0]
+            if months is None:
+                # Older per-month rows are superseded by the new 'all' version
+                conn.execute(f"DELETE FROM {VERSION_TABLE}")
+                conn.execute(f"INSERT INTO {VERSION_TABLE} VALUES ('all', ?)", [version])
+            else:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {VERSION_TABLE} VALUES (?, ?)",
+                    [[scope, version] for scope in scopes]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_data_version(self, start_date=None, end_date=None):
+        """
+        Current data version, optionally of the months in [start_date, end_date] only.
+        Use it as a cache key: it changes whenever rows in that range change.
+        """
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append("scope >= ?")
+            params.append(pd.Timestamp(start_date).strftime('%Y-%m'))
+        if end_date is not None:
+            conditions.append("scope <= ?")
+            params.append(pd.Timestamp(end_date).strftime('%Y-%m'))
+        where_sql = f" AND {' AND '.join(conditions)}" if conditions else ""
+        with self.pool.connection() as conn:
+            return self._fetch(
+                conn,
+                f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE} "
+                f"WHERE scope = 'all' OR (scope <> 'all'{where_sql})",
+                params, how='one'
+            )[0]
+
+    def _month_fingerprints(self, conn):
+        """
+        {月份: (row count, sum of row hashes)} - compared before/after an ad-hoc SQL
+        write to find which months it actually touched.
+        """
+        try:
+            rows = conn.execute(
+                f'SELECT "月份", COUNT(*), SUM(hash(t)) FROM {TABLE_NAME} t GROUP BY "月份"'
+            ).fetchall()
+        except duckdb.CatalogException:
+            return {}
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    # ------------------------------------------------------------------
+    # Rollups
+    # ------------------------------------------------------------------
+
+    def _fact_columns(self, conn):
+        try:
+            return conn.execute(f"DESCRIBE {TABLE_NAME}").fetchall()
+        except duckdb.CatalogException:
+            return []
+
+    def _refresh_rollups(self, conn, months=None):
+        """
+        Recompute the rollup tables for `months` only (delete + re-insert those
+        months), or rebuild them completely when months is None or the fact schema
+        no longer matches a rollup's columns.
+        """
+        fact_columns = self._fact_columns(conn)
+        column_names = [c[0] for c in fact_columns]
+        measures = [c[0] for c in fact_columns
+                    if c[0] != '年份' and c[1].split('(')[0] in NUMERIC_TYPES]
+        if months is not None:
+            months = [m for m in months if m is not None]
+            if not months:
+                return
+
+        for name, dim in ROLLUP_DIMENSIONS.items():
+            table = f'rollup_month_{name}'
+            if '月份' not in column_names or dim not in column_names:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                continue
+
+            agg_sql = ', '.join(
+                f'CAST(SUM("{m}") AS DOUBLE) AS "{m}__sum", COUNT("{m}") AS "{m}__n"' for m in measures
+            )
+            select_sql = (f'SELECT "月份", "{dim}", COUNT(*) AS "{ROLLUP_ROW_COUNT}"'
+                          f'{", " + agg_sql if agg_sql else ""}')
+            dim_type = next(c[1] for c in fact_columns if c[0] == dim)
+            expected = [('月份', None), (dim, dim_type), (ROLLUP_ROW_COUNT, None)] + \
+                [(f'{m}__{k}', None) for m in measures for k in ('sum', 'n')]
+            try:
+                existing = [(r[0], r[1] if r[0] == dim else None)
+                            for r in conn.execute(f"DESCRIBE {table}").fetchall()]
+            except duckdb.CatalogException:
+                existing = None
+
+            if months is None or existing != expected:
+                conn.execute(f"""
+                    CREATE OR REPLACE TABLE {table} AS
+                    {select_sql} FROM {TABLE_NAME} GROUP BY "月份", "{dim}"
+                """)
+                continue
+
+            where_sql = f'"月份" IN ({_months_sql(months)})'
+            source = TABLE_NAME
+            if STORAGE_MODE == 'parquet':
+                # Only read the partitions of the touched months
+                month_keys = ', '.join(f"'{pd.Timestamp(m).strftime('%Y-%m')}'" for m in months)
+                source = PARTITIONED_VIEW
+                where_sql += f" AND month IN ({month_keys})"
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                conn.execute(f'DELETE FROM {table} WHERE "月份" IN ({_months_sql(months)})')
+                conn.execute(f"""
+                    INSERT INTO {table}
+                    {select_sql} FROM {source} WHERE {where_sql} GROUP BY "月份", "{dim}"
+                """)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_rollup(self, dimension, start_date=None, end_date=None, values=None,
+                   measures=None, by_month=False):
+        """
+        Aggregate a rollup table over a month range, e.g. get_rollup('dept', ...) is
+        the rollup equivalent of df.groupby('部门').agg(measures).
+        dimension: key of ROLLUP_DIMENSIONS ('dept', 'recruiter', 'channel', 'level')
+        values: optional list of dimension values to keep
+        measures: {column: 'mean' | 'sum'}; defaults to the mean of every measure
+        by_month: also group by 月份
+        """
+        dim = ROLLUP_DIMENSIONS[dimension]
+        table = f'rollup_month_{dimension}'
+        try:
+            with self.pool.connection() as conn:
+                rollup_columns = [r[0] for r in conn.execute(f"DESCRIBE {table}").fetchall()]
+                if measures is None:
+                    measures = {c[:-len('__sum')]: 'mean' for c in rollup_columns if c.endswith('__sum')}
+
+                select_parts = []
+                for col, how in measures.items():
+                    if how == 'sum':
+                        select_parts.append(f'SUM("{col}__sum") AS "{col}"')
+                    else:
+                        select_parts.append(f'SUM("{col}__sum") / NULLIF(SUM("{col}__n"), 0) AS "{col}"')
+                select_parts.append(f'CAST(SUM("{ROLLUP_ROW_COUNT}") AS BIGINT) AS "{ROLLUP_ROW_COUNT}"')
+
+                conditions, params = [], []
+                if start_date is not None:
+                    conditions.append('"月份" >= ?')
+                    params.append(pd.Timestamp(start_date).to_pydatetime())
+                if end_date is not None:
+                    conditions.append('"月份" <= ?')
+                    params.append(pd.Timestamp(end_date).to_pydatetime())
+                if values is not None:
+                    values = list(values)
+                    if values:
+                        conditions.append(f'"{dim}" IN ({", ".join(["?"] * len(values))})')
+                        params.extend(values)
+                    else:
+                        conditions.append('FALSE')
+                where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+                group_cols = (['"月份"'] if by_month else []) + [f'"{dim}"']
+                group_sql = ', '.join(group_cols)
+                return self._fetch(conn, f"""
+                    SELECT {group_sql}, {', '.join(select_parts)}
+                    FROM {table}{where_sql}
+                    GROUP BY {group_sql} ORDER BY {group_sql}
+                """, params)
+        except duckdb.CatalogException:
+            return pd.DataFrame()
+
+    # ------------------------------------------------------------------
+    # Query instrumentation
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def query_section(self, name):
+        """
+        Attribute the queries issued inside the with-block (on this thread) to `name`,
+        e.g. the dashboard section that triggered them.
+        """
+        token = _query_section.set(name)
+        try:
+            yield
+        finally:
+            _query_section.reset(token)
+
+    def _fetch(self, conn, query, params=None, how='df'):
+        """
+        Execute `query` and materialize the result as 'df', 'arrow', 'one' (fetchone)
+        or 'all' (fetchall), recording it in the query log.
+        """
+        start = time.perf_counter()
+        rows = nbytes = error = None
+        try:
+            result = conn.execute(query, params or [])
+            if how == 'df':
+                out = result.df()
+                rows, nbytes = len(out), int(out.memory_usage(index=False).sum())
+            elif how == 'arrow':
+                out = _to_arrow_table(result)
+                rows, nbytes = out.num_rows, out.nbytes
+            elif how == 'one':
+                out = result.fetchone()
+                rows = 0 if out is None else 1
+            else:
+                out = result.fetchall()
+                rows = len(out)
+            return out
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._log_query(query, params, time.perf_counter() - start, rows, nbytes, error)
+
+    def _log_query(self, query, params, seconds, rows=None, nbytes=None, error=None):
+        entry = (
+            pd.Timestamp.now().to_pydatetime(), query_hash(query), _query_section.get(), query,
+            json.dumps(list(params or []), default=str, ensure_ascii=False),
+            seconds * 1000, rows, nbytes, error,
+        )
+        with self._query_log_lock:
+            self._query_log.append(entry)
+            if len(self._query_log) >= QUERY_LOG_FLUSH_EVERY:
+                self._flush_query_log()
+
+    def _flush_query_log(self):
+        """
+        Write buffered entries to QUERY_LOG_TABLE (caller holds _query_log_lock) on a
+        cursor of its own, and keep only the newest QUERY_LOG_MAX_ROWS.
+        """
+        if not self._query_log or self.conn is None:
+            return
+        entries, self._query_log = self._query_log, []
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(f"INSERT INTO {QUERY_LOG_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", entries)
+            cursor.execute(f"""
+                DELETE FROM {QUERY_LOG_TABLE} WHERE logged_at < (
+                    SELECT MIN(logged_at) FROM (
+                        SELECT logged_at FROM {QUERY_LOG_TABLE} ORDER BY logged_at DESC LIMIT {QUERY_LOG_MAX_ROWS}
+                    )
+                )
+            """)
+        except duckdb.Error:
+            pass  # instrumentation must never break a query
+        finally:
+            cursor.close()
+
+    def get_slowest_queries(self, limit=10, section=None):
+        """
+        Query shapes (by query_hash) ordered by their slowest run: executions, mean/max
+        wall time, rows and bytes per run, plus the text and params of the slowest run.
+        """
+        with self._query_log_lock:
+            self._flush_query_log()
+        where_sql, params = ("WHERE section = ?", [section]) if section is not None else ("", [])
+        with self.pool.connection() as conn:
+            return conn.execute(f"""
+                SELECT query_hash,
+                       ANY_VALUE(section) AS section,
+                       COUNT(*) AS executions,
+                       AVG(wall_ms) AS avg_ms,
+                       MAX(wall_ms) AS max_ms,
+                       AVG(rows_returned) AS avg_rows,
+                       AVG(bytes) AS avg_bytes,
+                       COUNT(error) AS errors,
+                       ARG_MAX(query_text, wall_ms) AS query_text,
+                       ARG_MAX(params, wall_ms) AS params
+                FROM {QUERY_LOG_TABLE} {where_sql}
+                GROUP BY query_hash
+                ORDER BY max_ms DESC
+                LIMIT {int(limit)}
+            """, params).df()
+
+    def get_section_stats(self):
+        """
+        Query count and total wall time per dashboard section.
+        """
+        with self._query_log_lock:
+            self._flush_query_log()
+        with self.pool.connection() as conn:
+            return conn.execute(f"""
+                SELECT COALESCE(section, '(未标记)') AS section, COUNT(*) AS queries,
+                       SUM(wall_ms) AS total_ms, SUM(bytes) AS total_bytes
+                FROM {QUERY_LOG_TABLE}
+                GROUP BY ALL ORDER BY total_ms DESC
+            """).df()
+
     def load_data_to_df(self):
         """
         Load all data from DuckDB to Pandas DataFrame.
         """
         try:
-            return self.conn.execute(f"SELECT * FROM {TABLE_NAME}").df()
+            with self.pool.connection() as conn:
+                query, _ = self._filtered_select(upcast=self._narrow_integer_columns(conn))
+                return self._fetch(conn, query)
         except duckdb.CatalogException:
             return pd.DataFrame() # Return empty if table doesn't exist
 
+    def count_rows(self):
+        """
+        Number of rows in the fact table (0 if the table doesn't exist).
+        """
+        try:
+            with self.pool.connection() as conn:
+                return self._fetch(conn, f"SELECT COUNT(*) FROM {TABLE_NAME}", how='one')[0]
+        except duckdb.CatalogException:
+            return 0
+
+    def _build_filter_clause(self, start_date=None, end_date=None, quarters=None,
+                             years=None, departments=None, recruiter=None):
+        """
+        Translate sidebar filters into a parameterized WHERE clause.
+        None means "no filter"; an empty list matches nothing (same as pandas isin([])).
+        """
+        conditions = []
+        params = []
+
+        partitioned = STORAGE_MODE == 'parquet'
+
+        if start_date is not None:
+            conditions.append('"月份" >= ?')
+            params.append(pd.Timestamp(start_date).to_pydatetime())
+            if partitioned:
+                # Partition predicate so DuckDB skips older month directories entirely
+                conditions.append('month >= ?')
+                params.append(pd.Timestamp(start_date).strftime('%Y-%m'))
+        if end_date is not None:
+            conditions.append('"月份" <= ?')
+            params.append(pd.Timestamp(end_date).to_pydatetime())
+            if partitioned:
+                conditions.append('month <= ?')
+                params.append(pd.Timestamp(end_date).strftime('%Y-%m'))
+
+        for col, values in (('季度', quarters), ('年份', years), ('部门', departments)):
+            if values is None:
+                continue
+            values = list(values)
+            if not values:
+                conditions.append('FALSE')
+                continue
+            values = [v.item() if hasattr(v, 'item') else v for v in values]
+            placeholders = ', '.join(['?'] * len(values))
+            conditions.append(f'"{col}" IN ({placeholders})')
+            params.extend(values)
+            if partitioned and col == '年份':
+                conditions.append(f'year IN ({placeholders})')
+                params.extend(values)
+
+        if recruiter is not None:
+            conditions.append('"招聘顾问" = ?')
+            params.append(recruiter)
+
+        where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where_sql, params
+
+    def _narrow_integer_columns(self, conn):
+        """
+        Fact columns stored as an integer type narrower than BIGINT.
+        """
+        return [c for c, t, *_ in self._fact_columns(conn) if t in INTEGER_TYPES and t != 'BIGINT']
+
+    def _filtered_select(self, columns=None, upcast=(), **filters):
+        """
+        SELECT statement (and params) for the given filters and column selection.
+        upcast: columns read as BIGINT. Loads into pandas pass the narrow integer columns,
+        since int16/int32 arithmetic in pandas wraps silently (30000 + 30000 is -5536).
+        """
+        where_sql, params = self._build_filter_clause(**filters)
+        casts = {c: f'CAST("{c}" AS BIGINT) AS "{c}"' for c in upcast}
+        if columns:
+            select_sql = ', '.join(casts.get(c, f'"{c}"') for c in columns)
+        else:
+            # Query the raw view in Parquet mode so partition predicates reach read_parquet
+            select_sql = '* EXCLUDE (year, month)' if STORAGE_MODE == 'parquet' else '*'
+            if casts:
+                select_sql += f" REPLACE ({', '.join(casts.values())})"
+        source = PARTITIONED_VIEW if STORAGE_MODE == 'parquet' else TABLE_NAME
+        return f"SELECT {select_sql} FROM {source}{where_sql}", params
+
+    def load_filtered_data(self, start_date=None, end_date=None, quarters=None,
+                           years=None, departments=None, recruiter=None, columns=None):
+        """
+        Load only the rows (and optionally columns) matching the role's filters.
+        Filtering happens inside DuckDB, so memory grows with the selection, not the table.
+        """
+        try:
+            with self.pool.connection() as conn:
+                query, params = self._filtered_select(
+                    columns, upcast=self._narrow_integer_columns(conn), start_date=start_date,
+                    end_date=end_date, quarters=quarters, years=years, departments=departments,
+                    recruiter=recruiter
+                )
+                return self._fetch(conn, query, params)
+        except duckdb.CatalogException:
+            return pd.DataFrame()
+
+    def load_filtered_arrow(self, start_date=None, end_date=None, quarters=None,
+                            years=None, departments=None, recruiter=None, columns=None):
+        """
+        Same as load_filtered_data, but returns a pyarrow Table (no pandas conversion).
+        """
+        query, params = self._filtered_select(
+            columns, start_date=start_date, end_date=end_date, quarters=quarters,
+            years=years, departments=departments, recruiter=recruiter
+        )
+        return self.execute_query_arrow(query, params)
+
+    def iter_filtered_batches(self, start_date=None, end_date=None, quarters=None,
+                              years=None, departments=None, recruiter=None,
+                              columns=None, batch_size=BATCH_SIZE):
+        """
+        Stream the filtered rows as pyarrow RecordBatches of at most batch_size rows.
+        """
+        query, params = self._filtered_select(
+            columns, start_date=start_date, end_date=end_date, quarters=quarters,
+            years=years, departments=departments, recruiter=recruiter
+        )
+        yield from self.iter_query_batches(query, params, batch_size=batch_size)
+
+    def export_filtered(self, fmt='csv', start_date=None, end_date=None, quarters=None,
+                        years=None, departments=None, recruiter=None, columns=None):
+        """
+        Write the rows (and optionally columns) matching the role's filters to a temp
+        file with COPY ... TO, in one of EXPORT_FORMATS, and return its path.
+        The caller hands the file to the browser and deletes it.
+        """
+        suffix, options, codec = EXPORT_FORMATS[fmt]
+        query, params = self._filtered_select(
+            columns, start_date=start_date, end_date=end_date, quarters=quarters,
+            years=years, departments=departments, recruiter=recruiter
+        )
+        fd, path = tempfile.mkstemp(prefix='recruitment_export_', suffix=suffix)
+        os.close(fd)
+        quoted_path = path.replace("'", "''")
+        copy_sql = f"COPY ({query}) TO '{quoted_path}' ({options})"
+        start = time.perf_counter()
+        rows = error = None
+        try:
+            with self.pool.connection() as conn:
+                rows = conn.execute(copy_sql, params).fetchone()[0]
+            if fmt.startswith('csv'):
+                _prepend_bom(path, codec)
+            return path
+        except Exception as e:
+            error = type(e).__name__
+            os.remove(path)
+            raise
+        finally:
+            nbytes = os.path.getsize(path) if error is None else None
+            # Log with a fixed file name, so repeated exports share one query_hash
+            self._log_query(f"COPY ({query}) TO 'export{suffix}' ({options})", params,
+                            time.perf_counter() - start, rows, nbytes, error)
+
+    def get_month_range(self, recruiter=None):
+        """
+        (min 月份, max 月份) overall or for a single recruiter, as pandas Timestamps.
+        """
+        query, params = self._filtered_select(columns=['月份'], recruiter=recruiter)
+        try:
+            with self.pool.connection() as conn:
+                min_month, max_month = self._fetch(
+                    conn, f'SELECT MIN("月份"), MAX("月份") FROM ({query})', params, how='one'
+                )
+        except duckdb.CatalogException:
+            return None, None
+        if min_month is None:
+            return None, None
+        return pd.Timestamp(min_month), pd.Timestamp(max_month)
+
+    def get_filter_options(self):
+        """
+        Small dimension lookups for the sidebar widgets (no fact rows are loaded).
+        Values are returned ordered by their first 月份, then by value.
+        """
+        min_month, max_month = self.get_month_range()
+        options = {'min_month': min_month, 'max_month': max_month}
+        for key, col in (('quarters', '季度'), ('years', '年份'),
+                         ('departments', '部门'), ('recruiters', '招聘顾问')):
+            try:
+                with self.pool.connection() as conn:
+                    rows = self._fetch(
+                        conn, f'SELECT "{col}" FROM {TABLE_NAME} GROUP BY "{col}" ORDER BY MIN("月份"), "{col}"',
+                        how='all'
+                    )
+            except duckdb.CatalogException:
+                rows = []
+            options[key] = [r[0] for r in rows]
+        return options
+
     def import_data(self, df, mode='append'):
         """
         Import data from DataFrame.
-        mode: 'append' or 'replace'
+        mode: 'append', 'replace' or 'upsert' (merge on UPSERT_KEY: update changed rows, insert new ones)
         """
         try:
             # Sanitize data first
             df_clean = self._sanitize_df(df)
             
-            self.conn.register('upload_df', df_clean)
-            if mode == 'replace':
-                self.conn.execute(f"CREATE OR REPLACE TABLE {TABLE_NAME} AS SELECT * FROM upload_df")
-            elif mode == 'append':
-                self.conn.execute(f"INSERT INTO {TABLE_NAME} SELECT * FROM upload_df")
-            self.conn.unregister('upload_df')
-            return True, f"Successfully imported {len(df)} records ({mode})."
+            with self.pool.connection() as conn:
+                conn.register('upload_df', df_clean)
+                upsert_counts = self._write_facts(conn, 'upload_df', mode=mode)
+                conn.unregister('upload_df')
+        except Exception as e:
+            return False, str(e)
+        if upsert_counts is not None:
+            inserted, updated = upsert_counts
+            unchanged = len(df) - inserted - updated
+            message = (f"Successfully merged {len(df)} records (upsert): "
+                       f"{inserted} inserted, {updated} updated, {unchanged} unchanged.")
+        else:
+            message = f"Successfully imported {len(df)} records ({mode})."
+        return True, self._with_maintenance(message, mode)
+
+    def import_batches(self, batches, mode='replace'):
+        """
+        Import an iterable of DataFrames chunk by chunk: the first with `mode`
+        ('replace' or 'append'), the rest appended. Only the current chunk is held in
+        memory, so e.g. generated load-test data imports in constant memory.
+        """
+        rows = chunks = 0
+        try:
+            with self.pool.connection() as conn, self._write_lock:
+                for batch in batches:
+                    conn.register('batch_df', self._sanitize_df(batch))
+                    try:
+                        self._write_facts(conn, 'batch_df', mode=mode if chunks == 0 else 'append')
+                    finally:
+                        conn.unregister('batch_df')
+                    rows += len(batch)
+                    chunks += 1
+                    del batch  # let the next chunk reuse the memory
         except Exception as e:
             return False, str(e)
+        return True, self._with_maintenance(f"Successfully imported {rows} records in {chunks} chunks ({mode}).", mode)
+
+    def import_file(self, path, mode='append', progress_callback=None):
+        """
+        Import a CSV/XLSX/Parquet file from disk without loading it into pandas.
+        DuckDB reads CSV (streaming, with type inference) and Parquet directly; XLSX goes through
+        read_xlsx when the excel extension is available, otherwise it is streamed
+        row-batch by row-batch with openpyxl. Peak memory does not grow with file size.
+        progress_callback(fraction) is called from the calling thread while DuckDB works.
+        mode: 'append', 'replace' or 'upsert'
+        """
+        try:
+            rows_before = self.count_rows()
+            with self.pool.connection() as conn:
+                source = self._register_file_source(conn, path)
+                try:
+                    upsert_counts = self._run_with_progress(
+                        conn, lambda: self._write_facts(conn, source, mode=mode), progress_callback
+                    )
+                finally:
+                    conn.execute(f"DROP VIEW IF EXISTS {source}")
+                    conn.execute(f"DROP VIEW IF EXISTS {source}_raw")
+                    try:
+                        conn.unregister(f'{source}_raw')
+                    except duckdb.Error:
+                        pass
+                if upsert_counts is not None:
+                    inserted, updated = upsert_counts
+                    message = f"Successfully merged file (upsert): {inserted} inserted, {updated} updated."
+                else:
+                    imported = self._fetch(conn, f"SELECT COUNT(*) FROM {TABLE_NAME}", how='one')[0]
+                    imported -= 0 if mode == 'replace' else rows_before
+                    message = f"Successfully imported {imported} records ({mode})."
+        except Exception as e:
+            return False, str(e)
+        return True, self._with_maintenance(message, mode)
+
+    def _register_file_source(self, conn, path, name='upload_file'):
+        """
+        Expose the file at `path` as temp view `name`, with 月份 normalized to TIMESTAMP.
+        """
+        path_sql = os.path.abspath(path).replace("'", "''")
+        ext = os.path.splitext(path)[1].lower()
+        raw = f'{name}_raw'
+        if ext in ('.xlsx', '.xls'):
+            try:
+                conn.execute(f"CREATE OR REPLACE TEMP VIEW {raw} AS SELECT * FROM read_xlsx('{path_sql}')")
+                conn.execute(f"DESCRIBE {raw}")
+            except duckdb.Error:
+                # excel extension unavailable (e.g. offline): stream rows with openpyxl
+                conn.execute(f"DROP VIEW IF EXISTS {raw}")
+                conn.register(raw, self._xlsx_batch_reader(path))
+        elif ext == '.parquet':
+            conn.execute(f"CREATE OR REPLACE TEMP VIEW {raw} AS SELECT * FROM read_parquet('{path_sql}')")
+        else:
+            conn.execute(f"CREATE OR REPLACE TEMP VIEW {raw} AS SELECT * FROM read_csv('{path_sql}', auto_detect = true)")
+
+        columns = [r[0] for r in conn.execute(f"DESCRIBE {raw}").fetchall()]
+        replace_sql = ' REPLACE (CAST("月份" AS TIMESTAMP) AS "月份")' if '月份' in columns else ''
+        conn.execute(f"CREATE OR REPLACE TEMP VIEW {name} AS SELECT *{replace_sql} FROM {raw}")
+        return name
+
+    def _xlsx_batch_reader(self, path, batch_rows=XLSX_BATCH_ROWS):
+        """
+        pyarrow RecordBatchReader over the first sheet of an XLSX file.
+        Column types are inferred from the first batch: numbers -> float64 (Excel
+        stores doubles), dates -> timestamp, anything else -> string.
+        """
+        from openpyxl import load_workbook
+        from datetime import date, datetime
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+
+        def row_batches():
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= batch_rows:
+                    yield buffer
+                    buffer = []
+            if buffer:
+                yield buffer
+
+        def infer_type(values):
+            present = [v for v in values if v is not None]
+            if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                return pa.float64()
+            if present and all(isinstance(v, (date, datetime)) for v in present):
+                return pa.timestamp('us')
+            return pa.string()
+
+        def to_batch(buffer, schema):
+            columns = list(zip(*buffer)) if buffer else [[] for _ in header]
+            arrays = []
+            for values, field in zip(columns, schema):
+                if field.type == pa.string():
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        batches = row_batches()
+        first = next(batches, [])
+        first_columns = list(zip(*first)) if first else [[] for _ in header]
+        schema = pa.schema([(h, infer_type(v)) for h, v in zip(header, first_columns)])
+
+        def all_batches():
+            try:
+                yield to_batch(first, schema)
+                for buffer in batches:
+                    yield to_batch(buffer, schema)
+            finally:
+                workbook.close()
+
+        return pa.RecordBatchReader.from_batches(schema, all_batches())
+
+    def _run_with_progress(self, conn, work, progress_callback=None):
+        """
+        Run `work` on a worker thread and report conn.query_progress() to the caller.
+        """
+        if progress_callback is None:
+            return work()
+
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = work()
+            except Exception as e:
+                outcome['error'] = e
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        while worker.is_alive():
+            worker.join(PROGRESS_POLL_INTERVAL)
+            progress = conn.query_progress()
+            if progress >= 0:
+                progress_callback(min(progress, 100.0) / 100.0)
+        if 'error' in outcome:
+            raise outcome['error']
+        progress_callback(1.0)
+        return outcome.get('result')
 
     def execute_query(self, query):
         """
         Execute arbitrary SQL query.
+        Writes refresh the rollups: DML only for the months whose rows changed,
+        schema changes (DDL) rebuild them completely.
         """
         try:
-            result = self.conn.execute(query).df()
+            with self.pool.connection() as conn:
+                kind = classify_statement(query)
+                if kind == 'read':
+                    result = self._fetch(conn, query)
+                else:
+                    with self._write_lock:
+                        result = self._execute_write(conn, query, kind)
             return True, result
         except Exception as e:
             return False, str(e)
+
+    def _execute_write(self, conn, query, kind):
+        """
+        Run a 'dml'/'ddl' statement and refresh what depends on the facts.
+        DML on the Parquet views is rejected; Parquet facts change through imports.
+        The facts it changes are snapshotted inside its transaction (and dropped again
+        if it fails): DML only the keys whose rows it changed (DuckDB mode), other
+        statements all facts, if they changed the fact table at all.
+        Caller holds the write lock.
+        """
+        if kind == 'dml' and STORAGE_MODE == 'parquet' and self._table_exists(conn):
+            raise ValueError(
+                f"{TABLE_NAME} is a read-only view over Parquet files in 'parquet' storage mode; "
+                "UPDATE/INSERT/DELETE are not supported there. Change facts by importing "
+                "a file with mode 'upsert' (or 'append'/'replace') instead."
+            )
+        if kind == 'dml' and STORAGE_MODE == 'duckdb' and self._table_exists(conn):
+            try:
+                result, touched = self._execute_dml(conn, query)
+            except duckdb.ConversionException:
+                # A value the compact schema cannot hold (new dimension value, integer out
+                # of range): widen the compact columns, rerun, then compact them again
+                widened = self._widen_compact_columns(conn)
+                if not widened:
+                    raise
+                try:
+                    result, touched = self._execute_dml(conn, query)
+                finally:
+                    self._compact_columns(conn, widened)
+            self._after_facts_changed(conn, touched)
+            return result
+
+        if kind == 'dml':
+            before = self._month_fingerprints(conn)
+            result = self._fetch(conn, query)
+            after = self._month_fingerprints(conn)
+            touched = [m for m in set(before) | set(after) if before.get(m) != after.get(m)]
+            self._after_facts_changed(conn, touched)
+            return result
+
+        statement_types = {statement.type for statement in duckdb.extract_statements(query)}
+        if not statement_types & set(TABLE_CHANGING_STATEMENT_TYPES):
+            return self._fetch(conn, query)
+        result, changed = self._execute_ddl(conn, query)
+        if changed:
+            self._after_facts_changed(conn, None)
+        return result
+
+    def _fact_fingerprint(self, conn):
+        """
+        (oid, columns, row count) of the fact table, None if it doesn't exist. Replacing
+        or altering the table, or adding rows to it, changes the fingerprint.
+        """
+        if not self._table_exists(conn):
+            return None
+        oid = conn.execute(f"""
+            SELECT table_oid FROM duckdb_tables() WHERE table_name = '{TABLE_NAME}' AND NOT temporary
+            UNION ALL
+            SELECT view_oid FROM duckdb_views() WHERE view_name = '{TABLE_NAME}' AND NOT temporary
+        """).fetchall()
+        columns = conn.execute(f"DESCRIBE {TABLE_NAME}").fetchall()
+        rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+        return oid, columns, rows
+
+    def _execute_ddl(self, conn, query):
+        """
+        Run a statement that may change the fact table without DML (CREATE OR REPLACE,
+        ALTER, DROP, COPY ... FROM) in one transaction. Only if the fact fingerprint
+        changed are the previous facts snapshotted, read through a second transaction
+        that began before the statement. Returns (result, whether the facts changed).
+        """
+        reader = conn.cursor()
+        snapshot_id = None
+        try:
+            reader.execute("BEGIN TRANSACTION")
+            before = self._fact_fingerprint(reader)  # also pins the pre-statement state
+            conn.execute("BEGIN TRANSACTION")
+            result = self._fetch(conn, query)
+            changed = self._fact_fingerprint(conn) != before
+            if changed and before is not None:
+                snapshot_id = self._take_snapshot(reader, "SQL 更新前")
+            reader.execute("COMMIT")
+            conn.execute("COMMIT")
+        except Exception:
+            for cursor in (conn, reader):
+                try:
+                    cursor.execute("ROLLBACK")
+                except duckdb.Error:
+                    pass  # no open transaction
+            if snapshot_id is not None:
+                self._drop_snapshot(conn, snapshot_id)
+            raise
+        finally:
+            reader.close()
+        return result, changed
+
+    def _widen_compact_columns(self, conn):
+        """
+        ALTER the fact table's ENUM dimensions to VARCHAR and its narrow integer measures
+        to BIGINT, so a console write can store any value. Returns {column: previous type}.
+        """
+        widened = {}
+        for col, col_type, *_ in self._fact_columns(conn):
+            if col_type.startswith('ENUM'):
+                wide_type = 'VARCHAR'
+            elif col_type in INTEGER_TYPES and col_type != 'BIGINT':
+                wide_type = 'BIGINT'
+            else:
+                continue
+            conn.execute(f'ALTER TABLE {TABLE_NAME} ALTER "{col}" TYPE {wide_type}')
+            widened[col] = col_type
+        return widened
+
+    def _compact_columns(self, conn, widened):
+        """
+        Undo _widen_compact_columns the way an import widens the schema: ENUMs keep their
+        previous values in order, followed by the values new to the table; integers get
+        the narrowest type holding their range, never narrower than before.
+        """
+        ints = [c for c, t in widened.items() if t in INTEGER_TYPES]
+        stats = []
+        if ints:
+            stats_sql = ', '.join(f'MIN("{c}"), MAX("{c}")' for c in ints)
+            stats = list(conn.execute(f"SELECT {stats_sql} FROM {TABLE_NAME}").fetchone())
+        for col, previous in widened.items():
+            if previous.startswith('ENUM'):
+                values = conn.execute(f"SELECT enum_range(NULL::{previous})").fetchone()[0]
+                values += conn.execute(_first_seen_sql(col, TABLE_NAME)).fetchone()[0] or []
+                col_type = _enum_sql(dict.fromkeys(values))
+            else:
+                col_type = _widest_numeric(previous, _integer_type(stats.pop(0), stats.pop(0)))
+            conn.execute(f'ALTER TABLE {TABLE_NAME} ALTER "{col}" TYPE {col_type}')
+
+    def _execute_dml(self, conn, query):
+        """
+        Run DML on the fact table in one transaction and snapshot only the rows it changed.
+        Each row's (rowid, hash) before and after the statement identifies the changed
+        keys; their previous contents are read through a second transaction that began
+        before the write and therefore still sees them.
+        Returns (result, 月份 values of the changed keys, or None if 月份 is not a key).
+        """
+        key_columns = self._key_columns(conn)
+        key_sql = ', '.join(f'"{c}"' for c in key_columns)
+        row_state = f'SELECT rowid AS _rowid, hash(t) AS _hash, {key_sql} FROM {TABLE_NAME} t'
+        reader = conn.cursor()
+        snapshot_id = None
+        try:
+            reader.execute("BEGIN TRANSACTION")
+            reader.execute(f"SELECT COUNT(*) FROM {SNAPSHOT_TABLE}").fetchone()  # pin the pre-write state
+            conn.execute("BEGIN TRANSACTION")
+            conn.execute(f"CREATE OR REPLACE TEMP TABLE _dml_before AS {row_state}")
+            result = self._fetch(conn, query)
+            changed_keys = _to_arrow_table(conn.execute(f"""
+                SELECT DISTINCT {key_sql} FROM (
+                    ({row_state} EXCEPT SELECT * FROM _dml_before)
+                    UNION ALL
+                    (SELECT * FROM _dml_before EXCEPT {row_state})
+                )
+            """))
+            conn.execute("DROP TABLE _dml_before")
+            if changed_keys.num_rows:
+                reader.register('_dml_changed_keys', changed_keys)
+                snapshot_id = self._take_snapshot(reader, "SQL 更新前", keys='_dml_changed_keys')
+                reader.unregister('_dml_changed_keys')
+            reader.execute("COMMIT")
+            conn.execute("COMMIT")
+        except Exception:
+            for cursor in (conn, reader):
+                try:
+                    cursor.execute("ROLLBACK")
+                except duckdb.Error:
+                    pass  # no open transaction
+            if snapshot_id is not None:
+                self._drop_snapshot(conn, snapshot_id)
+            raise
+        finally:
+            reader.close()
+        if '月份' not in key_columns:
+            return result, None
+        return result, changed_keys.column('月份').unique().to_pylist()
+
+    def start_console_query(self, query, page=0, page_size=CONSOLE_PAGE_SIZE, timeout=CONSOLE_TIMEOUT):
+        """
+        Start `query` on a worker thread and return its ConsoleQuery handle right away.
+        Reads return rows [page * page_size, (page + 1) * page_size) only, so an
+        accidental huge result is never materialized in full.
+        """
+        return ConsoleQuery(self, query, page=page, page_size=page_size, timeout=timeout)
+
+    def explain_analyze(self, query, params=None, as_text=False):
+        """
+        Run a single SELECT under EXPLAIN ANALYZE and return DuckDB's JSON profile: a tree
+        of operators with timings, cardinalities and rows scanned. Anything else is refused,
+        since EXPLAIN ANALYZE executes the statement.
+        as_text: return the rendered plan (as printed by the DuckDB CLI) instead.
+        """
+        if not is_select_query(query):
+            raise ValueError("EXPLAIN ANALYZE only re-runs a single SELECT statement")
+        fmt = 'TEXT' if as_text else 'JSON'
+        with self.pool.connection() as conn:
+            plan = conn.execute(f"EXPLAIN (ANALYZE, FORMAT {fmt}) {query}", params or []).fetchone()[1]
+        return plan if as_text else json.loads(plan)
+
+    def execute_query_arrow(self, query, params=None):
+        """
+        Run a read query and return the result as a pyarrow Table.
+        Returns an empty table if the fact table doesn't exist yet.
+        """
+        try:
+            with self.pool.connection() as conn:
+                return self._fetch(conn, query, params, how='arrow')
+        except duckdb.CatalogException:
+            return pa.table({})
+
+    def iter_query_batches(self, query, params=None, batch_size=BATCH_SIZE):
+        """
+        Run a read query and yield pyarrow RecordBatches as DuckDB produces them.
+        The pooled cursor stays checked out until the generator is exhausted or closed,
+        so consumers (exports, charts, insights) never hold the full result in memory.
+        """
+        start = time.perf_counter()
+        rows = nbytes = 0
+        try:
+            with self.pool.connection() as conn:
+                reader = _to_arrow_reader(conn.execute(query, params or []), batch_size)
+                for batch in reader:
+                    rows += batch.num_rows
+                    nbytes += batch.nbytes
+                    yield batch
+        except duckdb.CatalogException:
+            return
+        finally:
+            # Wall time includes the consumer's work between batches
+            self._log_query(query, params, time.perf_counter() - start, rows, nbytes)
             
     def close(self):
+        """
+        Checkpoint and close the database (also runs at interpreter exit).
+        """
+        if self.conn is None:
+            return
+        with self._query_log_lock:
+            self._flush_query_log()
+        self.checkpoint()
+        self.pool.close()
         self.conn.close()
+        self.conn = None
+        if DBManager._instance is self:
+            DBManager._instance = None
+
+
+if __name__ == '__main__':
+    # python db_manager.py compact | snapshot | snapshots | restore <snapshot id>
+    import sys
+
+    usage = "usage: python db_manager.py compact | snapshot | snapshots | restore <snapshot id>"
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else (None, [])
+    if command == 'compact' and not args:
+        report = DBManager().compact()
+        print(f"{DB_PATH}: {report['size_before'] / 2 ** 20:.2f}MB -> {report['size_after'] / 2 ** 20:.2f}MB, "
+              f"open {report['open_before'] * 1000:.1f}ms -> {report['open_after'] * 1000:.1f}ms")
+    elif command == 'snapshot' and not args:
+        print(DBManager().snapshot() or "no facts to snapshot")
+    elif command == 'snapshots' and not args:
+        print(DBManager().list_snapshots().to_string(index=False))
+    elif command == 'restore' and len(args) == 1:
+        start = time.perf_counter()
+        rows = DBManager().restore_snapshot(args[0])
+        print(f"restored {args[0]}: {rows:,} rows in {time.perf_counter() - start:.2f}s")
+    else:
+        sys.exit(usage)
@@ -1,6 +1,5 @@
 import pandas as pd
-import duckdb
-from data_generator_complete import generate_complete_recruitment_data
+from scale_profiles import load_profile
 import db_manager
 import os
 
@@ -15,16 +14,14 @@ if os.path.exists(db_manager.DB_PATH):
 from db_manager import DBManager
 
 try:
-    print("Generating data...")
-    df = generate_complete_recruitment_data(months=12, recruiters=5, departments=5)
-    print("Data generated.")
+    print("Loading demo profile...")
+    df = load_profile('demo')
+    print("Data loaded.")
     
     print("\nAttempting DB Init via DBManager (with sanitization)...")
+    # DB_PATH is patched above, so the shared handle and its pool point at the debug db
     db = DBManager()
     
-    # Force new connection to debug db
-    db.conn = duckdb.connect(db_manager.DB_PATH)
-    
     db.init_db(df)
     
     print("Success! Data loaded into", db_manager.DB_PATH)
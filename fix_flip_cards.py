@@ -12,12 +12,12 @@ if 'flip_card_system' in sys.modules:
     importlib.reload(sys.modules['flip_card_system'])
 
 from flip_card_system import inject_flip_card_css, render_metric_flip_card
-from data_generator_complete import generate_complete_recruitment_data
+from scale_profiles import load_profile
 
 st.set_page_config(page_title="Flip Card Fix Test", layout="wide")
 
-# 生成测试数据
-df = generate_complete_recruitment_data(months=3, recruiters=2, departments=3)
+# 测试数据 (demo 预设, 首次运行后从缓存的 fixture 读取)
+df = load_profile('demo')
 
 # 注入CSS
 primary_color = '#4A5FE8'
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from metric_engine import compute_kpis
+
 # ==========================================
 # 翻转卡片 CSS 系统 (✅ 修复黑块+翻转失效)
 # ==========================================
@@ -326,11 +328,20 @@ def render_metrics_flip_cards_row(
     role: str = 'HRVP',
     columns_count: int = 5
 ):
+    # 聚合方式取注册表中的 'agg'; 没有声明时损失/成本类合计, 其余取平均. 整行在一次聚合中算出
+    metrics = {
+        d['metric_key']: {
+            'agg': d['metric_info'].get('agg')
+            or ('sum' if '损失' in d['metric_key'] or '成本' in d['metric_key'] else 'mean')
+        }
+        for d in metrics_list
+    }
+    kpis = compute_kpis(df_filtered, metrics)
     cols = st.columns(columns_count)
     for idx, metric_dict in enumerate(metrics_list):
         metric_key = metric_dict['metric_key']
         metric_info = metric_dict['metric_info']
-        current_value = df_filtered[metric_key].sum() if '损失' in metric_key or '成本' in metric_key else df_filtered[metric_key].mean()
+        current_value = kpis[metric_key]
         target = metric_info['target']
         with cols[idx % columns_count]:
             render_metric_flip_card(metric_key, metric_info, current_value, target, role)
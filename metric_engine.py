@@ -0,0 +1,94 @@
+"""
+指标计算引擎
+按指标注册表 (HRVP_CORE_METRICS / HRD_EXCEPTION_METRICS / HR_EXECUTION_METRICS / METRICS_METADATA)
+中每个指标的聚合规格 'agg' 计算一个角色的全部 KPI
+
+聚合规格:
+- 'mean' / 'sum' / 'max' / 'min': 对指标同名列聚合 (pandas 单列归约, 比交给 DuckDB 更快)
+- 'last': 最后一行的值 (按 DataFrame 行序)
+- {'sql': 聚合表达式, 'columns': [用到的列]}: 自定义 DuckDB 聚合表达式 (如带 FILTER 的计数),
+  同一角色的全部自定义表达式编译成一条聚合查询, 不必为每张卡片构造筛选后的 DataFrame 副本
+没有 'agg' 的指标 (如固定展示值) 不计算
+"""
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+AGGREGATIONS = {'mean': 'AVG', 'sum': 'SUM', 'max': 'MAX', 'min': 'MIN'}
+
+# 引擎自己的内存连接, 每次计算使用独立的 cursor (可在多个会话线程中并发使用)
+_conn = duckdb.connect()
+
+
+def metric_aggregations(metrics, extras=None):
+    """
+    {名称: 聚合规格}: 注册表中带 'agg' 的指标, 加上 extras (卡片上展示的辅助数值)
+    """
+    specs = {key: info['agg'] for key, info in metrics.items() if info.get('agg') is not None}
+    specs.update(extras or {})
+    return specs
+
+
+def compile_kpi_query(specs, columns, table='kpi_df'):
+    """
+    把聚合规格编译成对 table 的一条 SELECT
+    返回 (sql, 查询结果对应的名称列表, 'last' 指标列表, 查询用到的列); 所需列不存在的指标跳过
+    """
+    columns = set(columns)
+    select_parts, names, last, used = [], [], [], []
+    for name, spec in specs.items():
+        needed = spec.get('columns', []) if isinstance(spec, dict) else [name]
+        if not set(needed) <= columns:
+            continue
+        if isinstance(spec, dict):
+            expr = spec['sql']
+        elif spec == 'last':
+            last.append(name)
+            continue
+        elif spec in AGGREGATIONS:
+            expr = f'{AGGREGATIONS[spec]}("{name}")'
+        else:
+            raise ValueError(f"Unknown aggregation for {name}: {spec!r}")
+        select_parts.append(f'{expr} AS "{name}"')
+        names.append(name)
+        used.extend(column for column in needed if column not in used)
+    sql = f"SELECT {', '.join(select_parts)} FROM {table}" if select_parts else None
+    return sql, names, last, used
+
+
+def compute_kpis(df, metrics, extras=None):
+    """
+    计算 metrics (注册表) 与 extras 中的全部指标, 返回 {名称: 值}
+    单列聚合直接用 pandas 归约; 自定义 SQL 表达式合并为一次 DuckDB 聚合扫描
+    无法计算的指标 (列缺失, 无数据) 为 NaN; 与 pandas 一致, 空数据的 'sum' 为 0
+    """
+    specs = metric_aggregations(metrics, extras)
+    values = dict.fromkeys(specs, np.nan)
+    sql_specs = {}
+    for name, spec in specs.items():
+        if isinstance(spec, dict):
+            sql_specs[name] = spec
+        elif name not in df.columns:
+            continue
+        elif spec == 'last':
+            if len(df) > 0:
+                values[name] = df[name].iloc[-1]
+        elif spec in AGGREGATIONS:
+            values[name] = getattr(df[name], spec)()
+        else:
+            raise ValueError(f"Unknown aggregation for {name}: {spec!r}")
+
+    sql, names, _, used = compile_kpi_query(sql_specs, df.columns)
+    if sql is not None:
+        # 只把用到的列交给 DuckDB (数值列零拷贝转 Arrow, NaN 视为缺失, 与 pandas 一致);
+        # 直接注册整个 DataFrame 会先分析全部 object 列, 宽表上比聚合本身还慢
+        kpi_table = pa.table({column: pa.Array.from_pandas(df[column]) for column in used})
+        cursor = _conn.cursor()
+        try:
+            cursor.register('kpi_df', kpi_table)
+            row = cursor.execute(sql).fetchone()
+        finally:
+            cursor.close()
+        values.update({name: np.nan if value is None else value for name, value in zip(names, row)})
+    return values
@@ -11,12 +11,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import json
 import sys
 import os
 
 # 导入所有模块
-from data_generator_complete import seed_db_with_generated_data, METRICS_METADATA
-from db_manager import DBManager
+from data_generator_complete import append_generated_months, ensure_db_seeded, METRICS_METADATA
+from scale_profiles import SCALE_PROFILES, ensure_profile_seeded, profile_rows, seed_db_with_profile
+from db_manager import DBManager, EXPORT_FORMATS, PROGRESS_POLL_INTERVAL, STORAGE_MODE, is_select_query
 from brand_color_system import (
     initialize_brand_system,
     render_brand_color_configurator_inline,
@@ -24,8 +26,8 @@ from brand_color_system import (
     get_brand_colors,
     get_primary_color
 )
-from dashboard_hrvp import render_hrvp_dashboard, HRVP_CORE_METRICS
-from dashboard_hrd import render_hrd_dashboard, HRD_EXCEPTION_METRICS
+from dashboard_hrvp import render_hrvp_dashboard, simulate_hrvp_columns, HRVP_CORE_METRICS
+from dashboard_hrd import render_hrd_dashboard, derive_hrd_columns, HRD_EXCEPTION_METRICS, HRD_FUNNEL_COLUMNS
 from dashboard_hr import render_hr_dashboard, HR_EXECUTION_METRICS
 from visual_enhancement_pro import inject_professional_uiux_css, render_pro_header
 
@@ -66,15 +68,78 @@ if 'current_charts_data' not in st.session_state:
 # ==========================================
 # 数据加载与缓存
 # ==========================================
+# 缓存以 DuckDB 中的数据版本 (DBManager.get_data_version) 为键: 导入/SQL 更新/重置
+# 会递增版本, 旧条目不再命中并按 max_entries 淘汰, 无需 st.cache_data.clear()
+CACHE_MAX_ENTRIES = 64
 
-@st.cache_data
-def load_recruitment_data(months=12, recruiters=5, departments=5):
+# 导出格式: 显示名 -> (DBManager.export_filtered 的格式, MIME 类型)
+EXPORT_FORMAT_OPTIONS = {
+    "CSV (Excel 可直接打开)": ('csv', 'text/csv'),
+    "CSV + gzip 压缩": ('csv.gz', 'application/gzip'),
+    "CSV + zstd 压缩": ('csv.zst', 'application/zstd'),
+    "Parquet": ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_filter_options(data_version):
+    """
+    返回侧边栏筛选器所需的维度取值 (不加载事实表)
+    """
+    return DBManager().get_filter_options()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_filtered_recruitment_data(data_version, start_date=None, end_date=None, quarters=None,
+                                   years=None, departments=None, recruiter=None):
+    """
+    按当前角色的筛选条件从 DuckDB 加载数据 (筛选下推到数据库)
+    data_version: 所选时间范围内的数据版本, 仅用作缓存键
+    """
+    return DBManager().load_filtered_data(
+        start_date=start_date, end_date=end_date, quarters=quarters,
+        years=years, departments=departments, recruiter=recruiter
+    )
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_hrvp_simulation(data_version, start_date=None, end_date=None, quarters=None,
+                         years=None, departments=None, recruiter=None):
+    """
+    HRVP 看板的模拟字段 (ROI / 岗位职级 / 到岗周期), 每个数据版本与筛选条件只生成一次
+    data_version: 所选时间范围内的数据版本, 仅用作缓存键
+    """
+    df = load_filtered_recruitment_data(
+        data_version, start_date=start_date, end_date=end_date, quarters=quarters,
+        years=years, departments=departments, recruiter=recruiter
+    )
+    return simulate_hrvp_columns(df)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_hrd_derived(data_version, start_date=None, end_date=None, quarters=None,
+                     years=None, departments=None, recruiter=None):
     """
-    加载招聘数据（从DuckDB）
+    HRD 看板缺失的核心异常指标列 (按 HRD_DERIVED_COLUMNS 派生), 每个数据版本与筛选条件只计算一次
+    data_version: 所选时间范围内的数据版本, 仅用作缓存键
     """
-    # 无论参数如何，都统一调用 DB Seed 逻辑
-    # 如果 DB 已有数据，会直接返回；没有则根据参数生成
-    return seed_db_with_generated_data(months, recruiters, departments)
+    df = load_filtered_recruitment_data(
+        data_version, start_date=start_date, end_date=end_date, quarters=quarters,
+        years=years, departments=departments, recruiter=recruiter
+    )
+    return derive_hrd_columns(df)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_rollup(data_version, dimension, start_date=None, end_date=None, values=None, measures=None):
+    """
+    从月度汇总表读取按维度聚合的结果 (measures 为 ((列, 'mean'|'sum'), ...))
+    data_version: 所选时间范围内的数据版本, 仅用作缓存键
+    """
+    return DBManager().get_rollup(
+        dimension, start_date=start_date, end_date=end_date, values=values,
+        measures=dict(measures) if measures else None
+    )
 
 
 # ==========================================
@@ -122,67 +187,165 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("⚙️ 数据配置")
 
 with st.sidebar.expander("数据生成参数", expanded=False):
-    months = st.number_input("月份数", min_value=3, max_value=24, value=12, key="data_months")
-    recruiters = st.number_input("招聘顾问数", min_value=1, max_value=20, value=5, key="data_recruiters")
-    departments = st.number_input("部门数", min_value=1, max_value=10, value=5, key="data_depts")
+    # 规模预设: 首次使用时生成并缓存为 Parquet fixture, 之后由 DuckDB 直接读入
+    scale_profile = st.selectbox(
+        "数据规模", ["自定义", *SCALE_PROFILES],
+        format_func=lambda p: p if p == "自定义" else f"{p} ({profile_rows(p):,} 行)",
+        key="data_profile"
+    )
+    if scale_profile == "自定义":
+        scale_profile = None
+        months = st.number_input("月份数", min_value=3, max_value=24, value=12, key="data_months")
+        recruiters = st.number_input("招聘顾问数", min_value=1, max_value=20, value=5, key="data_recruiters")
+        departments = st.number_input("部门数", min_value=1, max_value=10, value=5, key="data_depts")
+    else:
+        dims = SCALE_PROFILES[scale_profile]
+        months, recruiters, departments = dims['months'], dims['recruiters'], dims['departments']
+        st.caption(f"{months} 个月 × {recruiters} 个招聘顾问 × {departments} 个部门")
 
     if st.button("🔄 重置并重新生成", key="regenerate_data"):
-        st.cache_data.clear()
-        # 强制删除表并重新初始化 (通过简单地删除 db 文件或 drop table，这里选择简单 Drop)
-        DBManager().conn.execute("DROP TABLE IF EXISTS recruitment_data")
+        if scale_profile is None:
+            # 强制删除表并重新初始化 (通过简单地删除 db 文件或 drop table，这里选择简单 Drop)
+            DBManager().drop_table()
+        else:
+            # 直接用预设覆写 (覆写前自动快照)
+            with st.spinner(f"正在载入 {scale_profile} 数据集..."):
+                seed_db_with_profile(scale_profile)
         st.success("已重置数据库")
         st.rerun()
 
+    # 只生成最新月份之后的 N 个月 (沿用最新月份的招聘顾问和部门) 并追加, 已有月份的数据和缓存不受影响
+    append_months = st.number_input("追加月数", min_value=1, max_value=12, value=1, key="append_months")
+    if st.button("➕ 追加下一个月", key="append_month_btn"):
+        with st.spinner("正在生成新月份数据..."):
+            first_month, appended = append_generated_months(append_months)
+        st.success(f"已追加 {first_month:%Y-%m} 起 {append_months} 个月, 共 {appended:,} 行")
+        st.rerun()
+
 # ------------------------------------------
 # [NEW] 数据管理中心
 # ------------------------------------------
 st.sidebar.subheader("💾 数据管理 Center")
-with st.sidebar.expander("导入/导出/更新", expanded=False):
+with st.sidebar.expander("导入/更新", expanded=False):
     db_mgr = DBManager()
-    
-    # 1. 导出
-    if st.button("📥 导出当前数据 (Excel)", use_container_width=True):
-        df_export = db_mgr.load_data_to_df()
-        st.download_button(
-            label="点击下载 .csv",
-            data=df_export.to_csv(index=False).encode('utf-8-sig'),
-            file_name=f"recruitment_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
-
-    # 2. 导入
-    uploaded_file = st.file_uploader("📤 上传数据 (覆写)", type=['csv', 'xlsx'])
+    st.caption("导出数据请使用下方的「📥 导出当前数据」(按当前角色的筛选条件导出)")
+
+    # 1. 导入
+    uploaded_file = st.file_uploader("📤 上传数据", type=['csv', 'xlsx'])
+    import_mode_label = st.radio(
+        "导入方式",
+        ["增量合并 (按 月份+招聘顾问+部门 更新/新增)", "覆写 (替换全部数据)"],
+        key="import_mode"
+    )
+    import_mode = 'upsert' if import_mode_label.startswith("增量合并") else 'replace'
     if uploaded_file:
         if st.button("确认导入", use_container_width=True):
+            import tempfile
+            progress = st.progress(0.0, text="正在写入临时文件...")
+            spool_path = None
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    df_new = pd.read_csv(uploaded_file)
-                else:
-                    df_new = pd.read_excel(uploaded_file)
-                
-                success, msg = db_mgr.import_data(df_new, mode='replace')
+                # 1. 分块落盘到临时文件 (不经过 pandas)
+                suffix = os.path.splitext(uploaded_file.name)[1].lower()
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+                    spool_path = spool.name
+                    total_bytes = max(uploaded_file.size, 1)
+                    copied = 0
+                    while True:
+                        chunk = uploaded_file.read(8 * 1024 * 1024)
+                        if not chunk:
+                            break
+                        spool.write(chunk)
+                        copied += len(chunk)
+                        progress.progress(0.2 * copied / total_bytes, text="正在写入临时文件...")
+
+                # 2. DuckDB 直接流式读取文件并写入
+                success, msg = db_mgr.import_file(
+                    spool_path, mode=import_mode,
+                    progress_callback=lambda f: progress.progress(0.2 + 0.8 * f, text="DuckDB 导入中...")
+                )
                 if success:
-                    st.success("导入成功! 请刷新页面")
-                    st.cache_data.clear()
+                    progress.progress(1.0, text="导入完成")
+                    st.success(f"导入成功! 请刷新页面 ({msg})")
                 else:
                     st.error(f"导入失败: {msg}")
             except Exception as e:
                 st.error(f"文件解析错误: {e}")
+            finally:
+                if spool_path and os.path.exists(spool_path):
+                    os.remove(spool_path)
 
-    # 3. SQL 更新
+    # 2. SQL 更新 (后台线程执行: 超时自动中断, 可取消, 查询结果分页)
     st.markdown("---")
     st.markdown("**🛠️ 高级: SQL 更新**")
+    if STORAGE_MODE == 'parquet':
+        st.caption("当前为 Parquet 存储模式: 数据表为只读视图, 不支持 UPDATE/INSERT/DELETE, 请通过上方「增量合并」导入修改数据")
     sql_query = st.text_area("输入SQL (支持 DuckDB 语法)", height=100, placeholder="UPDATE recruitment_data SET 部门='AI Lab' WHERE ...")
     if st.button("执行 SQL", key="run_sql_btn"):
         if sql_query.strip():
-            success, res = db_mgr.execute_query(sql_query)
-            if success:
-                st.success("执行成功")
-                if isinstance(res, pd.DataFrame) and not res.empty:
-                    st.dataframe(res)
-                st.cache_data.clear() # 清除缓存以显示更新
-            else:
-                st.error(f"执行失败: {res}")
+            st.session_state['sql_console'] = db_mgr.start_console_query(sql_query)
+
+    console = st.session_state.get('sql_console')
+    if console is not None:
+        if not console.done:
+            # 点击取消会触发重跑: 下方等待循环被打断, 本轮执行 cancel()
+            if st.button("⏹ 取消执行", key="cancel_sql_btn"):
+                console.cancel()
+            sql_status = st.empty()
+            while not console.wait(PROGRESS_POLL_INTERVAL):
+                sql_status.info(f"⏳ 执行中... {console.running_time:.1f}s (超过 {console.timeout}s 自动中断)")
+            sql_status.empty()
+
+        if console.error:
+            st.error(f"执行失败: {console.error}")
+        else:
+            st.success(f"执行成功 ({console.elapsed:.2f}s)")
+            if isinstance(console.result, pd.DataFrame) and not console.result.empty:
+                if console.kind == 'read':
+                    first_row = console.page * console.page_size
+                    st.caption(f"第 {first_row + 1}-{first_row + len(console.result)} 行 (每页最多 {console.page_size} 行)")
+                st.dataframe(console.result)
+            if console.kind == 'read' and (console.page > 0 or console.has_more):
+                prev_col, next_col = st.columns(2)
+                new_page = None
+                if console.page > 0 and prev_col.button("⬅ 上一页", key="sql_prev_page"):
+                    new_page = console.page - 1
+                if console.has_more and next_col.button("下一页 ➡", key="sql_next_page"):
+                    new_page = console.page + 1
+                if new_page is not None:
+                    st.session_state['sql_console'] = db_mgr.start_console_query(console.query, page=new_page)
+                    st.rerun()
+
+    # 3. 快照与恢复: 覆写/增量导入、SQL 更新、重置之前自动快照, 恢复无需重新导入
+    st.markdown("---")
+    st.markdown("**🕘 快照与恢复**")
+    snapshots = db_mgr.list_snapshots()
+    if snapshots.empty:
+        st.caption("暂无快照 (覆写/增量导入、SQL 更新、重置前会自动创建)")
+    else:
+        # 增量导入/SQL 更新只快照被修改的键 (月份, 招聘顾问, 部门), 恢复时只还原这些键
+        snapshot_labels = {
+            f"{r.created_at:%m-%d %H:%M:%S} · {r.reason} · {r.rows:,} 行"
+            + ("" if pd.isna(r.keys) else f" (部分: {int(r.keys):,} 个键)"): r.id
+            for r in snapshots.itertuples()
+        }
+        selected_snapshot = st.selectbox("选择快照", list(snapshot_labels), key="snapshot_selector")
+        if st.button("⏪ 恢复到该快照", key="restore_snapshot_btn", use_container_width=True):
+            with st.spinner("正在恢复..."):
+                try:
+                    restored_rows = db_mgr.restore_snapshot(snapshot_labels[selected_snapshot])
+                    st.success(f"已恢复 {restored_rows:,} 行 (恢复前的数据也已保存为快照)")
+                except Exception as e:
+                    st.error(f"恢复失败: {e}")
+
+    # 4. 维护: 重写数据库文件, 回收覆写导入/重置后留下的空闲空间
+    st.markdown("---")
+    if st.button("🧹 压缩数据库", key="compact_db_btn", use_container_width=True):
+        with st.spinner("正在压缩数据库..."):
+            report = db_mgr.compact()
+        st.success(
+            f"文件大小 {report['size_before'] / 2 ** 20:.2f}MB → {report['size_after'] / 2 ** 20:.2f}MB, "
+            f"打开耗时 {report['open_before'] * 1000:.0f}ms → {report['open_after'] * 1000:.0f}ms"
+        )
 
 # ------------------------------------------
 # [NEW] 图表数据导出 (Report Generator)
@@ -239,9 +402,14 @@ with st.sidebar.expander("导出可视化的图表数据", expanded=True):
                 except Exception as e:
                     st.error(f"导出失败: {str(e)}")
 
-# 加载数据
-with st.spinner("正在加载招聘数据..."):
-    df = load_recruitment_data(months=months, recruiters=recruiters, departments=departments)
+# 加载筛选维度 (事实数据按筛选条件在下方加载)
+with st.spinner("正在加载招聘数据..."), DBManager().query_section("筛选器"):
+    # 如果 DB 已有数据，会直接返回；没有则根据参数生成 (不参与缓存键)
+    if scale_profile is None:
+        ensure_db_seeded(months, recruiters, departments)
+    else:
+        ensure_profile_seeded(scale_profile)
+    filter_options = load_filter_options(DBManager().get_data_version())
 
 st.sidebar.markdown("---")
 
@@ -251,8 +419,8 @@ st.sidebar.markdown("---")
 
 st.sidebar.subheader("🔍 数据筛选")
 
-# 初始化筛选后的数据
-df_filtered = df.copy()
+# 各角色只构造筛选条件, 由 DuckDB 返回匹配的行
+data_filters = {}
 
 if role == "HRVP (战略驾驶舱)":
     # HRVP: 时间粒度 + 时间范围 + 快捷筛选
@@ -283,7 +451,7 @@ if role == "HRVP (战略驾驶舱)":
     
     # 处理快捷筛选
     if 'hrvp_quick_filter' in st.session_state and st.session_state.hrvp_quick_filter != "all":
-        end_date = df['月份'].max()
+        end_date = filter_options['max_month']
         
         if st.session_state.hrvp_quick_filter == "3m":
             start_date = end_date - pd.DateOffset(months=3)
@@ -292,32 +460,31 @@ if role == "HRVP (战略驾驶舱)":
             start_date = end_date - pd.DateOffset(months=6)
             st.sidebar.info(f"🔍 近半年")
         
-        df_filtered = df[df['月份'] >= start_date].copy()
+        data_filters = {'start_date': start_date}
     else:
         # 常规时间筛选
         if time_granularity == "月度":
-            start_month = st.sidebar.date_input("开始月份", df['月份'].min(), key="hrvp_start_sidebar")
-            end_month = st.sidebar.date_input("结束月份", df['月份'].max(), key="hrvp_end_sidebar")
-            df_filtered = df[
-                (df['月份'] >= pd.to_datetime(start_month)) &
-                (df['月份'] <= pd.to_datetime(end_month))
-            ].copy()
+            start_month = st.sidebar.date_input("开始月份", filter_options['min_month'], key="hrvp_start_sidebar")
+            end_month = st.sidebar.date_input("结束月份", filter_options['max_month'], key="hrvp_end_sidebar")
+            data_filters = {
+                'start_date': pd.to_datetime(start_month),
+                'end_date': pd.to_datetime(end_month)
+            }
         elif time_granularity == "季度":
-            quarters = df['季度'].unique()
+            quarters = filter_options['quarters']
             start_quarter = st.sidebar.selectbox("开始季度", quarters, key="hrvp_start_q_sidebar")
             end_quarter = st.sidebar.selectbox("结束季度", quarters, index=len(quarters)-1, key="hrvp_end_q_sidebar")
             start_idx = list(quarters).index(start_quarter)
             end_idx = list(quarters).index(end_quarter)
             selected_quarters = quarters[start_idx:end_idx+1]
-            df_filtered = df[df['季度'].isin(selected_quarters)].copy()
+            data_filters = {'quarters': tuple(selected_quarters)}
         else:
-            years = df['年份'].unique()
+            years = filter_options['years']
             start_year = st.sidebar.selectbox("开始年份", years, key="hrvp_start_y_sidebar")
             end_year = st.sidebar.selectbox("结束年份", years, index=len(years)-1, key="hrvp_end_y_sidebar")
-            df_filtered = df[
-                (df['年份'] >= start_year) &
-                (df['年份'] <= end_year)
-            ].copy()
+            data_filters = {
+                'years': tuple(y for y in years if start_year <= y <= end_year)
+            }
     
     # 存储时间粒度供dashboard使用
     st.session_state['current_time_granularity'] = time_granularity
@@ -331,29 +498,29 @@ elif role == "HRD (异常报警器)":
         key="hrd_time_granularity_sidebar"
     )
     
-    start_month = st.sidebar.date_input("开始时间", df['月份'].min(), key="hrd_start_sidebar")
-    end_month = st.sidebar.date_input("结束时间", df['月份'].max(), key="hrd_end_sidebar")
+    start_month = st.sidebar.date_input("开始时间", filter_options['min_month'], key="hrd_start_sidebar")
+    end_month = st.sidebar.date_input("结束时间", filter_options['max_month'], key="hrd_end_sidebar")
     
     selected_depts = st.sidebar.multiselect(
         "部门筛选 (可多选)",
-        options=df['部门'].unique().tolist(),
-        default=df['部门'].unique().tolist(),
+        options=filter_options['departments'],
+        default=filter_options['departments'],
         key="hrd_dept_filter_sidebar"
     )
     
     # 数据筛选
-    df_filtered = df[
-        (df['月份'] >= pd.to_datetime(start_month)) &
-        (df['月份'] <= pd.to_datetime(end_month)) &
-        (df['部门'].isin(selected_depts))
-    ].copy()
+    data_filters = {
+        'start_date': pd.to_datetime(start_month),
+        'end_date': pd.to_datetime(end_month),
+        'departments': tuple(selected_depts)
+    }
     
     st.session_state['current_time_granularity'] = time_granularity
 
 elif role == "HR (任务管理器)":
     # HR: 当前用户 + 时间范围
     
-    recruiter_list = df['招聘顾问'].unique().tolist()
+    recruiter_list = filter_options['recruiters']
     
     selected_recruiter = st.sidebar.selectbox(
         "👤 当前用户",
@@ -374,24 +541,61 @@ elif role == "HR (任务管理器)":
         custom_days = st.sidebar.number_input("过去N天", min_value=1, max_value=90, value=7, key="hr_custom_days_sidebar")
     
     # 数据筛选 - 只看自己的数据
-    df_my_data = df[df['招聘顾问'] == selected_recruiter].copy()
+    with DBManager().query_section("筛选器"):
+        _, my_max_month = DBManager().get_month_range(recruiter=selected_recruiter)
+    data_filters = {'recruiter': selected_recruiter}
     
-    if time_range == "今日":
-        today = df_my_data['月份'].max()
-        df_filtered = df_my_data[df_my_data['月份'] == today].copy()
+    if my_max_month is None:
+        pass
+    elif time_range == "今日":
+        data_filters.update(start_date=my_max_month, end_date=my_max_month)
     elif time_range == "本周":
-        last_week = df_my_data['月份'].max() - pd.Timedelta(days=7)
-        df_filtered = df_my_data[df_my_data['月份'] >= last_week].copy()
+        data_filters['start_date'] = my_max_month - pd.Timedelta(days=7)
     elif time_range == "本月":
-        current_month = df_my_data['月份'].max().replace(day=1)
-        df_filtered = df_my_data[df_my_data['月份'] >= current_month].copy()
+        data_filters['start_date'] = my_max_month.replace(day=1)
     else:
-        cutoff_date = df_my_data['月份'].max() - pd.Timedelta(days=custom_days)
-        df_filtered = df_my_data[df_my_data['月份'] >= cutoff_date].copy()
+        data_filters['start_date'] = my_max_month - pd.Timedelta(days=custom_days)
     
     st.session_state['selected_recruiter'] = selected_recruiter
     st.session_state['hr_time_range'] = time_range
 
+# 加载筛选后的数据
+with st.spinner("正在加载招聘数据..."), DBManager().query_section(f"{role} · 数据加载"):
+    data_version = DBManager().get_data_version(data_filters.get('start_date'), data_filters.get('end_date'))
+    df_filtered = load_filtered_recruitment_data(data_version, **data_filters)
+
+# ------------------------------------------
+# 导出当前数据: 按当前角色的筛选条件和所选列, 由 DuckDB COPY 直接写出临时文件
+# ------------------------------------------
+with st.sidebar.expander("📥 导出当前数据", expanded=False):
+    export_format_label = st.selectbox("文件格式", list(EXPORT_FORMAT_OPTIONS), key="export_format")
+    export_columns = st.multiselect("导出列 (不选则导出全部列)", list(df_filtered.columns), key="export_columns")
+    export_format, export_mime = EXPORT_FORMAT_OPTIONS[export_format_label]
+
+    def build_export(fmt=export_format, columns=tuple(export_columns), filters=dict(data_filters),
+                     section=f"{role} · 数据导出"):
+        # 点击下载时才执行 (Streamlit 在单独的线程中调用), 读出文件后立即删除临时文件
+        # Streamlit 的延迟下载只接受 str / bytes / 文件对象, 且会整体读入内存后再发送,
+        # 因此这里一次读出整个导出文件 (导出在 DuckDB 中流式写盘, 只有下载内容在内存中缓冲)
+        with DBManager().query_section(section):
+            path = DBManager().export_filtered(fmt, columns=list(columns) or None, **filters)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    st.download_button(
+        label="📥 下载",
+        data=build_export,
+        file_name=f"recruitment_data_{datetime.now().strftime('%Y%m%d')}{EXPORT_FORMATS[export_format][0]}",
+        mime=export_mime,
+        on_click="ignore",
+        use_container_width=True,
+        key="export_download_btn"
+    )
+    st.caption(f"当前筛选共 {len(df_filtered):,} 行")
+
 st.sidebar.markdown("---")
 
 # 系统信息
@@ -447,16 +651,30 @@ with brand_col2:
 # 主内容区：根据角色渲染不同看板
 # ==========================================
 
-# 渲染对应角色的看板
-if role == "HRVP (战略驾驶舱)":
-    render_hrvp_dashboard(df_filtered)
-
-elif role == "HRD (异常报警器)":
-    render_hrd_dashboard(df_filtered)
-
-elif role == "HR (任务管理器)":
-    selected_recruiter = st.session_state.get('selected_recruiter', df['招聘顾问'].unique()[0])
-    render_hr_dashboard(df_filtered, selected_recruiter=selected_recruiter)
+# 渲染对应角色的看板 (期间的数据库查询记入该角色看板的查询日志)
+with DBManager().query_section(f"{role} · 看板"):
+    if role == "HRVP (战略驾驶舱)":
+        render_hrvp_dashboard(df_filtered, simulated=load_hrvp_simulation(data_version, **data_filters))
+
+    elif role == "HRD (异常报警器)":
+        hrd_rollups = {
+            'dept': load_rollup(
+                data_version, 'dept', data_filters['start_date'], data_filters['end_date'],
+                values=data_filters['departments'], measures=(('候选人NPS', 'mean'),)
+            ),
+        }
+        # 顾问汇总表不含部门维度, 仅在未按部门筛选时可直接使用
+        if set(data_filters['departments']) == set(filter_options['departments']):
+            hrd_rollups['recruiter'] = load_rollup(
+                data_version, 'recruiter', data_filters['start_date'], data_filters['end_date'],
+                measures=tuple((col, 'sum') for col in HRD_FUNNEL_COLUMNS)
+            )
+        render_hrd_dashboard(df_filtered, rollups=hrd_rollups,
+                             derived=load_hrd_derived(data_version, **data_filters))
+
+    elif role == "HR (任务管理器)":
+        selected_recruiter = st.session_state.get('selected_recruiter', filter_options['recruiters'][0])
+        render_hr_dashboard(df_filtered, selected_recruiter=selected_recruiter)
 
 
 # ==========================================
@@ -501,3 +719,42 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+
+# ==========================================
+# 侧边栏：查询性能分析 (放在最后, 包含本次运行的查询)
+# ==========================================
+
+with st.sidebar.expander("⏱️ 查询性能分析", expanded=False):
+    db_mgr = DBManager()
+    st.caption("按看板区域统计的数据库查询 (命中缓存的加载不会产生查询)")
+    st.dataframe(
+        db_mgr.get_section_stats().rename(columns={
+            'section': '区域', 'queries': '查询次数', 'total_ms': '总耗时(ms)', 'total_bytes': '结果字节'
+        }),
+        hide_index=True
+    )
+
+    slowest = db_mgr.get_slowest_queries(limit=10)
+    st.markdown("**🐢 最慢查询**")
+    st.dataframe(
+        slowest[['query_hash', 'section', 'executions', 'avg_ms', 'max_ms', 'avg_rows', 'avg_bytes']].rename(columns={
+            'query_hash': '查询ID', 'section': '区域', 'executions': '次数', 'avg_ms': '平均(ms)',
+            'max_ms': '最慢(ms)', 'avg_rows': '平均行数', 'avg_bytes': '平均字节'
+        }),
+        hide_index=True
+    )
+
+    if not slowest.empty:
+        selected_hash = st.selectbox("查看执行计划", slowest['query_hash'], key="profile_query_hash")
+        selected = slowest[slowest['query_hash'] == selected_hash].iloc[0]
+        st.code(selected['query_text'], language='sql')
+        if not is_select_query(selected['query_text']):
+            st.caption("EXPLAIN ANALYZE 会实际执行语句, 只对单条 SELECT 重新执行")
+        elif st.button("EXPLAIN ANALYZE", key="explain_analyze_btn", use_container_width=True):
+            try:
+                plan = db_mgr.explain_analyze(
+                    selected['query_text'], json.loads(selected['params']), as_text=True
+                )
+                st.code(plan, language=None)
+            except Exception as e:
+                st.error(f"执行计划获取失败: {e}")
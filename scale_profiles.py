@@ -0,0 +1,122 @@
+"""
+招聘数据驾驶舱 - 数据规模预设 (scale profiles)
+每个预设只生成一次, 以 zstd 压缩的 Parquet 文件 (fixture) 缓存在 FIXTURE_DIR;
+文件名包含预设名、生成器版本 (GENERATOR_VERSION) 和 seed, 生成逻辑变化后自动重新生成
+"""
+
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_generator_complete import GENERATOR_VERSION, iter_recruitment_data_chunks
+
+FIXTURE_DIR = 'recruitment_fixtures'
+
+# 预设: 月份数 × 招聘顾问数 × 部门数
+SCALE_PROFILES = {
+    'demo': {'months': 12, 'recruiters': 5, 'departments': 5},            # 300 行
+    'mid-size': {'months': 24, 'recruiters': 50, 'departments': 20},      # 2.4 万行
+    'enterprise': {'months': 24, 'recruiters': 500, 'departments': 100},  # 120 万行
+    'stress': {'months': 48, 'recruiters': 500, 'departments': 100},      # 240 万行
+}
+PROFILE_SEED = 42
+
+
+def profile_rows(profile):
+    """
+    预设的行数
+    """
+    dims = _profile_dims(profile)
+    return dims['months'] * dims['recruiters'] * dims['departments']
+
+
+def fixture_path(profile, workers=1):
+    """
+    预设的 fixture 文件路径; 不存在时先分块生成 (内存与预设大小无关)
+    """
+    dims = _profile_dims(profile)
+    path = os.path.join(FIXTURE_DIR, f"{profile}-g{GENERATOR_VERSION}-s{PROFILE_SEED}.parquet")
+    if not os.path.exists(path):
+        _write_fixture(path, workers=workers, **dims)
+    return path
+
+
+def load_profile(profile, columns=None):
+    """
+    读取预设数据 (DataFrame), 首次调用时生成 fixture
+    """
+    return pd.read_parquet(fixture_path(profile), columns=columns)
+
+
+def seed_db_with_profile(profile, mode='replace'):
+    """
+    把预设的 fixture 导入事实表 (DuckDB 直接读取 Parquet 文件), 返回导入后库中的行数
+    """
+    from db_manager import DBManager
+
+    db = DBManager()
+    ok, msg = db.import_file(fixture_path(profile), mode=mode)
+    if not ok:
+        raise RuntimeError(f"Seeding failed: {msg}")
+    print(msg)
+    return db.count_rows()
+
+
+def ensure_profile_seeded(profile):
+    """
+    数据库为空时导入预设数据, 返回库中的行数
+    """
+    from db_manager import DBManager
+
+    row_count = DBManager().count_rows()
+    if row_count == 0:
+        row_count = seed_db_with_profile(profile)
+    return row_count
+
+
+def _profile_dims(profile):
+    if profile not in SCALE_PROFILES:
+        raise ValueError(f"Unknown scale profile: {profile} (expected one of {', '.join(SCALE_PROFILES)})")
+    return SCALE_PROFILES[profile]
+
+
+def _write_fixture(path, months, recruiters, departments, workers=1):
+    """
+    逐块生成并写入 Parquet (每块一个行组), 写完后再改名, 其他进程不会读到不完整的文件
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    writer = None
+    try:
+        for chunk in iter_recruitment_data_chunks(months, recruiters, departments, seed=PROFILE_SEED,
+                                                  workers=workers):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+        writer.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+if __name__ == '__main__':
+    # python scale_profiles.py [profile ...]: 生成 (或复用) fixture 并测量读取耗时
+    import sys
+    import time
+
+    for name in sys.argv[1:] or list(SCALE_PROFILES):
+        start = time.perf_counter()
+        path = fixture_path(name)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        df = load_profile(name)
+        print(f"{name:<10} {len(df):>10,} 行  {os.path.getsize(path) / 2 ** 20:8.1f}MB  "
+              f"准备 {built:6.2f}s  读取 {(time.perf_counter() - start) * 1000:8.1f}ms  {path}")